@@ -4,9 +4,20 @@ Supports both local summarization and Claude Haiku 4.5 API calls.
 """
 
 import requests
+import json
 import os
 import logging
-from typing import Optional, Dict
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Iterator, List
+
+from ai.circuit_breaker import CircuitBreaker
+from ai.summary_cache import SummaryCache
+from services.http_pool import build_session
+from services.metrics import track_rpc
+from services.request_trace import record_rpc
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +25,47 @@ logger = logging.getLogger(__name__)
 CLAUDE_API_KEY = os.getenv('CLAUDE_API_KEY')
 CLAUDE_API_URL = os.getenv('CLAUDE_API_URL', 'https://api.anthropic.com/v1')
 CLAUDE_MODEL = 'claude-3-5-haiku-20241022'  # Claude Haiku 4.5 model identifier
+CLAUDE_HTTP_TIMEOUT = float(os.getenv('CLAUDE_HTTP_TIMEOUT', '30'))
+
+# Rate limited (429) and overloaded (529) responses are retried with jittered backoff
+RETRYABLE_STATUS_CODES = (429, 529)
+CLAUDE_MAX_RETRIES = int(os.getenv('CLAUDE_MAX_RETRIES', '2'))
+CLAUDE_RETRY_BASE_DELAY = float(os.getenv('CLAUDE_RETRY_BASE_DELAY', '0.5'))
+CLAUDE_RETRY_MAX_DELAY = float(os.getenv('CLAUDE_RETRY_MAX_DELAY', '8'))
+
+# Batch data beyond this many (estimated) prompt tokens is summarized map-reduce style in shards
+SUMMARY_SHARD_TOKENS = int(os.getenv('SUMMARY_SHARD_TOKENS', '20000'))
+SUMMARY_WORKERS = int(os.getenv('SUMMARY_WORKERS', '4'))
+
+# Bump whenever the summary prompt changes, so cached summaries from the old prompt are not served
+PROMPT_VERSION = '1'
+
+# Keep-alive connection pool shared by all Claude calls, so summaries skip the TLS handshake
+_session = build_session(pool_size=int(os.getenv('CLAUDE_HTTP_POOL_SIZE', '10')))
+
+# Skips the API (so callers fall back to local summarization) while it is failing or slow
+claude_breaker = CircuitBreaker(
+    failure_rate_threshold=float(os.getenv('CLAUDE_BREAKER_FAILURE_RATE', '0.5')),
+    slow_call_seconds=float(os.getenv('CLAUDE_BREAKER_SLOW_CALL_SECONDS', '10')),
+    slow_call_rate_threshold=float(os.getenv('CLAUDE_BREAKER_SLOW_CALL_RATE', '0.5')),
+    min_calls=int(os.getenv('CLAUDE_BREAKER_MIN_CALLS', '5')),
+    open_seconds=float(os.getenv('CLAUDE_BREAKER_OPEN_SECONDS', '30'))
+)
+
+# Summaries of unchanged batch data are served from here instead of being regenerated
+summary_cache = SummaryCache(
+    max_entries=int(os.getenv('SUMMARY_CACHE_SIZE', '256')),
+    ttl=float(os.getenv('SUMMARY_CACHE_TTL', '3600')),
+    db_path=os.getenv('SUMMARY_CACHE_DB')
+)
+
+
+class ClaudeAPIError(RuntimeError):
+    """Error response from the Claude API."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 def call_claude_haiku(prompt: str, max_tokens: int = 1024) -> Optional[str]:
@@ -22,51 +74,180 @@ def call_claude_haiku(prompt: str, max_tokens: int = 1024) -> Optional[str]:
 
     :param prompt: The prompt to send to Claude
     :param max_tokens: Maximum tokens in the response
-    :return: The response text from Claude, or None if API call fails or API key not set
+    :return: The response text from Claude, or None if API call fails, API key not set or circuit open
     """
     if not CLAUDE_API_KEY:
         logger.debug("CLAUDE_API_KEY not set; Claude AI integration disabled")
         return None
 
-    try:
-        headers = {
-            'x-api-key': CLAUDE_API_KEY,
-            'anthropic-version': '2023-06-01',
-            'content-type': 'application/json'
-        }
-
-        payload = {
-            'model': CLAUDE_MODEL,
-            'max_tokens': max_tokens,
-            'messages': [
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ]
-        }
-
-        response = requests.post(
+    if not claude_breaker.allow_request():
+        logger.debug("Claude circuit breaker open; skipping API call")
+        return None
+
+    started = time.monotonic()
+    healthy = False
+    with track_rpc('call_claude_haiku') as call:
+        try:
+            payload = {
+                'model': CLAUDE_MODEL,
+                'max_tokens': max_tokens,
+                'messages': [
+                    {
+                        'role': 'user',
+                        'content': prompt
+                    }
+                ]
+            }
+
+            response = _post_messages(payload)
+            healthy = _is_healthy(response.status_code)
+
+            if response.status_code == 200:
+                result = response.json()
+                if result.get('content') and len(result['content']) > 0:
+                    return result['content'][0].get('text')
+            else:
+                logger.error(f"Claude API error: {response.status_code} - {response.text}")
+                call.fail()
+                return None
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error calling Claude API: {str(e)}")
+            call.fail()
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error in Claude API call: {str(e)}")
+            call.fail()
+            return None
+        finally:
+            claude_breaker.record(healthy, time.monotonic() - started)
+
+
+def _post_messages(payload: Dict, stream: bool = False) -> requests.Response:
+    """
+    POST to the Messages API, retrying 429/529 responses with jittered backoff while the retry budget allows.
+
+    :param payload: The request body
+    :param stream: Whether to stream the response body
+    :return: The final response
+    """
+    attempt = 0
+    while True:
+        posted = time.perf_counter()
+        response = _session.post(
             f'{CLAUDE_API_URL}/messages',
-            headers=headers,
+            headers=_claude_headers(),
             json=payload,
-            timeout=30
+            timeout=CLAUDE_HTTP_TIMEOUT,
+            stream=stream
         )
+        record_rpc('claude_messages', time.perf_counter() - posted)
+        if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= CLAUDE_MAX_RETRIES:
+            return response
 
-        if response.status_code == 200:
-            result = response.json()
-            if result.get('content') and len(result['content']) > 0:
-                return result['content'][0].get('text')
-        else:
-            logger.error(f"Claude API error: {response.status_code} - {response.text}")
-            return None
+        delay = _retry_delay(attempt, response.headers.get('retry-after'))
+        if delay is None or not claude_breaker.allow_retry():
+            return response
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error calling Claude API: {str(e)}")
-        return None
-    except Exception as e:
-        logger.error(f"Unexpected error in Claude API call: {str(e)}")
-        return None
+        logger.warning(f"Claude API returned {response.status_code}; retrying in {delay:.2f}s")
+        response.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str]) -> Optional[float]:
+    """
+    Compute the backoff before a retry: exponential with jitter, and never shorter than retry-after.
+
+    :param attempt: The number of retries already made
+    :param retry_after: The retry-after header of the response, if any
+    :return: Seconds to wait, or None if the wait would exceed CLAUDE_RETRY_MAX_DELAY
+    """
+    backoff = CLAUDE_RETRY_BASE_DELAY * 2 ** attempt
+    delay = backoff / 2 + random.uniform(0, backoff / 2)
+    try:
+        delay = max(delay, float(retry_after)) if retry_after else delay
+    except ValueError:
+        pass
+    return delay if delay <= CLAUDE_RETRY_MAX_DELAY else None
+
+
+def _is_healthy(status_code: int) -> bool:
+    """Whether a response status shows the API working (client errors are not the API's fault)."""
+    return status_code < 500 and status_code != 429
+
+
+def stream_claude_haiku(prompt: str, max_tokens: int = 1024) -> Iterator[str]:
+    """
+    Call Claude Haiku 4.5 API with streaming, yielding text as it is generated.
+
+    :param prompt: The prompt to send to Claude
+    :param max_tokens: Maximum tokens in the response
+    :return: A generator of text deltas
+    :raises RuntimeError: If the API key is not set or the circuit breaker is open
+    :raises ClaudeAPIError: If Claude returns an error
+    """
+    if not CLAUDE_API_KEY:
+        raise RuntimeError("CLAUDE_API_KEY not set; Claude AI integration disabled")
+
+    if not claude_breaker.allow_request():
+        raise RuntimeError("Claude circuit breaker open")
+
+    started = time.monotonic()
+    healthy = False
+    with track_rpc('stream_claude_haiku'):
+        try:
+            yield from _stream_messages(prompt, max_tokens)
+            healthy = True
+        except GeneratorExit:
+            # The consumer stopped reading; the API itself was working
+            healthy = True
+            raise
+        except ClaudeAPIError as e:
+            healthy = e.status_code is not None and _is_healthy(e.status_code)
+            raise
+        finally:
+            claude_breaker.record(healthy, time.monotonic() - started)
+
+
+def _stream_messages(prompt: str, max_tokens: int) -> Iterator[str]:
+    """Stream text deltas from the Messages API (see stream_claude_haiku)."""
+    payload = {
+        'model': CLAUDE_MODEL,
+        'max_tokens': max_tokens,
+        'stream': True,
+        'messages': [
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
+    }
+
+    with _post_messages(payload, stream=True) as response:
+        if response.status_code != 200:
+            raise ClaudeAPIError(f"Claude API error: {response.status_code} - {response.text}", response.status_code)
+
+        # Server-sent events: only the data lines matter, their "type" names the event
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            event = json.loads(line[len('data:'):])
+            if event.get('type') == 'content_block_delta' and event['delta'].get('type') == 'text_delta':
+                yield event['delta']['text']
+            elif event.get('type') == 'error':
+                raise ClaudeAPIError(f"Claude API error: {event.get('error', {}).get('message')}")
+            elif event.get('type') == 'message_stop':
+                return
+
+
+def _claude_headers() -> Dict:
+    """Build the request headers for the Claude Messages API."""
+    return {
+        'x-api-key': CLAUDE_API_KEY,
+        'anthropic-version': '2023-06-01',
+        'content-type': 'application/json'
+    }
 
 
 def generate_summary(raw_data: Dict) -> str:
@@ -83,13 +264,65 @@ def generate_summary(raw_data: Dict) -> str:
 
     # Try Claude API first if configured
     if CLAUDE_API_KEY:
+        cache_key = summary_cache.make_key(raw_data, CLAUDE_MODEL, PROMPT_VERSION)
+        claude_summary = summary_cache.get(cache_key)
+        if claude_summary:
+            return claude_summary
+
         claude_summary = _generate_claude_summary(raw_data)
         if claude_summary:
+            summary_cache.put(cache_key, claude_summary)
             return claude_summary
         logger.warning("Claude API failed; falling back to local summarization")
 
-    # Fall back to local summarization
-    return summarize_blockchain_data(raw_data)
+    # Fall back to local summarization (cached under its own key, so Claude is retried next time)
+    cache_key = summary_cache.make_key(raw_data, 'local', PROMPT_VERSION)
+    summary = summary_cache.get(cache_key)
+    if summary is None:
+        summary = summarize_blockchain_data(raw_data)
+        summary_cache.put(cache_key, summary)
+    return summary
+
+
+def stream_summary(raw_data: Dict) -> Iterator[str]:
+    """
+    Generate a summary like generate_summary, yielding text as soon as it is available.
+
+    Claude's output is forwarded as it streams. Without an API key, or if Claude
+    fails before producing any text, the local summary is streamed batch by batch.
+
+    :param raw_data: The raw data from the blockchain.
+    :return: A generator of summary text chunks
+    """
+    if not raw_data or 'batches' not in raw_data:
+        raw_data = process_input_data("")
+
+    if CLAUDE_API_KEY:
+        cache_key = summary_cache.make_key(raw_data, CLAUDE_MODEL, PROMPT_VERSION)
+        cached = summary_cache.get(cache_key)
+        if cached:
+            yield cached
+            return
+
+        chunks = []
+        try:
+            prompt = _summary_prompt(raw_data)
+            if prompt is not None:
+                for chunk in stream_claude_haiku(prompt, max_tokens=1024):
+                    chunks.append(chunk)
+                    yield chunk
+        except Exception as e:
+            if chunks:
+                # Text already reached the client; it cannot be swapped for the fallback
+                raise
+            logger.error(f"Error streaming Claude summary: {str(e)}")
+
+        if chunks:
+            summary_cache.put(cache_key, ''.join(chunks))
+            return
+        logger.warning("Claude API failed; falling back to local summarization")
+
+    yield from _iter_local_summary(raw_data)
 
 
 def _generate_claude_summary(raw_data: Dict) -> Optional[str]:
@@ -99,24 +332,217 @@ def _generate_claude_summary(raw_data: Dict) -> Optional[str]:
     :param raw_data: The raw blockchain data
     :return: Claude-generated summary or None if API fails
     """
+    prompt = _summary_prompt(raw_data)
+    if prompt is None:
+        return None
+    return call_claude_haiku(prompt, max_tokens=1024)
+
+
+def _summary_prompt(raw_data: Dict) -> Optional[str]:
+    """
+    Build the prompt for the final summary.
+
+    Data that does not fit in one prompt of SUMMARY_SHARD_TOKENS is split into
+    shards grouped by origin and the shards are summarized concurrently; the
+    prompt then asks Claude to combine those partial summaries (the reduce pass).
+
+    :param raw_data: The raw blockchain data
+    :return: The prompt text, or None if the partial summaries could not be merged
+    """
+    batches = raw_data.get('batches', [])
+    batch_info = [_format_batch_text(batch) for batch in batches]
+
+    if sum(_estimate_tokens(text) for text in batch_info) > SUMMARY_SHARD_TOKENS:
+        shards = _shard_batches(batches, SUMMARY_SHARD_TOKENS)
+        logger.info(f"Summarizing {len(batches)} batches in {len(shards)} shards")
+        with ThreadPoolExecutor(max_workers=max(1, min(SUMMARY_WORKERS, len(shards)))) as pool:
+            partials = list(pool.map(_summarize_shard, shards))
+        if all(partial is None for partial in partials):
+            # Claude is down (or the breaker is open): a reduce call would fail the same way
+            return None
+        # Failed shards get a compact local digest, so together they fit in the reduce prompt
+        digest_tokens = max(1, SUMMARY_SHARD_TOKENS // len(shards))
+        partials = [
+            partial if partial is not None else _local_shard_digest(shard, digest_tokens)
+            for shard, partial in zip(shards, partials)
+        ]
+        partials = _merge_partials(partials)
+        if partials is None:
+            return None
+        return _reduce_prompt(partials, len(batches))
+
     # Format data for Claude prompt
-    batch_info = []
-    for batch in raw_data.get('batches', []):
-        batch_text = f"""
+    batches_text = "\n".join(batch_info) if batch_info else "No batches available."
+
+    return f"""You are a supply chain analyst. Provide a concise, professional summary of the following boba ingredient batch tracking data:
+
+{batches_text}
+
+Please include:
+1. Overview of total batches and their origins
+2. Key tracking milestones
+3. Any notable supply chain patterns or observations
+4. Recommendations for supply chain optimization
+
+Keep the summary to 2-3 paragraphs."""
+
+
+def _format_batch_text(batch: Dict) -> str:
+    """
+    Format one batch for a Claude prompt.
+
+    :param batch: The batch dictionary
+    :return: The batch as prompt text
+    """
+    return f"""
 Batch ID: {batch['id']}
 Name: {batch['name']}
 Origin: {batch['origin']}
 Tracking History: {', '.join(batch['tracking_history'])}
 """
-        batch_info.append(batch_text)
 
-    batches_text = "\n".join(batch_info) if batch_info else "No batches available."
 
-    prompt = f"""You are a supply chain analyst. Provide a concise, professional summary of the following boba ingredient batch tracking data:
+def _estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of prompt tokens in a text (about 4 characters per token).
+
+    :param text: The text to measure
+    :return: The estimated token count
+    """
+    return len(text) // 4 + 1
+
+
+def _shard_batches(batches: List[Dict], token_budget: int) -> List[List[Dict]]:
+    """
+    Split batches into shards of at most token_budget prompt tokens.
+
+    Batches are grouped by origin so each shard covers as few origins as
+    possible, and shards stay stable (and cacheable) as new batches are added.
+
+    :param batches: The batches to split
+    :param token_budget: Maximum estimated tokens per shard
+    :return: The list of shards
+    """
+    by_origin: Dict[str, List[Dict]] = {}
+    for batch in batches:
+        by_origin.setdefault(batch['origin'], []).append(batch)
+
+    shards = []
+    current = []
+    current_tokens = 0
+    for origin in sorted(by_origin):
+        for batch in by_origin[origin]:
+            tokens = _estimate_tokens(_format_batch_text(batch))
+            if current and current_tokens + tokens > token_budget:
+                shards.append(current)
+                current = []
+                current_tokens = 0
+            current.append(batch)
+            current_tokens += tokens
+    if current:
+        shards.append(current)
+    return shards
+
+
+def _summarize_shard(shard: List[Dict]) -> str:
+    """
+    Summarize one shard of batches (the map step).
+
+    :param shard: The batches in the shard
+    :return: The shard summary, or None if Claude fails
+    """
+    cache_key = summary_cache.make_key({'batches': shard}, CLAUDE_MODEL, f"{PROMPT_VERSION}-shard")
+    summary = summary_cache.get(cache_key)
+    if summary:
+        return summary
+
+    origins = sorted({batch['origin'] for batch in shard})
+    batches_text = "\n".join(_format_batch_text(batch) for batch in shard)
+    prompt = f"""You are a supply chain analyst. The following is one part of a larger set of boba ingredient batch tracking data, covering {len(shard)} batches from {', '.join(origins)}:
 
 {batches_text}
 
-Please include:
+Summarize this part in one short paragraph: batch counts per origin, key tracking milestones, and anything unusual. Another analyst will combine your summary with the other parts."""
+
+    summary = call_claude_haiku(prompt, max_tokens=512)
+    if summary:
+        summary_cache.put(cache_key, summary)
+        return summary
+
+    logger.warning(f"Claude failed for a shard of {len(shard)} batches")
+    return None
+
+
+def _local_shard_digest(shard: List[Dict], token_budget: int) -> str:
+    """
+    Summarize a shard locally as batch counts per origin and step counts, for a shard Claude failed on.
+
+    :param shard: The batches in the shard
+    :param token_budget: Maximum estimated tokens for the digest
+    :return: The digest text
+    """
+    origins = Counter(batch['origin'] for batch in shard)
+    steps = Counter(step for batch in shard for step in batch['tracking_history'])
+    digest = (
+        f"{len(shard)} batches ("
+        + ', '.join(f"{origin}: {count}" for origin, count in sorted(origins.items()))
+        + "). Tracking steps: "
+        + (', '.join(f"{step} ({count})" for step, count in steps.most_common()) or "none")
+        + "."
+    )
+    return digest[:token_budget * 4]
+
+
+def _merge_partials(partials: List[str]) -> Optional[List[str]]:
+    """
+    Merge shard summaries in groups, concurrently, until together they fit in one prompt.
+
+    :param partials: The shard summaries
+    :return: Partial summaries that fit within SUMMARY_SHARD_TOKENS, or None if Claude fails
+    """
+    while len(partials) > 1 and sum(_estimate_tokens(partial) for partial in partials) > SUMMARY_SHARD_TOKENS:
+        groups = []
+        for partial in partials:
+            tokens = _estimate_tokens(partial)
+            if groups and groups[-1][1] + tokens <= SUMMARY_SHARD_TOKENS:
+                groups[-1][0].append(partial)
+                groups[-1][1] += tokens
+            else:
+                groups.append([[partial], tokens])
+        if len(groups) == len(partials):
+            break
+
+        with ThreadPoolExecutor(max_workers=max(1, min(SUMMARY_WORKERS, len(groups)))) as pool:
+            merged = list(pool.map(
+                lambda group: call_claude_haiku(_reduce_prompt(group[0], None), max_tokens=512),
+                groups
+            ))
+        if any(summary is None for summary in merged):
+            return None
+        partials = merged
+
+    return partials
+
+
+def _reduce_prompt(partials: List[str], batch_count: Optional[int]) -> str:
+    """
+    Build the prompt combining partial summaries.
+
+    :param partials: The partial summaries to combine
+    :param batch_count: The total number of batches for the final pass, or None for an intermediate merge
+    :return: The prompt text
+    """
+    parts_text = "\n\n".join(f"Part {index}:\n{partial}" for index, partial in enumerate(partials, start=1))
+    if batch_count is None:
+        return f"""You are a supply chain analyst. Merge the following partial summaries of boba ingredient batch tracking data into one short paragraph, keeping batch counts per origin, key milestones and anything unusual:
+
+{parts_text}"""
+
+    return f"""You are a supply chain analyst. The following are partial summaries of {batch_count} boba ingredient batches, split into parts by origin:
+
+{parts_text}
+
+Combine them into a concise, professional summary. Please include:
 1. Overview of total batches and their origins
 2. Key tracking milestones
 3. Any notable supply chain patterns or observations
@@ -124,8 +550,6 @@ Please include:
 
 Keep the summary to 2-3 paragraphs."""
 
-    return call_claude_haiku(prompt, max_tokens=1024)
-
 
 def summarize_blockchain_data(raw_data: Dict) -> str:
     """
@@ -135,18 +559,27 @@ def summarize_blockchain_data(raw_data: Dict) -> str:
     :param raw_data: The raw data from the blockchain containing batch information.
     :return: A summary of the batch information.
     """
-    summary = []
+    return ''.join(_iter_local_summary(raw_data))
+
+
+def _iter_local_summary(raw_data: Dict) -> Iterator[str]:
+    """
+    Generate the local summary one batch at a time.
+
+    :param raw_data: The raw data from the blockchain containing batch information.
+    :return: A generator of summary text chunks, one per batch
+    """
+    separator = ""
     for batch in raw_data.get('batches', []):
         batch_summary = f"Batch ID: {batch['id']}\n"
         batch_summary += f"Name: {batch['name']}\n"
         batch_summary += f"Origin: {batch['origin']}\n"
         batch_summary += f"Tracking History: {', '.join(batch['tracking_history'])}\n"
-        summary.append(batch_summary)
-
-    if not summary:
-        return "No batch data available for summary."
+        yield separator + batch_summary
+        separator = "\n"
 
-    return "\n".join(summary)
+    if not separator:
+        yield "No batch data available for summary."
 
 
 def process_input_data(input_data: str) -> Dict:
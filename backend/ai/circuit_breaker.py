@@ -0,0 +1,157 @@
+"""
+Circuit breaker for calls to the Claude API.
+Tracks the failure and slow-call rates of recent calls; when either crosses its
+threshold the circuit opens and callers skip the API (and fall back to local
+summarization) until a half-open probe succeeds.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Breaker states
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Count-based circuit breaker with failure-rate and slow-call thresholds and a retry budget."""
+
+    def __init__(self, failure_rate_threshold: float = 0.5, slow_call_seconds: float = 10.0,
+                 slow_call_rate_threshold: float = 0.5, window: int = 20, min_calls: int = 5,
+                 open_seconds: float = 30.0, retry_ratio: float = 0.2, max_retry_tokens: float = 10.0):
+        """
+        Initialize the circuit breaker.
+
+        :param failure_rate_threshold: Fraction of failed calls in the window that opens the circuit
+        :param slow_call_seconds: Calls taking longer than this count as slow
+        :param slow_call_rate_threshold: Fraction of slow calls in the window that opens the circuit
+        :param window: Number of recent calls the rates are computed over
+        :param min_calls: Calls needed in the window before the circuit may open
+        :param open_seconds: Seconds the circuit stays open before a half-open probe is allowed
+        :param retry_ratio: Retries earned per recorded call (the retry budget)
+        :param max_retry_tokens: Maximum retries that can be saved up
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.retry_ratio = retry_ratio
+        self.max_retry_tokens = max_retry_tokens
+
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window)  # (failed, slow) per call
+        self._state = STATE_CLOSED
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._retry_tokens = min(max_retry_tokens, 3.0)
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        """The current breaker state."""
+        with self._lock:
+            return self._current_state()
+
+    def allow_request(self) -> bool:
+        """
+        Decide whether a call may go to the API.
+
+        :return: True if the call may proceed; the caller must then call record()
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN and not self._probe_in_flight:
+                self._state = STATE_HALF_OPEN
+                self._probe_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def allow_retry(self) -> bool:
+        """
+        Spend one retry from the budget, so retries cannot multiply load on a struggling API.
+
+        :return: True if a retry may be attempted
+        """
+        with self._lock:
+            if self._current_state() != STATE_CLOSED or self._retry_tokens < 1:
+                return False
+            self._retry_tokens -= 1
+            return True
+
+    def record(self, success: bool, duration: float):
+        """
+        Record the outcome of a call admitted by allow_request().
+
+        :param success: Whether the API answered without a server-side failure
+        :param duration: Seconds the call took, including retries
+        """
+        slow = duration > self.slow_call_seconds
+        with self._lock:
+            self._retry_tokens = min(self.max_retry_tokens, self._retry_tokens + self.retry_ratio)
+
+            if self._state == STATE_HALF_OPEN:
+                self._probe_in_flight = False
+                if success and not slow:
+                    logger.info("Claude circuit breaker closed after a successful probe")
+                    self._state = STATE_CLOSED
+                    self._calls.clear()
+                else:
+                    self._trip()
+                return
+
+            self._calls.append((not success, slow))
+            if self._state == STATE_CLOSED and len(self._calls) >= self.min_calls:
+                failure_rate, slow_rate = self._rates()
+                if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                    self._trip()
+
+    def status(self) -> Dict:
+        """
+        Describe the breaker for reporting.
+
+        :return: A dictionary with state, recent failure/slow-call rates and the retry budget
+        """
+        with self._lock:
+            failure_rate, slow_rate = self._rates()
+            open_for = time.monotonic() - self._opened_at if self._opened_at is not None else None
+            return {
+                'state': self._current_state(),
+                'failure_rate': round(failure_rate, 3),
+                'slow_call_rate': round(slow_rate, 3),
+                'calls_in_window': len(self._calls),
+                'open_for_seconds': round(open_for, 3) if open_for is not None else None,
+                'rejected_calls': self._rejected,
+                'retry_tokens': round(self._retry_tokens, 2)
+            }
+
+    def _current_state(self) -> str:
+        """Resolve the state, moving from open to half-open once open_seconds have passed. Caller holds the lock."""
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            return STATE_HALF_OPEN
+        return self._state
+
+    def _rates(self):
+        """Failure and slow-call rates over the window. Caller holds the lock."""
+        if not self._calls:
+            return 0.0, 0.0
+        failures = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, is_slow in self._calls if is_slow)
+        return failures / len(self._calls), slow / len(self._calls)
+
+    def _trip(self):
+        """Open the circuit. Caller holds the lock."""
+        if self._state != STATE_OPEN:
+            logger.warning(f"Claude circuit breaker opened; skipping the API for {self.open_seconds}s")
+        self._state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
@@ -0,0 +1,197 @@
+"""
+Content-addressed cache for generated summaries.
+Summaries are keyed by a hash of the normalized batch data, the model and the
+prompt version, so an unchanged chain is summarized once. An optional SQLite
+tier keeps summaries across restarts.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryCache:
+    """LRU/TTL cache of summaries with an optional on-disk tier."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0, db_path: Optional[str] = None,
+                 max_disk_entries: int = 10000):
+        """
+        Initialize the summary cache.
+
+        :param max_entries: Maximum number of summaries kept in memory (0 disables the cache)
+        :param ttl: Seconds a summary stays valid
+        :param db_path: Path of the SQLite file backing the disk tier, or None for memory only
+        :param max_disk_entries: Maximum number of summaries kept on disk
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._db = None
+
+        if db_path and max_entries > 0:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                with self._db:
+                    self._db.execute("""
+                        CREATE TABLE IF NOT EXISTS summaries (
+                            key TEXT PRIMARY KEY,
+                            summary TEXT NOT NULL,
+                            created_at REAL NOT NULL
+                        )
+                    """)
+            except Exception as e:
+                logger.error(f"Error opening summary cache at {db_path}: {str(e)}")
+                self._db = None
+
+    @staticmethod
+    def make_key(raw_data: Dict, model: str, prompt_version: str) -> str:
+        """
+        Build the cache key for a summary request.
+
+        Batches are normalized (sorted by ID, IDs as strings, only the fields
+        that reach the summary) so equivalent data always hashes the same.
+
+        :param raw_data: The batch data being summarized
+        :param model: The model (or "local") producing the summary
+        :param prompt_version: The version of the prompt template
+        :return: The hex-encoded SHA-256 key
+        """
+        batches = sorted(
+            (
+                {
+                    'id': str(batch['id']),
+                    'name': batch['name'],
+                    'origin': batch['origin'],
+                    'tracking_history': list(batch['tracking_history'])
+                }
+                for batch in raw_data.get('batches', [])
+            ),
+            key=lambda batch: (len(batch['id']), batch['id'])
+        )
+        document = json.dumps(
+            {'batches': batches, 'model': model, 'prompt_version': prompt_version},
+            sort_keys=True,
+            separators=(',', ':'),
+            ensure_ascii=False
+        )
+        return hashlib.sha256(document.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a summary, falling back to the disk tier on a memory miss.
+
+        :param key: The cache key from make_key
+        :return: The cached summary, or None on a miss
+        """
+        if self.max_entries <= 0:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+
+            row = self._read_disk(key)
+            if row is not None and now - row[1] < self.ttl:
+                self._store(key, row[0], row[1])
+                self._disk_hits += 1
+                return row[0]
+
+            self._misses += 1
+            return None
+
+    def put(self, key: str, summary: str):
+        """
+        Store a summary in memory and, if configured, on disk.
+
+        :param key: The cache key from make_key
+        :param summary: The generated summary
+        """
+        if self.max_entries <= 0 or not summary:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._store(key, summary, now)
+            if self._db is None:
+                return
+            try:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO summaries (key, summary, created_at) VALUES (?, ?, ?)",
+                        (key, summary, now)
+                    )
+                    self._db.execute("DELETE FROM summaries WHERE created_at < ?", (now - self.ttl,))
+                    self._db.execute(
+                        "DELETE FROM summaries WHERE key NOT IN "
+                        "(SELECT key FROM summaries ORDER BY created_at DESC LIMIT ?)",
+                        (self.max_disk_entries,)
+                    )
+            except Exception as e:
+                logger.error(f"Error writing summary cache: {str(e)}")
+
+    def clear(self):
+        """Drop every cached summary, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM summaries")
+
+    def stats(self) -> Dict:
+        """
+        Report cache usage.
+
+        :return: A dictionary with size, limits and hit/miss/eviction counters
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'disk': self._db is not None,
+                'hits': self._hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'evictions': self._evictions
+            }
+
+    def _store(self, key: str, summary: str, created_at: float):
+        """Insert into the memory tier, evicting the least recently used summaries. Caller holds the lock."""
+        self._entries[key] = (summary, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        """Read a (summary, created_at) row from the disk tier. Caller holds the lock."""
+        if self._db is None:
+            return None
+        try:
+            return self._db.execute(
+                "SELECT summary, created_at FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+        except Exception as e:
+            logger.error(f"Error reading summary cache: {str(e)}")
+            return None
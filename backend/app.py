@@ -3,13 +3,22 @@ Main Flask application for the BobaChain backend.
 Provides REST API endpoints for batch management and blockchain interactions.
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
 from models.batch_model import Batch
-from ai.assistant import generate_summary
+from ai.assistant import generate_summary, stream_summary
+from ai.circuit_breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN
+from services.async_blockchain import AsyncBlockchainService
 from services.blockchain import BlockchainService
+from services import metrics, request_trace
+from services.write_queue import WriteQueue
+import hashlib
+import json
 import logging
-from typing import Dict, Tuple
+import os
+import time
+from itertools import islice
+from typing import Dict, Optional, Tuple
 
 # Configure logging
 logging.basicConfig(
@@ -19,16 +28,52 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['Server-Timing', 'X-RPC-Calls'])
 
 # Initialize the blockchain service
 try:
-    blockchain_service = BlockchainService(provider_url='http://localhost:8545')
+    blockchain_service = BlockchainService(provider_url=os.getenv('BLOCKCHAIN_PROVIDER', 'http://localhost:8545'))
     logger.info("Blockchain service initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize blockchain service: {str(e)}")
     blockchain_service = None
 
+# Optional AsyncWeb3 reader: full batch list reads fan out concurrently when there is no local index
+async_blockchain_service = AsyncBlockchainService(
+    provider_url=blockchain_service.provider_url,
+    contract_address=blockchain_service.contract_address
+) if (blockchain_service and os.getenv('ASYNC_READS', 'false').lower() == 'true'
+      and blockchain_service.provider_url.startswith(('http://', 'https://'))) else None
+
+# Per-request RPC accounting headers, and cProfile dumps of sampled slow requests
+app.config['TRACE_HEADERS'] = os.getenv('REQUEST_TRACE_HEADERS', 'true').lower() == 'true'
+profiler = request_trace.SlowRequestProfiler(
+    threshold_ms=float(os.getenv('PROFILE_SLOW_REQUEST_MS', '0')),
+    sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', '0.1')),
+    output_dir=os.getenv('PROFILE_DIR', './profiles'),
+    max_files=int(os.getenv('PROFILE_MAX_FILES', '100'))
+)
+
+# Queue for writes answered with 202 Accepted (see _wants_async_write)
+write_queue = WriteQueue(
+    blockchain_service,
+    workers=int(os.getenv('WRITE_QUEUE_WORKERS', '4'))
+) if blockchain_service else None
+app.config['ASYNC_WRITES'] = os.getenv('ASYNC_WRITES', 'false').lower() == 'true'
+# Seconds POST /api/batch waits for its receipt before answering 202 with a job (?wait=true waits fully)
+app.config['CREATE_RECEIPT_WAIT'] = float(os.getenv('CREATE_BATCH_RECEIPT_WAIT', '2'))
+
+# Pagination settings for /api/batches
+MAX_PAGE_SIZE = 1000
+STREAM_PAGE_SIZE = 100
+
+# Maximum number of batches accepted by /api/batches/bulk
+BULK_MAX_ITEMS = 1000
+
+# Limits for /api/batches/tracking, which writes every step to every batch in one transaction
+TRACKING_MAX_BATCHES = 200
+TRACKING_MAX_STEPS = 10
+
 
 # Utility functions for validation and error handling
 
@@ -89,6 +134,238 @@ def validate_tracking_step(step: str) -> Tuple[bool, str]:
     return True, ""
 
 
+def validate_tracking_note(note) -> Tuple[bool, str]:
+    """
+    Validate an optional tracking step note.
+
+    Notes are only emitted in the TrackingStepAdded event, never stored in
+    contract storage, so they may be longer than a step.
+
+    :param note: The note to validate
+    :return: Tuple of (is_valid, error_message)
+    """
+    if not isinstance(note, str):
+        return False, "Tracking note must be a string"
+
+    if len(note) > 1000:
+        return False, "Tracking note cannot exceed 1000 characters"
+
+    return True, ""
+
+
+def validate_pagination_params(limit: Optional[str], cursor: Optional[str]) -> Tuple[bool, str]:
+    """
+    Validate batch list pagination parameters.
+
+    :param limit: The requested page size, if any
+    :param cursor: The ID of the last batch already seen, if any
+    :return: Tuple of (is_valid, error_message)
+    """
+    if limit is not None:
+        try:
+            limit_int = int(limit)
+        except ValueError:
+            return False, "Limit must be a valid integer"
+        if limit_int <= 0 or limit_int > MAX_PAGE_SIZE:
+            return False, f"Limit must be between 1 and {MAX_PAGE_SIZE}"
+
+    if cursor is not None:
+        try:
+            cursor_int = int(cursor)
+        except ValueError:
+            return False, "Cursor must be a valid integer"
+        if cursor_int < 0:
+            return False, "Cursor cannot be negative"
+
+    return True, ""
+
+
+def validate_block_range(from_block: Optional[str], to_block: Optional[str]) -> Tuple[bool, str]:
+    """
+    Validate event query block range parameters.
+
+    :param from_block: The first block to search, if given
+    :param to_block: The last block to search, if given
+    :return: Tuple of (is_valid, error_message)
+    """
+    blocks = {}
+    for name, value in (('from_block', from_block), ('to_block', to_block)):
+        if value is None:
+            continue
+        try:
+            blocks[name] = int(value)
+        except ValueError:
+            return False, f"{name} must be a valid integer"
+        if blocks[name] < 0:
+            return False, f"{name} cannot be negative"
+
+    if len(blocks) == 2 and blocks['from_block'] > blocks['to_block']:
+        return False, "from_block cannot be greater than to_block"
+
+    return True, ""
+
+
+def _wants_async_write() -> bool:
+    """
+    Decide whether a write request should be queued instead of sent inline.
+
+    Writes are queued when ASYNC_WRITES is enabled or the client sends
+    "Prefer: respond-async".
+
+    :return: True if the write should be queued
+    """
+    if not write_queue:
+        return False
+    return app.config['ASYNC_WRITES'] or 'respond-async' in request.headers.get('Prefer', '')
+
+
+def _accepted_response(job: Dict):
+    """
+    Build the 202 Accepted response for a queued write job.
+
+    :param job: The queued job
+    :return: Flask response tuple pointing at the job status endpoint
+    """
+    status_url = f"/api/jobs/{job['id']}"
+    return jsonify({
+        "message": "Write queued",
+        "job_id": job['id'],
+        "status": job['status'],
+        "status_url": status_url
+    }), 202, {"Location": status_url}
+
+
+def _batch_etag(batch_id: int, step_count: int, as_of_block: Optional[int]) -> str:
+    """
+    Build the ETag for a single batch response.
+
+    Name and origin never change and tracking history only grows, so the
+    number of steps identifies the version of a batch.
+
+    :param batch_id: The ID of the batch
+    :param step_count: The length of its tracking history
+    :param as_of_block: The indexed block included in the response, if any
+    :return: The ETag value
+    """
+    etag = f"batch-{batch_id}-{step_count}"
+    return etag if as_of_block is None else f"{etag}-{as_of_block}"
+
+
+def _batches_etag(head_block: Optional[int], generation: int) -> Optional[str]:
+    """
+    Build the ETag for a batch list response from the chain head, data generation and requested page.
+
+    The head can lag by a health probe interval, so the generation (bumped by
+    local writes and their receipts) keeps a write from being answered with 304.
+
+    :param head_block: The block number the list reflects, or None if unknown
+    :param generation: The service's data generation
+    :return: The ETag value, or None if no version is known
+    """
+    if head_block is None:
+        return None
+    page = hashlib.sha1(request.query_string).hexdigest()[:16]
+    return f"batches-{head_block}-{generation}-{page}"
+
+
+def _not_modified(etag: str) -> Response:
+    """
+    Build the 304 Not Modified response for a client that already holds etag.
+
+    :param etag: The current ETag of the resource
+    :return: Flask response
+    """
+    return _with_etag(Response(status=304), etag)
+
+
+def _with_etag(response: Response, etag: str) -> Response:
+    """
+    Tag a response so clients can revalidate it with If-None-Match.
+
+    :param response: The response to tag
+    :param etag: The ETag value
+    :return: The tagged response
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# Request metrics and tracing (see services/metrics.py and services/request_trace.py)
+
+def _endpoint_label() -> str:
+    """The route rule serving the current request, so metric labels stay bounded."""
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+@app.before_request
+def _start_request_metrics():
+    """Label RPC calls made for this request with its endpoint and count it in flight."""
+    g.metrics_endpoint = _endpoint_label()
+    g.metrics_started = time.perf_counter()
+    g.metrics_status = 500
+    metrics.set_endpoint(g.metrics_endpoint)
+    metrics.HTTP_IN_FLIGHT.inc(endpoint=g.metrics_endpoint, http_method=request.method)
+
+
+@app.after_request
+def _record_response_status(response: Response) -> Response:
+    """Remember the response status for the request metrics."""
+    g.metrics_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def _finish_request_metrics(error=None):
+    """Record the request's latency and status once it (and any streamed body) is done."""
+    if 'metrics_started' not in g:
+        return
+    labels = {'endpoint': g.metrics_endpoint, 'http_method': request.method}
+    metrics.HTTP_IN_FLIGHT.dec(**labels)
+    metrics.HTTP_DURATION.observe(time.perf_counter() - g.metrics_started, **labels)
+    metrics.HTTP_REQUESTS.inc(status=str(500 if error else g.metrics_status), **labels)
+    g.pop('metrics_started')
+    metrics.set_endpoint(None)
+
+
+@app.before_request
+def _start_request_trace():
+    """Start counting the RPC and Claude calls made for this request, and maybe profile it."""
+    g.trace = request_trace.start_trace()
+    g.profile = profiler.start()
+
+
+@app.after_request
+def _add_trace_headers(response: Response) -> Response:
+    """
+    Report the calls made so far in Server-Timing and X-RPC-Calls.
+
+    Streamed bodies are generated after the headers are sent, so their calls are not included.
+    """
+    trace = g.get('trace')
+    if trace is not None and app.config['TRACE_HEADERS']:
+        response.headers['Server-Timing'] = trace.server_timing()
+        response.headers['X-RPC-Calls'] = str(trace.rpc_count)
+    return response
+
+
+@app.teardown_request
+def _finish_request_trace(error=None):
+    """Log slow requests with their call counts and keep their profile, if one was taken."""
+    trace = g.pop('trace', None)
+    profile = g.pop('profile', None)
+    request_trace.end_trace()
+    if trace is None:
+        return
+
+    elapsed_ms = trace.elapsed() * 1000
+    label = f"{request.method} {_endpoint_label()}"
+    if profile is not None:
+        profiler.finish(profile, elapsed_ms, label)
+    if profiler.threshold_ms > 0 and elapsed_ms >= profiler.threshold_ms:
+        logger.warning(f"Slow request {label}: {trace.summary()}")
+
+
 # Health check endpoint
 
 @app.route('/api/health', methods=['GET'])
@@ -103,7 +380,8 @@ def health_check():
     return jsonify({
         "status": "healthy" if blockchain_connected else "degraded",
         "blockchain_connected": blockchain_connected,
-        "message": "API is running" + (" and connected to blockchain" if blockchain_connected else " but blockchain connection failed")
+        "message": "API is running" + (" and connected to blockchain" if blockchain_connected else " but blockchain connection failed"),
+        "diagnostics": blockchain_service.get_diagnostics() if blockchain_service else {}
     }), 200 if blockchain_connected else 503
 
 
@@ -117,17 +395,71 @@ def get_config():
 
     :return: JSON response with configuration
     """
-    from ai.assistant import CLAUDE_API_KEY, CLAUDE_MODEL
+    from ai.assistant import CLAUDE_API_KEY, CLAUDE_MODEL, claude_breaker, summary_cache
     
     ai_model = CLAUDE_MODEL if CLAUDE_API_KEY else "local"
     
     return jsonify({
         "ai_model": ai_model,
         "claude_enabled": bool(CLAUDE_API_KEY),
-        "blockchain_connected": blockchain_service.is_connected() if blockchain_service else False
+        "blockchain_connected": blockchain_service.is_connected() if blockchain_service else False,
+        "summary_cache": summary_cache.stats(),
+        "claude_circuit": claude_breaker.status(),
+        "request_profiler": profiler.status()
     }), 200
 
 
+# Metrics endpoint
+
+CIRCUIT_STATE = metrics.REGISTRY.gauge(
+    'bobachain_claude_circuit_state', 'Claude circuit breaker state (1 for the current state).', ('state',)
+)
+CIRCUIT_FAILURE_RATE = metrics.REGISTRY.gauge(
+    'bobachain_claude_circuit_failure_rate', 'Failure rate of recent Claude calls.'
+)
+CACHE_ENTRIES = metrics.REGISTRY.gauge(
+    'bobachain_cache_entries', 'Entries held by each cache.', ('cache',)
+)
+CACHE_HIT_RATE = metrics.REGISTRY.gauge(
+    'bobachain_cache_hit_rate', 'Hit rate of each cache since startup.', ('cache',)
+)
+BLOCKCHAIN_UP = metrics.REGISTRY.gauge(
+    'bobachain_blockchain_connected', 'Whether the blockchain provider is reachable.'
+)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Expose request, RPC and Claude call metrics in the Prometheus text format.
+
+    :return: Plain-text response for a Prometheus scrape
+    """
+    from ai.assistant import claude_breaker, summary_cache
+
+    circuit = claude_breaker.status()
+    for state in (STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN):
+        CIRCUIT_STATE.set(1 if circuit['state'] == state else 0, state=state)
+    CIRCUIT_FAILURE_RATE.set(circuit['failure_rate'])
+
+    summary_stats = summary_cache.stats()
+    lookups = summary_stats['hits'] + summary_stats['disk_hits'] + summary_stats['misses']
+    CACHE_ENTRIES.set(summary_stats['size'], cache='summary')
+    CACHE_HIT_RATE.set((summary_stats['hits'] + summary_stats['disk_hits']) / lookups if lookups else 0,
+                       cache='summary')
+
+    if blockchain_service:
+        BLOCKCHAIN_UP.set(1 if blockchain_service.is_connected() else 0)
+        batch_stats = blockchain_service.get_diagnostics().get('batch_cache')
+        if batch_stats:
+            CACHE_ENTRIES.set(batch_stats['size'], cache='batch')
+            CACHE_HIT_RATE.set(batch_stats['hit_rate'] or 0, cache='batch')
+    else:
+        BLOCKCHAIN_UP.set(0)
+
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE), 200
+
+
 # Batch management endpoints
 
 @app.route('/api/batch', methods=['POST'])
@@ -141,6 +473,10 @@ def create_batch():
         "origin": "Origin Location"
     }
 
+    The batch ID is read from the receipt if the transaction is mined within
+    CREATE_BATCH_RECEIPT_WAIT seconds (or BLOCKCHAIN_RECEIPT_TIMEOUT with
+    ?wait=true); otherwise the response is 202 with a job that resolves it.
+
     :return: JSON response with batch creation result
     """
     try:
@@ -158,6 +494,10 @@ def create_batch():
         if not is_valid:
             return jsonify({"error": error_msg}), 400
 
+        if _wants_async_write():
+            job = write_queue.enqueue('create_batch', name=data['name'], origin=data['origin'])
+            return _accepted_response(job)
+
         # Create batch on blockchain
         tx_hash = blockchain_service.create_batch(
             name=data['name'],
@@ -167,22 +507,101 @@ def create_batch():
         if not tx_hash:
             return jsonify({"error": "Failed to create batch on blockchain"}), 500
 
-        # Get the batch ID (approximate - would need to listen to events in production)
-        batch_count = blockchain_service.get_batch_count()
+        # Read the assigned batch ID from the BatchCreated log in the receipt
+        wait = request.args.get('wait', '').lower() in ('1', 'true', 'yes')
+        batch_id = blockchain_service.get_created_batch_id(
+            tx_hash,
+            timeout=None if wait else app.config['CREATE_RECEIPT_WAIT']
+        )
 
-        return jsonify({
+        response = {
             "message": "Batch created successfully",
-            "batch_id": batch_count,
+            "batch_id": batch_id,
             "name": data['name'],
             "origin": data['origin'],
             "tx_hash": tx_hash
-        }), 201
+        }
+        if batch_id is None and write_queue:
+            # Not mined yet: hand the receipt wait to a job instead of holding the worker
+            job = write_queue.track('create_batch', tx_hash, name=data['name'], origin=data['origin'])
+            status_url = f"/api/jobs/{job['id']}"
+            response.update({
+                "message": "Batch submitted; poll the job for its ID",
+                "job_id": job['id'],
+                "status": job['status'],
+                "status_url": status_url
+            })
+            return jsonify(response), 202, {"Location": status_url}
+
+        return jsonify(response), 201
 
     except Exception as e:
         logger.error(f"Error creating batch: {str(e)}")
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
+@app.route('/api/batches/bulk', methods=['POST'])
+def create_batches_bulk():
+    """
+    Create many batches on the blockchain in as few transactions as possible.
+
+    Expected JSON body:
+    {
+        "batches": [
+            {"name": "Batch Name", "origin": "Origin Location"},
+            ...
+        ]
+    }
+
+    :return: JSON response with the transaction and assigned batch ID range of each chunk
+    """
+    try:
+        # Validate blockchain service
+        if not blockchain_service:
+            return jsonify({"error": "Blockchain service not available"}), 503
+        
+        if not blockchain_service.is_connected():
+            return jsonify({"error": "Not connected to blockchain"}), 503
+
+        # Get and validate request data
+        data = request.get_json()
+        if not data or not isinstance(data.get('batches'), list) or not data['batches']:
+            return jsonify({"error": "A non-empty list of batches is required"}), 400
+
+        if len(data['batches']) > BULK_MAX_ITEMS:
+            return jsonify({"error": f"Cannot create more than {BULK_MAX_ITEMS} batches per request"}), 400
+
+        for index, batch in enumerate(data['batches']):
+            is_valid, error_msg = validate_batch_creation_data(batch if isinstance(batch, dict) else None)
+            if not is_valid:
+                return jsonify({"error": f"Batch {index}: {error_msg}"}), 400
+
+        # Create batches on blockchain
+        chunks = blockchain_service.create_batches(
+            names=[batch['name'] for batch in data['batches']],
+            origins=[batch['origin'] for batch in data['batches']]
+        )
+
+        if chunks is None:
+            return jsonify({"error": "Failed to create batches on blockchain"}), 500
+
+        if any('error' in chunk for chunk in chunks):
+            return jsonify({
+                "error": "Some batches could not be created",
+                "chunks": chunks
+            }), 500
+
+        return jsonify({
+            "message": "Batches created successfully",
+            "count": len(data['batches']),
+            "chunks": chunks
+        }), 201
+
+    except Exception as e:
+        logger.error(f"Error creating batches: {str(e)}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
 @app.route('/api/batch/<batch_id>', methods=['GET'])
 def get_batch(batch_id):
     """
@@ -204,19 +623,87 @@ def get_batch(batch_id):
         if not is_valid:
             return jsonify({"error": error_msg}), 400
 
+        batch_id = int(batch_id)
+        as_of_block = blockchain_service.as_of_block()
+
+        # Answer conditional requests for cached batches without reading the blockchain
+        step_count = blockchain_service.cached_step_count(batch_id)
+        if step_count is not None:
+            etag = _batch_etag(batch_id, step_count, as_of_block)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+
         # Retrieve batch from blockchain
-        batch_data = blockchain_service.get_batch(int(batch_id))
+        batch_data = blockchain_service.get_batch(batch_id)
 
         if not batch_data:
             return jsonify({"error": f"Batch with ID {batch_id} not found"}), 404
 
-        return jsonify(batch_data), 200
+        etag = _batch_etag(batch_id, len(batch_data['tracking_history']), as_of_block)
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+
+        if as_of_block is not None:
+            batch_data = {**batch_data, "as_of_block": as_of_block}
+
+        return _with_etag(jsonify(batch_data), etag), 200
 
     except Exception as e:
         logger.error(f"Error retrieving batch {batch_id}: {str(e)}")
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
+@app.route('/api/batch/<batch_id>/events', methods=['GET'])
+def get_batch_events(batch_id):
+    """
+    Retrieve the on-chain event timeline of a batch.
+
+    Query parameters:
+    - from_block: First block to search (default: the batch's creation block if indexed, else 0)
+    - to_block: Last block to search (default: latest; later blocks are clamped to it)
+
+    :param batch_id: The ID of the batch
+    :return: JSON response with the batch's events in chain order
+    """
+    try:
+        # Validate blockchain service
+        if not blockchain_service:
+            return jsonify({"error": "Blockchain service not available"}), 503
+
+        if not blockchain_service.is_connected():
+            return jsonify({"error": "Not connected to blockchain"}), 503
+
+        # Validate batch ID
+        is_valid, error_msg = validate_batch_id(batch_id)
+        if not is_valid:
+            return jsonify({"error": error_msg}), 400
+
+        is_valid, error_msg = validate_block_range(request.args.get('from_block'), request.args.get('to_block'))
+        if not is_valid:
+            return jsonify({"error": error_msg}), 400
+
+        from_block = request.args.get('from_block')
+        to_block = request.args.get('to_block')
+        events = blockchain_service.get_batch_events(
+            int(batch_id),
+            from_block=int(from_block) if from_block is not None else None,
+            to_block=int(to_block) if to_block is not None else None
+        )
+
+        if events is None:
+            return jsonify({"error": "Failed to retrieve batch events"}), 500
+
+        return jsonify({
+            "batch_id": int(batch_id),
+            "events": events,
+            "count": len(events)
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error retrieving events for batch {batch_id}: {str(e)}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
 @app.route('/api/batch/<batch_id>/tracking', methods=['POST'])
 def add_tracking_step(batch_id):
     """
@@ -224,7 +711,8 @@ def add_tracking_step(batch_id):
 
     Expected JSON body:
     {
-        "step": "Tracking step description"
+        "step": "Tracking step description",
+        "note": "Optional free text, recorded in the event log only"
     }
 
     :param batch_id: The ID of the batch
@@ -252,32 +740,128 @@ def add_tracking_step(batch_id):
         if not is_valid:
             return jsonify({"error": error_msg}), 400
 
+        note = data.get('note', '')
+        is_valid, error_msg = validate_tracking_note(note)
+        if not is_valid:
+            return jsonify({"error": error_msg}), 400
+
+        if _wants_async_write():
+            job = write_queue.enqueue('add_tracking_step', batch_id=int(batch_id), step=data['step'], note=note)
+            return _accepted_response(job)
+
         # Add tracking step to blockchain
         tx_hash = blockchain_service.add_tracking_step(
             batch_id=int(batch_id),
-            step=data['step']
+            step=data['step'],
+            note=note
         )
 
         if not tx_hash:
             return jsonify({"error": "Failed to add tracking step"}), 500
 
-        return jsonify({
+        response = {
             "message": "Tracking step added successfully",
             "batch_id": batch_id,
             "step": data['step'],
             "tx_hash": tx_hash
-        }), 201
+        }
+        if note:
+            response["note"] = note
+        return jsonify(response), 201
 
     except Exception as e:
         logger.error(f"Error adding tracking step: {str(e)}")
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
+@app.route('/api/batches/tracking', methods=['POST'])
+def add_tracking_steps_bulk():
+    """
+    Add the same tracking step(s) to many batches in a single transaction.
+
+    Expected JSON body:
+    {
+        "batch_ids": [1, 2, 3],
+        "step": "Tracking step description"
+    }
+    or, for several steps, "steps": ["First step", "Second step"] instead of "step".
+
+    :return: JSON response with result
+    """
+    try:
+        # Validate blockchain service
+        if not blockchain_service:
+            return jsonify({"error": "Blockchain service not available"}), 503
+        
+        if not blockchain_service.is_connected():
+            return jsonify({"error": "Not connected to blockchain"}), 503
+
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "Request body is required"}), 400
+
+        # Validate batch IDs
+        batch_ids = data.get('batch_ids')
+        if not isinstance(batch_ids, list) or not batch_ids:
+            return jsonify({"error": "A non-empty list of batch IDs is required"}), 400
+
+        if len(batch_ids) > TRACKING_MAX_BATCHES:
+            return jsonify({"error": f"Cannot update more than {TRACKING_MAX_BATCHES} batches per request"}), 400
+
+        for batch_id in batch_ids:
+            is_valid, error_msg = validate_batch_id(str(batch_id))
+            if not is_valid:
+                return jsonify({"error": f"Batch ID {batch_id}: {error_msg}"}), 400
+
+        # Validate tracking steps
+        steps = data['steps'] if 'steps' in data else [data.get('step')]
+        if not isinstance(steps, list) or not steps:
+            return jsonify({"error": "Tracking step is required"}), 400
+
+        if len(steps) > TRACKING_MAX_STEPS:
+            return jsonify({"error": f"Cannot add more than {TRACKING_MAX_STEPS} steps per request"}), 400
+
+        for step in steps:
+            is_valid, error_msg = validate_tracking_step(step)
+            if not is_valid:
+                return jsonify({"error": error_msg}), 400
+
+        # Add tracking steps to blockchain
+        tx_hash = blockchain_service.add_tracking_steps(
+            batch_ids=[int(batch_id) for batch_id in batch_ids],
+            steps=steps
+        )
+
+        if not tx_hash:
+            return jsonify({"error": "Failed to add tracking steps"}), 500
+
+        return jsonify({
+            "message": "Tracking steps added successfully",
+            "batch_ids": [int(batch_id) for batch_id in batch_ids],
+            "steps": steps,
+            "tx_hash": tx_hash
+        }), 201
+
+    except Exception as e:
+        logger.error(f"Error adding tracking steps: {str(e)}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
 @app.route('/api/batches', methods=['GET'])
-def get_all_batches():
+async def get_all_batches():
     """
     Retrieve all batches from the blockchain.
 
+    Optional query parameters:
+        limit: Maximum number of batches to return (enables pagination)
+        cursor: The next_cursor value from the previous page
+
+    Clients sending "Accept: application/x-ndjson" receive one batch per line,
+    streamed as pages are fetched from the blockchain.
+
+    With ASYNC_READS enabled and no local index, the full list is read
+    through AsyncBlockchainService with concurrent calls.
+
     :return: JSON response with list of batches
     """
     try:
@@ -288,22 +872,117 @@ def get_all_batches():
         if not blockchain_service.is_connected():
             return jsonify({"error": "Not connected to blockchain"}), 503
 
-        # Retrieve all batches
-        batches = blockchain_service.get_all_batches()
-
-        if batches is None:
-            return jsonify({"error": "Failed to retrieve batches"}), 500
+        # Validate pagination parameters
+        limit = request.args.get('limit')
+        cursor = request.args.get('cursor')
+        is_valid, error_msg = validate_pagination_params(limit, cursor)
+        if not is_valid:
+            return jsonify({"error": error_msg}), 400
 
-        return jsonify({
-            "batches": batches,
-            "count": len(batches)
-        }), 200
+        start = int(cursor) + 1 if cursor is not None else 1
+        limit = int(limit) if limit is not None else None
+
+        if request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson':
+            return Response(
+                stream_with_context(_stream_batches(start, limit)),
+                mimetype='application/x-ndjson'
+            )
+
+        # Nothing changes between blocks, so a client holding this head's ETag is up to date
+        etag = _batches_etag(blockchain_service.head_block(), blockchain_service.data_generation())
+        if etag and request.if_none_match.contains(etag):
+            return _not_modified(etag)
+
+        if limit is not None or cursor is not None:
+            # Retrieve a single page
+            page_size = limit or MAX_PAGE_SIZE
+            batches = blockchain_service.get_batches_range(start, page_size)
+            if batches is None:
+                return jsonify({"error": "Failed to retrieve batches"}), 500
+
+            has_more = len(batches) == page_size
+            response = {
+                "batches": batches,
+                "count": len(batches),
+                "next_cursor": batches[-1]['id'] if has_more else None
+            }
+        else:
+            # Retrieve all batches
+            if async_blockchain_service and blockchain_service.as_of_block() is None:
+                batches = await async_blockchain_service.get_all_batches()
+            else:
+                batches = blockchain_service.get_all_batches()
+
+            if batches is None:
+                return jsonify({"error": "Failed to retrieve batches"}), 500
+
+            response = {
+                "batches": batches,
+                "count": len(batches)
+            }
+
+        as_of_block = blockchain_service.as_of_block()
+        if as_of_block is not None:
+            response["as_of_block"] = as_of_block
+
+        response = jsonify(response)
+        response.vary.add('Accept')
+        return (_with_etag(response, etag) if etag else response), 200
 
     except Exception as e:
         logger.error(f"Error retrieving all batches: {str(e)}")
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
+def _stream_batches(start: int, limit: Optional[int]):
+    """
+    Generate NDJSON lines for batches from start onward.
+
+    :param start: The ID of the first batch to stream
+    :param limit: Maximum number of batches to stream, or None for all
+    :return: A generator of newline-terminated JSON documents
+    """
+    try:
+        page_size = min(limit, STREAM_PAGE_SIZE) if limit else STREAM_PAGE_SIZE
+        batches = blockchain_service.iter_batches(start=start, page_size=page_size)
+        for batch in islice(batches, limit):
+            yield json.dumps(batch) + "\n"
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        logger.error(f"Error streaming batches: {str(e)}")
+        yield json.dumps({"error": "Failed to retrieve batches"}) + "\n"
+
+
+# Write job endpoints
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Get the status of a queued write job.
+
+    Status moves from "queued" to "submitted" (tx_hash known) to "mined"
+    (batch_id resolved), or to "failed" with an error message.
+
+    :param job_id: The ID of the job
+    :return: JSON response with job status
+    """
+    if not write_queue:
+        return jsonify({"error": "Write queue not available"}), 503
+
+    job = write_queue.get_job(job_id)
+    if not job:
+        return jsonify({"error": f"Job with ID {job_id} not found"}), 404
+
+    return jsonify({
+        "job_id": job['id'],
+        "operation": job['operation'],
+        "status": job['status'],
+        "tx_hash": job['tx_hash'],
+        "batch_id": job['batch_id'],
+        "error": job['error']
+    }), 200
+
+
 # AI Summary endpoint
 
 @app.route('/api/summary', methods=['GET'])
@@ -327,21 +1006,8 @@ def get_summary():
         if batches is None:
             return jsonify({"error": "Failed to retrieve batches"}), 500
 
-        # Format data for AI summary
-        raw_data = {
-            'batches': [
-                {
-                    'id': batch['id'],
-                    'name': batch['name'],
-                    'origin': batch['origin'],
-                    'tracking_history': batch['tracking_history']
-                }
-                for batch in batches
-            ]
-        }
-
         # Generate summary
-        summary = generate_summary(raw_data)
+        summary = generate_summary(_summary_input(batches))
 
         return jsonify({
             "summary": summary,
@@ -353,6 +1019,79 @@ def get_summary():
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
+@app.route('/api/summary/stream', methods=['GET'])
+def stream_summary_events():
+    """
+    Stream an AI-generated summary of all blockchain data as Server-Sent Events.
+
+    Each "message" event carries {"text": ...} with the next part of the
+    summary; a final "done" event carries the batch count, or an "error"
+    event is sent if generation fails midway.
+
+    :return: text/event-stream response
+    """
+    try:
+        # Validate blockchain service
+        if not blockchain_service:
+            return jsonify({"error": "Blockchain service not available"}), 503
+
+        if not blockchain_service.is_connected():
+            return jsonify({"error": "Not connected to blockchain"}), 503
+
+        # Retrieve all batches
+        batches = blockchain_service.get_all_batches()
+
+        if batches is None:
+            return jsonify({"error": "Failed to retrieve batches"}), 500
+
+        return Response(
+            stream_with_context(_summary_events(_summary_input(batches))),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    except Exception as e:
+        logger.error(f"Error streaming summary: {str(e)}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+
+def _summary_input(batches) -> Dict:
+    """
+    Format batches as the raw data passed to the AI summary.
+
+    :param batches: The batches retrieved from the blockchain
+    :return: The raw data dictionary
+    """
+    return {
+        'batches': [
+            {
+                'id': batch['id'],
+                'name': batch['name'],
+                'origin': batch['origin'],
+                'tracking_history': batch['tracking_history']
+            }
+            for batch in batches
+        ]
+    }
+
+
+def _summary_events(raw_data: Dict):
+    """
+    Generate Server-Sent Events for a streamed summary.
+
+    :param raw_data: The raw data to summarize
+    :return: A generator of SSE frames
+    """
+    try:
+        for chunk in stream_summary(raw_data):
+            yield f"data: {json.dumps({'text': chunk})}\n\n"
+        yield f"event: done\ndata: {json.dumps({'batch_count': len(raw_data['batches'])})}\n\n"
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        logger.error(f"Error streaming summary: {str(e)}")
+        yield f"event: error\ndata: {json.dumps({'error': 'Failed to generate summary'})}\n\n"
+
+
 # Error handlers
 
 @app.errorhandler(404)
@@ -0,0 +1,4 @@
+"""
+Benchmarks package for backend application.
+Measures the API hot paths against an in-process EVM; see benchmarks/run.py.
+"""
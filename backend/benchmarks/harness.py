@@ -0,0 +1,165 @@
+"""
+Benchmark harness: an in-process EVM running BatchTracker, plus measurement helpers.
+The service runs in inproc:// mode (eth-tester / py-evm), so benchmarks need no
+node and measure the backend's own cost per request.
+"""
+
+import logging
+import os
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from web3 import Web3
+from web3.middleware import Web3Middleware
+
+from services.blockchain import BlockchainService
+from services.inproc import seed_batches
+
+logger = logging.getLogger(__name__)
+
+SEED_STEPS = ['Harvested', 'Processed']
+SEED_ORIGINS = ['Taiwan', 'China', 'Japan', 'Thailand', 'Vietnam']
+
+# Background refreshes would show up in the RPC counts of whatever request happens to be running
+QUIET_BACKGROUND = {
+    'BLOCKCHAIN_HEALTH_INTERVAL': '3600',
+    'BLOCKCHAIN_FEE_TTL': '3600',
+    'BLOCKCHAIN_CACHE_POLL_INTERVAL': '3600',
+}
+
+
+class RPCCounter:
+    """Counts JSON-RPC requests made through a Web3 instance, by method."""
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+
+    def install(self, w3: Web3):
+        """
+        Add the counting middleware to a Web3 instance.
+
+        :param w3: The Web3 instance to instrument
+        """
+        counter = self
+
+        class CountingMiddleware(Web3Middleware):
+            def wrap_make_request(self, make_request):
+                def middleware(method, params):
+                    counter.calls[method] += 1
+                    return make_request(method, params)
+                return middleware
+
+        w3.middleware_onion.add(CountingMiddleware, name='rpc_counter')
+
+    def snapshot(self) -> Counter:
+        """Copy of the counts so far."""
+        return Counter(self.calls)
+
+
+class Chain:
+    """An in-memory EVM with a deployed BatchTracker and a BlockchainService bound to it."""
+
+    def __init__(self):
+        """Start an empty in-process chain with the contract deployed."""
+        for name, value in QUIET_BACKGROUND.items():
+            os.environ.setdefault(name, value)
+
+        self.service = BlockchainService(provider_url='inproc://')
+        self.w3 = self.service.w3
+        self.rpc = RPCCounter()
+        self.rpc.install(self.w3)
+        self.batch_count = 0
+
+    def seed(self, count: int, chunk: int = 1000, progress: Optional[Callable[[int], None]] = None):
+        """
+        Create batches with two tracking steps each until the chain holds count batches.
+
+        :param count: The total number of batches wanted
+        :param chunk: Batches generated per seeding round
+        :param progress: Optional callback receiving the batch count after each round
+        """
+        while self.batch_count < count:
+            first_id = self.batch_count + 1
+            ids = range(first_id, first_id + min(chunk, count - self.batch_count))
+            self.batch_count += seed_batches(self.w3, self.service.contract, self.service.from_address, [
+                {
+                    'name': f"Batch {batch_id}",
+                    'origin': SEED_ORIGINS[batch_id % len(SEED_ORIGINS)],
+                    'tracking_history': SEED_STEPS
+                }
+                for batch_id in ids
+            ])
+            if progress:
+                progress(self.batch_count)
+
+    def close(self):
+        """Stop the service's background threads."""
+        self.service.health_monitor.stop()
+        self.service.fee_oracle.stop()
+        if self.service.cache_watcher:
+            self.service.cache_watcher.stop()
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    Nearest-rank percentile.
+
+    :param values: Sorted sample values
+    :param pct: The percentile (0-100)
+    :return: The percentile value, or None for no samples
+    """
+    if not values:
+        return None
+    rank = max(0, min(len(values) - 1, int(round(pct / 100 * len(values))) - 1))
+    return values[rank]
+
+
+def measure(request: Callable[[int], int], iterations: int, rpc: RPCCounter) -> Dict:
+    """
+    Time a request function and count the RPC calls it makes.
+
+    Latency and RPC counts come from a plain run; peak memory from one extra,
+    traced request, so tracemalloc overhead does not distort the timings.
+
+    :param request: Callable taking the iteration number and returning the HTTP status
+    :param iterations: Number of timed requests
+    :param rpc: The counter installed on the chain's Web3 instance
+    :return: Dictionary of throughput, latency percentiles, RPC calls and peak memory
+    """
+    latencies = []
+    errors = Counter()
+    before = rpc.snapshot()
+    started = time.perf_counter()
+    for iteration in range(iterations):
+        request_started = time.perf_counter()
+        status = request(iteration)
+        latencies.append(time.perf_counter() - request_started)
+        if status >= 400:
+            errors[status] += 1
+    elapsed = time.perf_counter() - started
+    calls = rpc.snapshot() - before
+
+    tracemalloc.start()
+    try:
+        request(iterations)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'requests': iterations,
+        'errors': sum(errors.values()),
+        'error_statuses': {str(status): count for status, count in sorted(errors.items())},
+        'throughput_rps': round(iterations / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3)
+        },
+        'rpc_calls_per_request': round(sum(calls.values()) / iterations, 2),
+        'rpc_methods': {method: round(count / iterations, 2) for method, count in sorted(calls.items())},
+        'peak_memory_kb': round(peak / 1024, 1)
+    }
@@ -0,0 +1,218 @@
+"""
+Benchmark the API hot paths against an in-process EVM.
+
+Seeds the chain with each requested number of batches and measures every
+endpoint through the Flask test client, writing JSON results that can be
+compared between commits:
+
+    cd backend
+    pip install -r requirements-dev.txt
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --sizes 10,1000 --compare bench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+# Summaries must be generated locally so results do not depend on the Claude API
+os.environ.pop('CLAUDE_API_KEY', None)
+
+import app as api  # noqa: E402
+from benchmarks.harness import Chain, measure  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10, 1000, 50000]
+DEFAULT_REQUESTS = 50
+
+# Requests for endpoints that read every batch are scaled down as the chain grows
+FULL_SCAN_BUDGET = 20000
+
+
+def scenarios(client, size: int, requests: int) -> List[Dict]:
+    """
+    Build the endpoint scenarios for a chain of the given size.
+
+    :param client: The Flask test client
+    :param size: The number of batches on the chain
+    :param requests: Requests per scenario for endpoints that do not scale with the chain
+    :return: List of scenarios with name, request callable and iteration count
+    """
+    full_scan_requests = max(1, min(requests, FULL_SCAN_BUDGET // size))
+
+    def get(url: Callable[[int], str]) -> Callable[[int], int]:
+        return lambda i: client.get(url(i)).status_code
+
+    def post(url: Callable[[int], str], body: Callable[[int], Dict]) -> Callable[[int], int]:
+        return lambda i: client.post(url(i), json=body(i)).status_code
+
+    return [
+        {'endpoint': 'GET /api/batches', 'iterations': full_scan_requests,
+         'request': get(lambda i: '/api/batches')},
+        {'endpoint': 'GET /api/batches?limit=100', 'iterations': requests,
+         'request': get(lambda i: f'/api/batches?limit=100&cursor={(i * 100) % size}')},
+        {'endpoint': 'GET /api/batch/<id>', 'iterations': requests,
+         'request': get(lambda i: f'/api/batch/{(i * 7919) % size + 1}')},
+        {'endpoint': 'GET /api/summary', 'iterations': full_scan_requests,
+         'request': get(lambda i: '/api/summary')},
+        {'endpoint': 'POST /api/batch', 'iterations': requests,
+         'request': post(lambda i: '/api/batch', lambda i: {'name': f'Bench {i}', 'origin': 'Taiwan'})},
+        {'endpoint': 'POST /api/batch/<id>/tracking', 'iterations': requests,
+         'request': post(lambda i: f'/api/batch/{(i * 7919) % size + 1}/tracking', lambda i: {'step': 'Shipped'})},
+    ]
+
+
+class BenchmarkError(RuntimeError):
+    """A scenario's requests failed, so its timings do not measure the endpoint."""
+
+
+def run(sizes: List[int], requests: int, keep_going: bool = False) -> Dict:
+    """
+    Run every scenario at every chain size.
+
+    A scenario with failed requests aborts the run, since error responses are
+    timed as if they were served; with keep_going it is marked invalid instead.
+
+    :param sizes: Chain sizes (numbers of batches) to benchmark, in increasing order
+    :param requests: Requests per scenario
+    :param keep_going: Record failing scenarios as invalid instead of aborting
+    :return: The benchmark report
+    :raises BenchmarkError: If a scenario had failed requests and keep_going is False
+    """
+    logger.info("Starting in-process chain")
+    chain = Chain()
+    api.blockchain_service = chain.service
+    api.write_queue = None  # measure inline writes
+    api.app.config['TESTING'] = True
+
+    results = []
+    try:
+        with api.app.test_client() as client:
+            for size in sorted(sizes):
+                started = time.perf_counter()
+                chain.seed(size, progress=lambda count: logger.debug(f"Seeded {count} batches"))
+                logger.info(f"Seeded {size} batches in {time.perf_counter() - started:.1f}s")
+
+                for scenario in scenarios(client, size, requests):
+                    batches = chain.service.get_batch_count()
+                    result = measure(scenario['request'], scenario['iterations'], chain.rpc)
+                    result['valid'] = result['errors'] == 0
+                    results.append({'endpoint': scenario['endpoint'], 'batches': batches, **result})
+                    if not result['valid']:
+                        message = (f"{scenario['endpoint']} at {size} batches: {result['errors']} of "
+                                   f"{result['requests']} requests failed (statuses {result['error_statuses']})")
+                        if not keep_going:
+                            raise BenchmarkError(message)
+                        logger.error(f"{message}; scenario marked invalid")
+                    logger.info(
+                        f"{size:>6} {scenario['endpoint']:<32} p50 {result['latency_ms']['p50']:>10.3f} ms  "
+                        f"p99 {result['latency_ms']['p99']:>10.3f} ms  {result['throughput_rps']:>8} req/s  "
+                        f"{result['rpc_calls_per_request']:>8} rpc/req"
+                    )
+                # Writes above added batches; account for them before seeding the next size
+                chain.batch_count = chain.service.get_batch_count()
+    finally:
+        chain.close()
+
+    return {
+        'commit': _git_commit(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': sorted(sizes),
+        'valid': all(result['valid'] for result in results),
+        'results': results
+    }
+
+
+def compare(current: Dict, baseline: Dict) -> List[str]:
+    """
+    Compare two reports scenario by scenario.
+
+    :param current: The new report
+    :param baseline: The report to compare against
+    :return: Table lines with p50/p99 latency and throughput changes
+    """
+    previous = {(r['endpoint'], _size_bucket(r['batches'], baseline['sizes'])): r for r in baseline['results']}
+    lines = [f"{'batches':>7}  {'endpoint':<32} {'p50':>9} {'p99':>9} {'req/s':>9} {'rpc/req':>9}"]
+    for result in current['results']:
+        key = (result['endpoint'], _size_bucket(result['batches'], current['sizes']))
+        old = previous.get(key)
+        if not old:
+            continue
+        if not result.get('valid', True) or not old.get('valid', True):
+            lines.append(f"{key[1]:>7}  {result['endpoint']:<32} {'invalid (requests failed)':>39}")
+            continue
+        lines.append(
+            f"{key[1]:>7}  {result['endpoint']:<32} "
+            f"{_change(old['latency_ms']['p50'], result['latency_ms']['p50']):>9} "
+            f"{_change(old['latency_ms']['p99'], result['latency_ms']['p99']):>9} "
+            f"{_change(old['throughput_rps'], result['throughput_rps']):>9} "
+            f"{_change(old['rpc_calls_per_request'], result['rpc_calls_per_request']):>9}"
+        )
+    return lines
+
+
+def _size_bucket(batches: int, sizes: List[int]) -> int:
+    """The seeded size a measurement belongs to (writes add a few batches on top)."""
+    return max([size for size in sizes if size <= batches] or [sizes[0]])
+
+
+def _change(old, new) -> str:
+    """Relative change between two measurements, as a signed percentage."""
+    if not old or new is None:
+        return 'n/a'
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def _git_commit() -> str:
+    """The commit being benchmarked, if run from a git checkout."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return 'unknown'
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the BobaChain API against an in-process EVM")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated numbers of batches to seed (default: %(default)s)")
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS,
+                        help="requests per endpoint (default: %(default)s; full scans use fewer on large chains)")
+    parser.add_argument('--output', default='benchmark-results.json', help="where to write the JSON report")
+    parser.add_argument('--compare', help="a previous JSON report to compare against")
+    parser.add_argument('--keep-going', action='store_true',
+                        help="mark scenarios with failed requests invalid instead of aborting")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    # The service logs every transaction; keep the benchmark output readable
+    logging.getLogger('services').setLevel(logging.WARNING)
+    logging.getLogger('app').setLevel(logging.WARNING)
+
+    try:
+        report = run([int(size) for size in args.sizes.split(',')], max(1, args.requests), args.keep_going)
+    except BenchmarkError as e:
+        logger.error(f"Benchmark aborted, no results written: {str(e)}")
+        return 1
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {baseline.get('commit', 'unknown')[:12]}:")
+        print("\n".join(compare(report, baseline)))
+    return 0 if report['valid'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
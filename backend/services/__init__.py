@@ -4,5 +4,6 @@ Contains reusable service classes for blockchain and AI interactions.
 """
 
 from .blockchain import BlockchainService
+from .async_blockchain import AsyncBlockchainService
 
-__all__ = ['BlockchainService']
+__all__ = ['BlockchainService', 'AsyncBlockchainService']
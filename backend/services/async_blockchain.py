@@ -0,0 +1,265 @@
+"""
+Asynchronous blockchain service built on AsyncWeb3.
+Mirrors the public read/write methods of BlockchainService, but fans reads out
+concurrently so fetching many batches overlaps network latency.
+
+Used by the async GET /api/batches view when ASYNC_READS is enabled (Flask
+runs async views through asgiref):
+
+    batches = await async_blockchain_service.get_all_batches()
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+from typing import Dict, List, Optional
+
+from web3 import AsyncWeb3, Web3
+
+from .blockchain import BlockchainService
+from .fee_oracle import FeeOracle
+from .nonce_manager import NonceManager
+from .step_dictionary import StepDictionary
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBlockchainService:
+    """Async counterpart of BlockchainService for the BatchTracker smart contract."""
+
+    def __init__(self, provider_url: str = "http://localhost:8545", contract_address: Optional[str] = None,
+                 max_concurrency: Optional[int] = None):
+        """
+        Initialize the async blockchain service. No network calls are made until a method is awaited.
+
+        :param provider_url: The URL of the blockchain provider (default: local Ganache)
+        :param contract_address: The address of the deployed BatchTracker contract
+        :param max_concurrency: Maximum in-flight reads during fan-out (default: BLOCKCHAIN_ASYNC_CONCURRENCY)
+        """
+        self.w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(
+            provider_url,
+            request_kwargs={'timeout': float(os.getenv('BLOCKCHAIN_HTTP_TIMEOUT', '10'))}
+        ))
+        self.provider_url = provider_url
+        self.contract_address = contract_address
+        self.max_concurrency = max_concurrency or int(os.getenv('BLOCKCHAIN_ASYNC_CONCURRENCY', '32'))
+        self.private_key = os.getenv('BLOCKCHAIN_PRIVATE_KEY')  # Optional private key for signing
+        self.from_address = os.getenv('BLOCKCHAIN_FROM_ADDRESS')  # Optional from address
+        self.nonce_manager = NonceManager(self.w3)
+        self.fee_oracle = FeeOracle(
+            self.w3,
+            ttl=float(os.getenv('BLOCKCHAIN_FEE_TTL', '15')),
+            mode=os.getenv('BLOCKCHAIN_FEE_MODE', 'auto')
+        )
+        # One registration lock per event loop: asyncio primitives are bound to the loop they wait on
+        self._registration_locks = weakref.WeakKeyDictionary()
+        self.contract = None
+        self.contract_abi = None
+        self.step_dictionary = StepDictionary()
+
+        try:
+            self.contract_abi = BlockchainService.load_contract_abi()
+            if self.contract_address:
+                self.contract = self.w3.eth.contract(
+                    address=Web3.to_checksum_address(self.contract_address),
+                    abi=self.contract_abi
+                )
+                logger.info(f"Contract loaded at address: {self.contract_address}")
+        except Exception as e:
+            logger.error(f"Error loading contract: {str(e)}")
+
+    async def is_connected(self) -> bool:
+        """
+        Check if the service is connected to the blockchain.
+
+        :return: True if connected, False otherwise
+        """
+        try:
+            return await self.w3.is_connected()
+        except Exception as e:
+            logger.error(f"Error checking connection: {str(e)}")
+            return False
+
+    async def get_batch_count(self) -> Optional[int]:
+        """
+        Get the total number of batches on the blockchain.
+
+        :return: The batch count or None if there's an error
+        """
+        try:
+            if not self.contract:
+                logger.error("Contract not loaded")
+                return None
+            return await self.contract.functions.batchCount().call()
+        except Exception as e:
+            logger.error(f"Error getting batch count: {str(e)}")
+            return None
+
+    async def get_batch(self, batch_id: int) -> Optional[Dict]:
+        """
+        Retrieve batch information from the blockchain.
+
+        :param batch_id: The ID of the batch to retrieve
+        :return: A dictionary with batch information or None if there's an error
+        """
+        try:
+            if not self.contract:
+                raise ValueError("Contract not loaded")
+
+            batch_data = await self.contract.functions.getBatchHistory(batch_id).call()
+            if not self.step_dictionary.knows(batch_data[2]):
+                await self._refresh_step_dictionary()
+            return BlockchainService._format_batch(batch_id, batch_data, self.step_dictionary.decode(batch_data[2]))
+        except Exception as e:
+            logger.error(f"Error retrieving batch {batch_id}: {str(e)}")
+            return None
+
+    async def get_all_batches(self) -> Optional[List[Dict]]:
+        """
+        Retrieve all batches from the blockchain, with up to max_concurrency reads in flight.
+
+        :return: A list of batch dictionaries or None if there's an error
+        """
+        try:
+            batch_count = await self.get_batch_count()
+            if batch_count is None or batch_count == 0:
+                return []
+
+            # Created per call: asyncio primitives are bound to the running event loop
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def fetch(batch_id: int) -> Optional[Dict]:
+                async with semaphore:
+                    return await self.get_batch(batch_id)
+
+            results = await asyncio.gather(*(fetch(batch_id) for batch_id in range(1, batch_count + 1)))
+            return [batch for batch in results if batch]
+        except Exception as e:
+            logger.error(f"Error retrieving all batches: {str(e)}")
+            return None
+
+    async def _send_transaction(self, contract_function, sender: str, gas: int = 2000000) -> str:
+        """
+        Build, sign and send a contract transaction using a locally allocated nonce.
+
+        :param contract_function: The bound contract function to call
+        :param sender: The address to send the transaction from
+        :param gas: The gas limit for the transaction
+        :return: The transaction hash as a hex string
+        """
+        for attempt in range(2):
+            nonce = await self.nonce_manager.allocate_async(sender)
+            try:
+                fee_params = await self.fee_oracle.get_fee_params_async()
+                tx = await contract_function.build_transaction({
+                    'from': sender,
+                    'gas': gas,
+                    'nonce': nonce,
+                    **fee_params
+                })
+
+                if self.private_key:
+                    signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=self.private_key)
+                    tx_hash = await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+                else:
+                    tx_hash = await self.w3.eth.send_transaction(tx)
+
+                return tx_hash.hex()
+            except Exception as e:
+                self.nonce_manager.resync(sender)
+                if attempt == 0 and NonceManager.is_nonce_error(e):
+                    logger.warning(f"Nonce {nonce} rejected for {sender}; resyncing and retrying: {str(e)}")
+                    continue
+                raise
+
+    async def _refresh_step_dictionary(self):
+        """Fetch the step names registered on chain since the last refresh."""
+        from_code = len(self.step_dictionary)
+        names = await self.contract.functions.getStepNames(from_code).call()
+        self.step_dictionary.extend(from_code, names)
+
+    async def _ensure_step_registered(self, step: str, sender: str):
+        """Register a step name on chain unless it is already in the dictionary."""
+        if not self.step_dictionary.missing([step]):
+            return
+
+        loop = asyncio.get_running_loop()
+        lock = self._registration_locks.get(loop)
+        if lock is None:
+            lock = self._registration_locks[loop] = asyncio.Lock()
+
+        # Serialized so concurrent writers of a new step send one registerSteps, not one each
+        async with lock:
+            if self.step_dictionary.missing([step]):
+                await self._refresh_step_dictionary()
+            if self.step_dictionary.missing([step]):
+                registration = await self._send_transaction(self.contract.functions.registerSteps([step]), sender)
+                await self.w3.eth.wait_for_transaction_receipt(registration)
+                await self._refresh_step_dictionary()
+
+    async def _default_sender(self) -> Optional[str]:
+        """Resolve the configured sender, or the node's first unlocked account."""
+        if not self.from_address:
+            accounts = await self.w3.eth.accounts
+            if accounts:
+                self.from_address = accounts[0]
+        return self.from_address
+
+    async def create_batch(self, name: str, origin: str, from_address: Optional[str] = None) -> Optional[str]:
+        """
+        Create a new batch on the blockchain.
+
+        :param name: The name of the batch
+        :param origin: The origin of the batch
+        :param from_address: The address to send the transaction from (uses default if not provided)
+        :return: The transaction hash or None if there's an error
+        """
+        try:
+            if not self.contract:
+                raise ValueError("Contract not loaded")
+
+            sender = from_address or await self._default_sender()
+            if not sender:
+                raise ValueError("No sender address available")
+
+            tx_hash = await self._send_transaction(self.contract.functions.createBatch(name, origin), sender)
+
+            logger.info(f"Batch created with transaction hash: {tx_hash}")
+            return tx_hash
+        except Exception as e:
+            logger.error(f"Error creating batch: {str(e)}")
+            return None
+
+    async def add_tracking_step(self, batch_id: int, step: str, from_address: Optional[str] = None,
+                                note: str = '') -> Optional[str]:
+        """
+        Add a tracking step to a batch on the blockchain.
+
+        :param batch_id: The ID of the batch
+        :param step: The tracking step to add (registered in the step dictionary first if it is new)
+        :param from_address: The address to send the transaction from (uses default if not provided)
+        :param note: Optional free text recorded with the step in the event log
+        :return: The transaction hash or None if there's an error
+        """
+        try:
+            if not self.contract:
+                raise ValueError("Contract not loaded")
+
+            sender = from_address or await self._default_sender()
+            if not sender:
+                raise ValueError("No sender address available")
+
+            await self._ensure_step_registered(step, sender)
+            step_code = self.step_dictionary.encode([step])[0]
+
+            tx_hash = await self._send_transaction(
+                self.contract.functions.addTrackingStep(batch_id, step_code, note),
+                sender
+            )
+
+            logger.info(f"Tracking step added with transaction hash: {tx_hash}")
+            return tx_hash
+        except Exception as e:
+            logger.error(f"Error adding tracking step: {str(e)}")
+            return None
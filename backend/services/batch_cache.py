@@ -0,0 +1,206 @@
+"""
+Read-through cache for batches read from the blockchain.
+Batch name and origin never change and tracking history only grows, so a
+cached batch stays valid until a TrackingStepAdded event for it is seen.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BatchCache:
+    """Bounded LRU cache of batch dictionaries with TTL expiry and usage counters."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        """
+        Initialize the cache.
+
+        :param max_size: Maximum number of cached batches before the least recently used is evicted
+        :param ttl: Seconds a cached batch is trusted without an invalidation (covers missed events)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped on every invalidation; read it before fetching a batch to pass to put()."""
+        with self._lock:
+            return self._generation
+
+    def get(self, batch_id: int) -> Optional[Dict]:
+        """
+        Look up a cached batch.
+
+        :param batch_id: The ID of the batch
+        :return: A copy of the cached batch, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(batch_id)
+            if entry is None or time.monotonic() - entry[1] >= self.ttl:
+                if entry is not None:
+                    del self._entries[batch_id]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(batch_id)
+            self._hits += 1
+            batch = entry[0]
+        return {**batch, 'tracking_history': list(batch['tracking_history'])}
+
+    def step_count(self, batch_id: int) -> Optional[int]:
+        """
+        Read the tracking history length of a cached batch without touching LRU order or counters.
+
+        :param batch_id: The ID of the batch
+        :return: The number of tracking steps, or None if the batch is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(batch_id)
+            if entry is None or time.monotonic() - entry[1] >= self.ttl:
+                return None
+            return len(entry[0]['tracking_history'])
+
+    def put(self, batch_id: int, batch: Dict, generation: Optional[int] = None):
+        """
+        Store a batch, evicting the least recently used one if the cache is full.
+
+        :param batch_id: The ID of the batch
+        :param batch: The batch dictionary
+        :param generation: The generation read before the batch was fetched; if an invalidation
+                           happened since, the batch may be stale and is not stored
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[batch_id] = ({**batch, 'tracking_history': list(batch['tracking_history'])}, time.monotonic())
+            self._entries.move_to_end(batch_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, batch_id: int):
+        """
+        Drop a batch whose tracking history changed.
+
+        :param batch_id: The ID of the batch
+        """
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(batch_id, None) is not None:
+                self._invalidations += 1
+
+    def clear(self):
+        """Drop every cached batch."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """
+        Report cache usage.
+
+        :return: A dictionary with size, limits and hit/miss/eviction/invalidation counters
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else None,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations
+            }
+
+
+class StepEventWatcher:
+    """Follows TrackingStepAdded logs and invalidates the affected cached batches."""
+
+    def __init__(self, w3, contract, cache: BatchCache, poll_interval: float = 2.0, max_block_range: int = 2000):
+        """
+        Initialize the watcher.
+
+        :param w3: A connected Web3 instance
+        :param contract: The BatchTracker contract instance
+        :param cache: The cache to invalidate
+        :param poll_interval: Seconds between eth_getLogs polls
+        :param max_block_range: Maximum number of blocks requested per eth_getLogs call
+        """
+        self.w3 = w3
+        self.contract = contract
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.max_block_range = max_block_range
+        self.last_block: Optional[int] = None
+        event_abi = next(
+            item for item in contract.abi
+            if item.get('type') == 'event' and item.get('name') == 'TrackingStepAdded'
+        )
+        signature = f"TrackingStepAdded({','.join(arg['type'] for arg in event_abi['inputs'])})"
+        self._topic = w3.to_hex(w3.keccak(text=signature))
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self):
+        """Invalidate batches with tracking steps added since the last poll."""
+        head = self.w3.eth.block_number
+        if self.last_block is None:
+            # Anything cached from now on was read at or after this head
+            self.last_block = head
+            return
+        if head <= self.last_block:
+            return
+
+        event = self.contract.events.TrackingStepAdded()
+        # Catch up in bounded windows after a stall; progress is kept per window
+        while self.last_block < head:
+            to_block = min(self.last_block + self.max_block_range, head)
+            logs = self.w3.eth.get_logs({
+                'address': self.contract.address,
+                'fromBlock': self.last_block + 1,
+                'toBlock': to_block,
+                'topics': [self._topic],
+            })
+            for log in logs:
+                self.cache.invalidate(event.process_log(log)['args']['batchId'])
+            self.last_block = to_block
+
+    def start(self):
+        """Start polling in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="batch-cache-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error watching tracking step events: {str(e)}")
+                # Events may have been missed; cached batches can no longer be trusted
+                self.cache.clear()
+            self._stop_event.wait(self.poll_interval)
@@ -4,13 +4,42 @@ Handles Web3 connections, contract interactions, and blockchain data retrieval.
 """
 
 from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from web3.logs import DISCARD
+from eth_abi import decode, encode
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 import json
 import os
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 import logging
 
+from .batch_cache import BatchCache, StepEventWatcher
+from .fee_oracle import FeeOracle
+from .health_monitor import HealthMonitor
+from .http_pool import build_session
+from .indexer import BatchIndexer
+from .inproc import fixtures_path, is_inproc_url, load_fixtures, seed_batches, start_chain
+from .metrics import track_rpc
+from .request_trace import install_rpc_tracing, record_rpc
+from .step_dictionary import StepDictionary
+from .nonce_manager import NonceManager
+
 logger = logging.getLogger(__name__)
 
+# Error messages providers use when an eth_getLogs range returns too many results
+LOG_LIMIT_ERRORS = (
+    'more than',
+    'limit exceeded',
+    'response size',
+    'too many',
+    'range is too large',
+    'range too large',
+    'block range',
+)
+
 
 class BlockchainService:
     """Service for interacting with the BatchTracker smart contract on the blockchain."""
@@ -19,14 +48,54 @@ class BlockchainService:
         """
         Initialize the blockchain service.
 
-        :param provider_url: The URL of the blockchain provider (default: local Ganache)
+        :param provider_url: The URL of the blockchain provider (default: local Ganache), or "inproc://"
+                             to run BatchTracker on an in-process EVM (see services/inproc.py)
         :param contract_address: The address of the deployed BatchTracker contract
         """
-        self.w3 = Web3(Web3.HTTPProvider(provider_url))
+        # Keep-alive connection pool shared by Web3 and batched JSON-RPC reads
+        self.http_timeout = float(os.getenv('BLOCKCHAIN_HTTP_TIMEOUT', '10'))
+        self._http_session = build_session(pool_size=int(os.getenv('BLOCKCHAIN_HTTP_POOL_SIZE', '20')))
+        # ABI of the contract actually deployed, when the service compiled it itself
+        self._artifact_abi: Optional[List[Dict]] = None
+        if is_inproc_url(provider_url):
+            self.w3, deployed_address, self._artifact_abi = start_chain()
+            contract_address = contract_address or deployed_address
+        else:
+            self.w3 = Web3(Web3.HTTPProvider(
+                provider_url,
+                session=self._http_session,
+                request_kwargs={'timeout': self.http_timeout}
+            ))
+        # Count and time each JSON-RPC request against the API request that made it
+        install_rpc_tracing(self.w3)
         self.provider_url = provider_url
         self.contract_address = contract_address
         self.contract = None
         self.contract_abi = None
+        self.private_key = os.getenv('BLOCKCHAIN_PRIVATE_KEY')  # Optional private key for signing
+        self.from_address = os.getenv('BLOCKCHAIN_FROM_ADDRESS')  # Optional from address
+        self.indexer: Optional[BatchIndexer] = None
+        self.nonce_manager = NonceManager(self.w3)
+        self.fee_oracle = FeeOracle(
+            self.w3,
+            ttl=float(os.getenv('BLOCKCHAIN_FEE_TTL', '15')),
+            mode=os.getenv('BLOCKCHAIN_FEE_MODE', 'auto')
+        )
+        self.rpc_batch_size = int(os.getenv('BLOCKCHAIN_RPC_BATCH_SIZE', '100'))  # eth_calls per JSON-RPC batch
+        self.bulk_chunk_size = int(os.getenv('BLOCKCHAIN_BULK_CHUNK_SIZE', '50'))  # batches per createBatches tx
+        self.receipt_timeout = float(os.getenv('BLOCKCHAIN_RECEIPT_TIMEOUT', '120'))
+        self.receipt_poll_interval = float(os.getenv('BLOCKCHAIN_RECEIPT_POLL_INTERVAL', '0.1'))
+        self.log_max_requests = int(os.getenv('BLOCKCHAIN_LOG_MAX_REQUESTS', '64'))  # eth_getLogs per event query
+        self.log_workers = int(os.getenv('BLOCKCHAIN_LOG_WORKERS', '4'))  # concurrent eth_getLogs ranges
+        self.health_monitor = HealthMonitor(self.w3, interval=float(os.getenv('BLOCKCHAIN_HEALTH_INTERVAL', '5')))
+        self.batch_cache = BatchCache(
+            max_size=int(os.getenv('BLOCKCHAIN_CACHE_SIZE', '1024')),
+            ttl=float(os.getenv('BLOCKCHAIN_CACHE_TTL', '300'))
+        )
+        self.cache_watcher: Optional[StepEventWatcher] = None
+        # Tracking steps are stored on chain as codes into the contract's step dictionary
+        self.step_dictionary = StepDictionary()
+        self._step_registration_lock = threading.Lock()
 
         # Attempt to connect and load the contract
         try:
@@ -35,186 +104,152 @@ class BlockchainService:
             else:
                 logger.info(f"Successfully connected to blockchain at {provider_url}")
                 self._load_contract()
+                self._setup_sender_account()
+                if is_inproc_url(provider_url):
+                    self._seed_fixtures()
+                self._start_indexer()
+                self._start_cache_invalidation()
+                self.fee_oracle.start()
         except Exception as e:
             logger.error(f"Error initializing blockchain service: {str(e)}")
 
-    def _load_contract(self):
-        """Load the BatchTracker contract ABI and initialize the contract instance."""
+        # Probe the provider in the background so is_connected() needs no round trip
+        self.health_monitor.start()
+
+    def _setup_sender_account(self):
+        """Setup the sender account for transactions."""
         try:
-            # Try to load the contract ABI from a JSON file
-            abi_path = os.path.join(os.path.dirname(__file__), "..", "..", "contracts", "BatchTracker.json")
-            
-            # Fallback to a basic ABI definition if file doesn't exist
-            if os.path.exists(abi_path):
-                with open(abi_path, 'r') as f:
-                    contract_data = json.load(f)
-                    self.contract_abi = contract_data.get('abi', contract_data)
+            # Use configured address if provided
+            if self.from_address:
+                self.from_address = Web3.to_checksum_address(self.from_address)
+                logger.info(f"Using configured sender address: {self.from_address}")
             else:
-                # Minimal ABI for the functions we need
-                self.contract_abi = self._get_default_abi()
+                # Default to first available account (Ganache has unlocked accounts by default)
+                accounts = self.w3.eth.accounts
+                if accounts:
+                    self.from_address = accounts[0]
+                    logger.info(f"Using default sender address: {self.from_address}")
+                else:
+                    logger.warning("No accounts available on blockchain")
+        except Exception as e:
+            logger.error(f"Error setting up sender account: {str(e)}")
 
-            if self.contract_address and self.contract_abi:
-                self.contract = self.w3.eth.contract(
-                    address=Web3.to_checksum_address(self.contract_address),
-                    abi=self.contract_abi
-                )
-                logger.info(f"Contract loaded at address: {self.contract_address}")
+    def _seed_fixtures(self):
+        """Seed the in-process chain from the fixture file, if one is configured."""
+        path = fixtures_path(self.provider_url)
+        if not path or not self.contract:
+            return
+        try:
+            count = seed_batches(self.w3, self.contract, self.from_address, load_fixtures(path))
+            logger.info(f"Seeded {count} batches from {path}")
         except Exception as e:
-            logger.error(f"Error loading contract: {str(e)}")
+            logger.error(f"Error seeding batches from {path}: {str(e)}")
 
-    @staticmethod
-    def _get_default_abi() -> List[Dict]:
-        """
-        Get the default ABI for the BatchTracker contract.
-        
-        :return: List of ABI definitions for BatchTracker functions
-        """
-        return [
-            {
-                "inputs": [
-                    {"internalType": "string", "name": "_name", "type": "string"},
-                    {"internalType": "string", "name": "_origin", "type": "string"}
-                ],
-                "name": "createBatch",
-                "outputs": [],
-                "stateMutability": "nonpayable",
-                "type": "function"
-            },
-            {
-                "inputs": [
-                    {"internalType": "uint256", "name": "_batchId", "type": "uint256"},
-                    {"internalType": "string", "name": "_step", "type": "string"}
-                ],
-                "name": "addTrackingStep",
-                "outputs": [],
-                "stateMutability": "nonpayable",
-                "type": "function"
-            },
-            {
-                "inputs": [{"internalType": "uint256", "name": "_batchId", "type": "uint256"}],
-                "name": "getBatchHistory",
-                "outputs": [
-                    {"internalType": "string", "name": "name", "type": "string"},
-                    {"internalType": "string", "name": "origin", "type": "string"},
-                    {"internalType": "string[]", "name": "trackingHistory", "type": "string[]"},
-                    {"internalType": "uint256", "name": "timestamp", "type": "uint256"}
-                ],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [],
-                "name": "batchCount",
-                "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
+    def _start_indexer(self):
+        """Start the local event index when BLOCKCHAIN_INDEX_DB is configured."""
+        db_path = os.getenv('BLOCKCHAIN_INDEX_DB')
+        if not db_path or not self.contract:
+            return
+        try:
+            self.indexer = BatchIndexer(
+                self.w3,
+                self.contract,
+                db_path=db_path,
+                start_block=int(os.getenv('BLOCKCHAIN_INDEX_START_BLOCK', '0')),
+                poll_interval=float(os.getenv('BLOCKCHAIN_INDEX_POLL_INTERVAL', '2'))
+            )
+            self.indexer.start()
+        except Exception as e:
+            logger.error(f"Error starting batch indexer: {str(e)}")
+            self.indexer = None
 
-    def is_connected(self) -> bool:
+    def _start_cache_invalidation(self):
+        """Drop cached batches when TrackingStepAdded events for them appear on chain."""
+        if not self.contract or self.batch_cache.max_size <= 0:
+            return
+        if self.indexer:
+            # The indexer already follows the contract's logs; reuse its feed
+            self.indexer.listeners.append(self._on_indexed_event)
+            return
+        try:
+            self.cache_watcher = StepEventWatcher(
+                self.w3,
+                self.contract,
+                self.batch_cache,
+                poll_interval=float(os.getenv('BLOCKCHAIN_CACHE_POLL_INTERVAL', '2')),
+                max_block_range=int(os.getenv('BLOCKCHAIN_CACHE_MAX_BLOCK_RANGE', '2000'))
+            )
+            self.cache_watcher.poll()
+            self.cache_watcher.start()
+        except Exception as e:
+            logger.error(f"Error starting batch cache watcher: {str(e)}")
+            self.cache_watcher = None
+
+    def _on_indexed_event(self, event_name: str, args):
+        """Indexer listener invalidating the cached batch a new tracking step belongs to."""
+        if event_name == 'TrackingStepAdded':
+            self.batch_cache.invalidate(args['batchId'])
+
+    def get_diagnostics(self) -> Dict:
         """
-        Check if the service is connected to the blockchain.
+        Collect the state of the service's background components for health reporting.
 
-        :return: True if connected, False otherwise
+        :return: A dictionary of component name to status
         """
-        try:
-            return self.w3.is_connected()
-        except Exception as e:
-            logger.error(f"Error checking connection: {str(e)}")
-            return False
+        return {
+            'connection': self.health_monitor.status(),
+            'fee_oracle': self.fee_oracle.status(),
+            'batch_cache': self.batch_cache.stats(),
+            'index_block': self.as_of_block()
+        }
 
-    def get_batch_count(self) -> Optional[int]:
+    def as_of_block(self) -> Optional[int]:
         """
-        Get the total number of batches on the blockchain.
+        Get the block number that indexed reads reflect.
 
-        :return: The batch count or None if there's an error
+        :return: The last indexed block, or None if reads go straight to the node
         """
+        if not self.indexer:
+            return None
         try:
-            if not self.contract:
-                logger.error("Contract not loaded")
-                return None
-            return self.contract.functions.batchCount().call()
+            return self.indexer.last_block
         except Exception as e:
-            logger.error(f"Error getting batch count: {str(e)}")
+            logger.error(f"Error reading index freshness: {str(e)}")
             return None
 
-"""
-Blockchain service module for interacting with the BatchTracker smart contract.
-Handles Web3 connections, contract interactions, and blockchain data retrieval.
-"""
-
-from web3 import Web3
-import json
-import os
-from typing import Dict, List, Optional
-import logging
+    def head_block(self) -> Optional[int]:
+        """
+        Get the chain head that reads currently reflect, without a round trip to the node.
 
-logger = logging.getLogger(__name__)
+        :return: The last indexed block, else the head seen by the health monitor, or None if unknown
+        """
+        as_of_block = self.as_of_block()
+        return as_of_block if as_of_block is not None else self.health_monitor.last_block
 
+    def data_generation(self) -> int:
+        """
+        Get a counter that changes whenever this service sees batch data change.
 
-class BlockchainService:
-    """Service for interacting with the BatchTracker smart contract on the blockchain."""
+        Bumped by local writes, their receipts and watched TrackingStepAdded events,
+        so it moves ahead of head_block() when the health monitor's head lags a write.
 
-    def __init__(self, provider_url: str = "http://localhost:8545", contract_address: Optional[str] = None):
+        :return: The batch cache generation
         """
-        Initialize the blockchain service.
+        return self.batch_cache.generation
 
-        :param provider_url: The URL of the blockchain provider (default: local Ganache)
-        :param contract_address: The address of the deployed BatchTracker contract
+    def cached_step_count(self, batch_id: int) -> Optional[int]:
         """
-        self.w3 = Web3(Web3.HTTPProvider(provider_url))
-        self.provider_url = provider_url
-        self.contract_address = contract_address
-        self.contract = None
-        self.contract_abi = None
-        self.private_key = os.getenv('BLOCKCHAIN_PRIVATE_KEY')  # Optional private key for signing
-        self.from_address = os.getenv('BLOCKCHAIN_FROM_ADDRESS')  # Optional from address
+        Get the tracking history length of a batch if it is cached, without a round trip to the node.
 
-        # Attempt to connect and load the contract
-        try:
-            if not self.w3.is_connected():
-                logger.warning(f"Failed to connect to blockchain provider: {provider_url}")
-            else:
-                logger.info(f"Successfully connected to blockchain at {provider_url}")
-                self._load_contract()
-                self._setup_sender_account()
-        except Exception as e:
-            logger.error(f"Error initializing blockchain service: {str(e)}")
-
-    def _setup_sender_account(self):
-        """Setup the sender account for transactions."""
-        try:
-            # Use configured address if provided
-            if self.from_address:
-                self.from_address = Web3.to_checksum_address(self.from_address)
-                logger.info(f"Using configured sender address: {self.from_address}")
-            else:
-                # Default to first available account (Ganache has unlocked accounts by default)
-                accounts = self.w3.eth.accounts
-                if accounts:
-                    self.from_address = accounts[0]
-                    logger.info(f"Using default sender address: {self.from_address}")
-                else:
-                    logger.warning("No accounts available on blockchain")
-        except Exception as e:
-            logger.error(f"Error setting up sender account: {str(e)}")
+        :param batch_id: The ID of the batch
+        :return: The number of tracking steps, or None if the batch is not cached
+        """
+        return self.batch_cache.step_count(batch_id)
 
     def _load_contract(self):
         """Load the BatchTracker contract ABI and initialize the contract instance."""
         try:
-            # Try to load the contract ABI from a JSON file
-            abi_path = os.path.join(os.path.dirname(__file__), "..", "..", "contracts", "BatchTracker.json")
-            
-            # Fallback to a basic ABI definition if file doesn't exist
-            if os.path.exists(abi_path):
-                with open(abi_path, 'r') as f:
-                    contract_data = json.load(f)
-                    self.contract_abi = contract_data.get('abi', contract_data)
-                logger.info(f"Loaded contract ABI from {abi_path}")
-            else:
-                # Minimal ABI for the functions we need
-                self.contract_abi = self._get_default_abi()
-                logger.info("Using default contract ABI")
+            self.contract_abi = self._artifact_abi or self.load_contract_abi()
 
             if self.contract_address and self.contract_abi:
                 self.contract = self.w3.eth.contract(
@@ -225,6 +260,27 @@ class BlockchainService:
         except Exception as e:
             logger.error(f"Error loading contract: {str(e)}")
 
+    @staticmethod
+    def load_contract_abi() -> List[Dict]:
+        """
+        Load the BatchTracker ABI from contracts/BatchTracker.json, or the default ABI if it is missing.
+
+        :return: List of ABI definitions
+        """
+        # Try to load the contract ABI from a JSON file
+        abi_path = os.path.join(os.path.dirname(__file__), "..", "..", "contracts", "BatchTracker.json")
+        
+        # Fallback to a basic ABI definition if file doesn't exist
+        if os.path.exists(abi_path):
+            with open(abi_path, 'r') as f:
+                contract_data = json.load(f)
+            logger.info(f"Loaded contract ABI from {abi_path}")
+            return contract_data.get('abi', contract_data)
+
+        # Minimal ABI for the functions we need
+        logger.info("Using default contract ABI")
+        return BlockchainService._get_default_abi()
+
     @staticmethod
     def _get_default_abi() -> List[Dict]:
         """
@@ -243,24 +299,102 @@ class BlockchainService:
                 "stateMutability": "nonpayable",
                 "type": "function"
             },
+            {
+                "inputs": [
+                    {"internalType": "string[]", "name": "_names", "type": "string[]"},
+                    {"internalType": "string[]", "name": "_origins", "type": "string[]"}
+                ],
+                "name": "createBatches",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
             {
                 "inputs": [
                     {"internalType": "uint256", "name": "_batchId", "type": "uint256"},
-                    {"internalType": "string", "name": "_step", "type": "string"}
+                    {"internalType": "uint16", "name": "_stepCode", "type": "uint16"},
+                    {"internalType": "string", "name": "_note", "type": "string"}
                 ],
                 "name": "addTrackingStep",
                 "outputs": [],
                 "stateMutability": "nonpayable",
                 "type": "function"
             },
+            {
+                "inputs": [
+                    {"internalType": "uint256[]", "name": "_batchIds", "type": "uint256[]"},
+                    {"internalType": "uint16[]", "name": "_stepCodes", "type": "uint16[]"}
+                ],
+                "name": "addTrackingSteps",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
+            {
+                "inputs": [{"internalType": "string", "name": "_step", "type": "string"}],
+                "name": "registerStep",
+                "outputs": [{"internalType": "uint16", "name": "", "type": "uint16"}],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
+            {
+                "inputs": [{"internalType": "string[]", "name": "_steps", "type": "string[]"}],
+                "name": "registerSteps",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
+            {
+                "inputs": [{"internalType": "uint256", "name": "_fromCode", "type": "uint256"}],
+                "name": "getStepNames",
+                "outputs": [{"internalType": "string[]", "name": "", "type": "string[]"}],
+                "stateMutability": "view",
+                "type": "function"
+            },
+            {
+                "inputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+                "name": "stepNames",
+                "outputs": [{"internalType": "string", "name": "", "type": "string"}],
+                "stateMutability": "view",
+                "type": "function"
+            },
             {
                 "inputs": [{"internalType": "uint256", "name": "_batchId", "type": "uint256"}],
                 "name": "getBatchHistory",
                 "outputs": [
-                    {"internalType": "string", "name": "name", "type": "string"},
-                    {"internalType": "string", "name": "origin", "type": "string"},
-                    {"internalType": "string[]", "name": "trackingHistory", "type": "string[]"},
-                    {"internalType": "uint256", "name": "timestamp", "type": "uint256"}
+                    {
+                        "components": [
+                            {"internalType": "string", "name": "name", "type": "string"},
+                            {"internalType": "string", "name": "origin", "type": "string"},
+                            {"internalType": "uint16[]", "name": "trackingHistory", "type": "uint16[]"},
+                            {"internalType": "uint256", "name": "timestamp", "type": "uint256"}
+                        ],
+                        "internalType": "struct BatchTracker.Batch",
+                        "name": "",
+                        "type": "tuple"
+                    }
+                ],
+                "stateMutability": "view",
+                "type": "function"
+            },
+            {
+                "inputs": [
+                    {"internalType": "uint256", "name": "_fromId", "type": "uint256"},
+                    {"internalType": "uint256", "name": "_count", "type": "uint256"}
+                ],
+                "name": "getBatches",
+                "outputs": [
+                    {
+                        "components": [
+                            {"internalType": "string", "name": "name", "type": "string"},
+                            {"internalType": "string", "name": "origin", "type": "string"},
+                            {"internalType": "uint16[]", "name": "trackingHistory", "type": "uint16[]"},
+                            {"internalType": "uint256", "name": "timestamp", "type": "uint256"}
+                        ],
+                        "internalType": "struct BatchTracker.Batch[]",
+                        "name": "",
+                        "type": "tuple[]"
+                    }
                 ],
                 "stateMutability": "view",
                 "type": "function"
@@ -271,6 +405,35 @@ class BlockchainService:
                 "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
                 "stateMutability": "view",
                 "type": "function"
+            },
+            {
+                "anonymous": False,
+                "inputs": [
+                    {"indexed": True, "internalType": "uint256", "name": "batchId", "type": "uint256"},
+                    {"indexed": False, "internalType": "string", "name": "name", "type": "string"},
+                    {"indexed": False, "internalType": "string", "name": "origin", "type": "string"}
+                ],
+                "name": "BatchCreated",
+                "type": "event"
+            },
+            {
+                "anonymous": False,
+                "inputs": [
+                    {"indexed": False, "internalType": "uint16", "name": "code", "type": "uint16"},
+                    {"indexed": False, "internalType": "string", "name": "step", "type": "string"}
+                ],
+                "name": "StepRegistered",
+                "type": "event"
+            },
+            {
+                "anonymous": False,
+                "inputs": [
+                    {"indexed": True, "internalType": "uint256", "name": "batchId", "type": "uint256"},
+                    {"indexed": True, "internalType": "uint16", "name": "stepCode", "type": "uint16"},
+                    {"indexed": False, "internalType": "string", "name": "note", "type": "string"}
+                ],
+                "name": "TrackingStepAdded",
+                "type": "event"
             }
         ]
 
@@ -278,9 +441,13 @@ class BlockchainService:
         """
         Check if the service is connected to the blockchain.
 
+        Answered from the health monitor's latest probe while it is running.
+
         :return: True if connected, False otherwise
         """
         try:
+            if self.health_monitor.running:
+                return self.health_monitor.connected
             return self.w3.is_connected()
         except Exception as e:
             logger.error(f"Error checking connection: {str(e)}")
@@ -296,11 +463,57 @@ class BlockchainService:
             if not self.contract:
                 logger.error("Contract not loaded")
                 return None
-            return self.contract.functions.batchCount().call()
+            with track_rpc('batchCount'):
+                return self.contract.functions.batchCount().call()
         except Exception as e:
             logger.error(f"Error getting batch count: {str(e)}")
             return None
 
+    def _send_transaction(self, contract_function, sender: str, gas: int = 2000000) -> str:
+        """
+        Build, sign and send a contract transaction using a locally allocated nonce.
+
+        If the node rejects the nonce, the sender's nonce is resynced from the
+        chain and the transaction is retried once.
+
+        :param contract_function: The bound contract function to call
+        :param sender: The address to send the transaction from
+        :param gas: The gas limit for the transaction
+        :return: The transaction hash as a hex string
+        """
+        for attempt in range(2):
+            nonce = self.nonce_manager.allocate(sender)
+            try:
+                # Build the transaction
+                fee_params = self.fee_oracle.get_fee_params()
+                with track_rpc('build_transaction'):
+                    tx = contract_function.build_transaction({
+                        'from': sender,
+                        'gas': gas,
+                        'nonce': nonce,
+                        **fee_params
+                    })
+
+                # Sign and send the transaction
+                if self.private_key:
+                    # If private key is provided, sign with it
+                    signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=self.private_key)
+                    with track_rpc('send_raw_transaction'):
+                        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+                else:
+                    # Otherwise, use Ganache's unlocked account (no signature needed)
+                    with track_rpc('send_transaction'):
+                        tx_hash = self.w3.eth.send_transaction(tx)
+
+                return tx_hash.hex()
+            except Exception as e:
+                # The nonce was not consumed (or is stale), so later allocations must re-read it
+                self.nonce_manager.resync(sender)
+                if attempt == 0 and NonceManager.is_nonce_error(e):
+                    logger.warning(f"Nonce {nonce} rejected for {sender}; resyncing and retrying: {str(e)}")
+                    continue
+                raise
+
     def create_batch(self, name: str, origin: str, from_address: Optional[str] = None) -> Optional[str]:
         """
         Create a new batch on the blockchain.
@@ -318,36 +531,197 @@ class BlockchainService:
             if not sender:
                 raise ValueError("No sender address available")
 
-            # Build the transaction
-            tx = self.contract.functions.createBatch(name, origin).build_transaction({
-                'from': sender,
-                'gas': 2000000,
-                'gasPrice': self.w3.eth.gas_price,
-                'nonce': self.w3.eth.get_transaction_count(sender)
-            })
-
-            # Sign and send the transaction
-            if self.private_key:
-                # If private key is provided, sign with it
-                signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=self.private_key)
-                tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            else:
-                # Otherwise, use Ganache's unlocked account (no signature needed)
-                tx_hash = self.w3.eth.send_transaction(tx)
+            tx_hash = self._send_transaction(self.contract.functions.createBatch(name, origin), sender)
 
-            logger.info(f"Batch created with transaction hash: {tx_hash.hex()}")
-            return tx_hash.hex()
+            logger.info(f"Batch created with transaction hash: {tx_hash}")
+            return tx_hash
         except Exception as e:
             logger.error(f"Error creating batch: {str(e)}")
             return None
 
-    def add_tracking_step(self, batch_id: int, step: str, from_address: Optional[str] = None) -> Optional[str]:
+    def create_batches(self, names: List[str], origins: List[str], from_address: Optional[str] = None,
+                       chunk_size: Optional[int] = None) -> Optional[List[Dict]]:
+        """
+        Create many batches with createBatches, split into chunks that fit in a block.
+
+        Chunks are sent back to back and then awaited, so the assigned batch IDs
+        can be read from each chunk's BatchCreated logs.
+
+        :param names: The names of the batches
+        :param origins: The origins of the batches, parallel to names
+        :param from_address: The address to send the transactions from (uses default if not provided)
+        :param chunk_size: Maximum batches per transaction (default: BLOCKCHAIN_BULK_CHUNK_SIZE)
+        :return: One result per chunk with tx_hash, count and first/last batch ID (or error),
+                 or None if nothing could be sent
+        """
+        try:
+            if not self.contract:
+                raise ValueError("Contract not loaded")
+            if len(names) != len(origins):
+                raise ValueError("Names and origins must have the same length")
+
+            sender = from_address or self.from_address
+            if not sender:
+                raise ValueError("No sender address available")
+
+            chunk_size = max(1, chunk_size or self.bulk_chunk_size)
+            # Keep headroom below the block gas limit so chunks are not starved of block space
+            gas_budget = int(self.w3.eth.get_block('latest')['gasLimit'] * 0.9)
+
+            chunks = []
+            pending = [
+                (names[offset:offset + chunk_size], origins[offset:offset + chunk_size])
+                for offset in range(0, len(names), chunk_size)
+            ]
+            while pending:
+                chunk_names, chunk_origins = pending.pop(0)
+                function = self.contract.functions.createBatches(chunk_names, chunk_origins)
+                try:
+                    gas = function.estimate_gas({'from': sender})
+                except Exception as e:
+                    if len(chunk_names) == 1:
+                        raise
+                    # Nodes refuse to estimate past their gas cap ("gas required exceeds allowance")
+                    logger.warning(f"Gas estimate failed for chunk of {len(chunk_names)}, splitting: {str(e)}")
+                    gas = None
+                if (gas is None or gas > gas_budget) and len(chunk_names) > 1:
+                    # Too big for one block: split in half and retry both halves in order
+                    middle = len(chunk_names) // 2
+                    pending[:0] = [
+                        (chunk_names[:middle], chunk_origins[:middle]),
+                        (chunk_names[middle:], chunk_origins[middle:])
+                    ]
+                    continue
+                chunks.append((function, len(chunk_names), min(int(gas * 1.2), gas_budget)))
+
+            results = []
+            for function, count, gas in chunks:
+                try:
+                    tx_hash = self._send_transaction(function, sender, gas=gas)
+                    results.append({'tx_hash': tx_hash, 'count': count})
+                except Exception as e:
+                    logger.error(f"Error sending batch chunk of {count}: {str(e)}")
+                    results.append({'tx_hash': None, 'count': count, 'error': str(e)})
+
+            for result in results:
+                if result['tx_hash'] is None:
+                    continue
+                try:
+                    batch_ids = self.created_batch_ids(self.wait_for_receipt(result['tx_hash']))
+                    if len(batch_ids) != result['count']:
+                        raise ValueError(f"Expected {result['count']} BatchCreated events, got {len(batch_ids)}")
+                    result['first_batch_id'] = batch_ids[0]
+                    result['last_batch_id'] = batch_ids[-1]
+                except Exception as e:
+                    logger.error(f"Error confirming batch chunk {result['tx_hash']}: {str(e)}")
+                    result['error'] = str(e)
+
+            logger.info(f"Created {len(names)} batches in {len(results)} transactions")
+            return results
+        except Exception as e:
+            logger.error(f"Error creating batches: {str(e)}")
+            return None
+
+    def wait_for_receipt(self, tx_hash: str, timeout: Optional[float] = None,
+                         poll_interval: Optional[float] = None):
+        """
+        Wait for a transaction to be mined.
+
+        The receipt is requested immediately (instant on automining dev chains),
+        then polled with an interval that doubles up to one second.
+
+        :param tx_hash: The transaction hash
+        :param timeout: Seconds to wait before giving up (default: BLOCKCHAIN_RECEIPT_TIMEOUT)
+        :param poll_interval: Initial seconds between polls (default: BLOCKCHAIN_RECEIPT_POLL_INTERVAL)
+        :return: The transaction receipt
+        :raises TimeExhausted: If the transaction is not mined in time
+        :raises ValueError: If the transaction reverted
+        """
+        timeout = self.receipt_timeout if timeout is None else timeout
+        delay = self.receipt_poll_interval if poll_interval is None else poll_interval
+        deadline = time.monotonic() + timeout
+
+        while True:
+            receipt = self.get_receipt(tx_hash)
+            if receipt is not None:
+                return receipt
+            if time.monotonic() + delay > deadline:
+                raise TimeExhausted(f"Transaction {tx_hash} not mined after {timeout} seconds")
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    def get_receipt(self, tx_hash: str):
+        """
+        Look up a transaction's receipt without waiting.
+
+        :param tx_hash: The transaction hash
+        :return: The transaction receipt, or None if it is not mined yet
+        :raises ValueError: If the transaction reverted
+        """
+        try:
+            receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+        if receipt is None:
+            return None
+
+        if receipt['status'] != 1:
+            raise ValueError(f"Transaction {tx_hash} reverted")
+        # Reads between sending and mining may have re-cached the old history; invalidating
+        # created batches too bumps the cache generation that batch list ETags include
+        for batch_id in self.tracked_batch_ids(receipt) + self.created_batch_ids(receipt):
+            self.batch_cache.invalidate(batch_id)
+        return receipt
+
+    def get_created_batch_id(self, tx_hash: str, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        Resolve the ID of the batch created by a create_batch transaction.
+
+        :param tx_hash: The transaction hash returned by create_batch
+        :param timeout: Seconds to wait for the receipt (default: BLOCKCHAIN_RECEIPT_TIMEOUT)
+        :return: The batch ID from the BatchCreated log, or None if it could not be resolved
+        """
+        try:
+            batch_ids = self.created_batch_ids(self.wait_for_receipt(tx_hash, timeout=timeout))
+            if not batch_ids:
+                raise ValueError(f"No BatchCreated event in transaction {tx_hash}")
+            return batch_ids[0]
+        except Exception as e:
+            logger.error(f"Error resolving batch ID for {tx_hash}: {str(e)}")
+            return None
+
+    def created_batch_ids(self, receipt) -> List[int]:
+        """
+        Decode the IDs of batches created in a transaction.
+
+        :param receipt: The transaction receipt
+        :return: The batch IDs from its BatchCreated logs, in log order
+        """
+        events = self.contract.events.BatchCreated().process_receipt(receipt, errors=DISCARD)
+        return [event['args']['batchId'] for event in events]
+
+    def tracked_batch_ids(self, receipt) -> List[int]:
+        """
+        Decode the IDs of batches that gained tracking steps in a transaction.
+
+        :param receipt: The transaction receipt
+        :return: The batch IDs from its TrackingStepAdded logs, deduplicated, in log order
+        """
+        events = self.contract.events.TrackingStepAdded().process_receipt(receipt, errors=DISCARD)
+        return list(dict.fromkeys(event['args']['batchId'] for event in events))
+
+    def add_tracking_step(self, batch_id: int, step: str, from_address: Optional[str] = None,
+                          note: str = '') -> Optional[str]:
         """
         Add a tracking step to a batch on the blockchain.
 
+        The step is stored as its dictionary code (registered first if it is
+        new); the note is only emitted in the TrackingStepAdded event.
+
         :param batch_id: The ID of the batch
         :param step: The tracking step to add
         :param from_address: The address to send the transaction from (uses default if not provided)
+        :param note: Optional free text recorded with the step in the event log
         :return: The transaction hash or None if there's an error
         """
         try:
@@ -358,29 +732,53 @@ class BlockchainService:
             if not sender:
                 raise ValueError("No sender address available")
 
-            # Build the transaction
-            tx = self.contract.functions.addTrackingStep(batch_id, step).build_transaction({
-                'from': sender,
-                'gas': 2000000,
-                'gasPrice': self.w3.eth.gas_price,
-                'nonce': self.w3.eth.get_transaction_count(sender)
-            })
-
-            # Sign and send the transaction
-            if self.private_key:
-                # If private key is provided, sign with it
-                signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=self.private_key)
-                tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            else:
-                # Otherwise, use Ganache's unlocked account (no signature needed)
-                tx_hash = self.w3.eth.send_transaction(tx)
+            step_code = self._encode_steps([step], sender)[0]
+            tx_hash = self._send_transaction(
+                self.contract.functions.addTrackingStep(batch_id, step_code, note),
+                sender
+            )
+            # Invalidated again when the receipt or the TrackingStepAdded event arrives
+            self.batch_cache.invalidate(batch_id)
 
-            logger.info(f"Tracking step added with transaction hash: {tx_hash.hex()}")
-            return tx_hash.hex()
+            logger.info(f"Tracking step added with transaction hash: {tx_hash}")
+            return tx_hash
         except Exception as e:
             logger.error(f"Error adding tracking step: {str(e)}")
             return None
 
+    def add_tracking_steps(self, batch_ids: List[int], steps: List[str],
+                           from_address: Optional[str] = None) -> Optional[str]:
+        """
+        Append the same tracking steps to many batches in a single transaction.
+
+        :param batch_ids: The IDs of the batches
+        :param steps: The tracking steps to append to every batch, in order
+        :param from_address: The address to send the transaction from (uses default if not provided)
+        :return: The transaction hash or None if there's an error
+        """
+        try:
+            if not self.contract:
+                raise ValueError("Contract not loaded")
+            if not batch_ids or not steps:
+                raise ValueError("At least one batch ID and one step are required")
+
+            sender = from_address or self.from_address
+            if not sender:
+                raise ValueError("No sender address available")
+
+            function = self.contract.functions.addTrackingSteps(batch_ids, self._encode_steps(steps, sender))
+            gas = int(function.estimate_gas({'from': sender}) * 1.2)
+            tx_hash = self._send_transaction(function, sender, gas=gas)
+            for batch_id in batch_ids:
+                self.batch_cache.invalidate(batch_id)
+
+            logger.info(f"{len(steps)} tracking steps added to {len(batch_ids)} batches "
+                        f"with transaction hash: {tx_hash}")
+            return tx_hash
+        except Exception as e:
+            logger.error(f"Error adding tracking steps: {str(e)}")
+            return None
+
     def get_batch(self, batch_id: int) -> Optional[Dict]:
         """
         Retrieve batch information from the blockchain.
@@ -389,21 +787,87 @@ class BlockchainService:
         :return: A dictionary with batch information or None if there's an error
         """
         try:
+            if self.indexer and self.indexer.last_block is not None:
+                batch = self.indexer.get_batch(batch_id)
+                if batch:
+                    return batch
+
+            cached = self.batch_cache.get(batch_id)
+            if cached:
+                return cached
+
             if not self.contract:
                 raise ValueError("Contract not loaded")
 
-            batch_data = self.contract.functions.getBatchHistory(batch_id).call()
-            return {
-                'id': batch_id,
-                'name': batch_data[0],
-                'origin': batch_data[1],
-                'tracking_history': batch_data[2],
-                'timestamp': batch_data[3]
-            }
+            generation = self.batch_cache.generation
+            with track_rpc('getBatchHistory'):
+                batch_data = self.contract.functions.getBatchHistory(batch_id).call()
+            batch = self._format_batch(batch_id, batch_data, self._decode_steps(batch_data[2]))
+            self.batch_cache.put(batch_id, batch, generation=generation)
+            return batch
         except Exception as e:
             logger.error(f"Error retrieving batch {batch_id}: {str(e)}")
             return None
 
+    @staticmethod
+    def _format_batch(batch_id: int, batch_data, tracking_history: List[str]) -> Dict:
+        """
+        Convert a decoded getBatchHistory result into the API batch dictionary.
+
+        :param batch_id: The ID of the batch
+        :param batch_data: The decoded (name, origin, trackingHistory, timestamp) tuple
+        :param tracking_history: The batch's step codes decoded to step texts
+        :return: A dictionary with batch information
+        """
+        return {
+            'id': batch_id,
+            'name': batch_data[0],
+            'origin': batch_data[1],
+            'tracking_history': tracking_history,
+            'timestamp': batch_data[3]
+        }
+
+    def _refresh_step_dictionary(self):
+        """Fetch the step names registered on chain since the last refresh."""
+        from_code = len(self.step_dictionary)
+        with track_rpc('getStepNames'):
+            names = self.contract.functions.getStepNames(from_code).call()
+        self.step_dictionary.extend(from_code, names)
+
+    def _decode_steps(self, step_codes) -> List[str]:
+        """
+        Translate a batch's stored step codes to step texts.
+
+        :param step_codes: The trackingHistory codes read from the contract
+        :return: The tracking history as step texts
+        """
+        if not self.step_dictionary.knows(step_codes):
+            self._refresh_step_dictionary()
+        return self.step_dictionary.decode(step_codes)
+
+    def _encode_steps(self, steps: List[str], sender: str) -> List[int]:
+        """
+        Translate step texts to dictionary codes, registering new steps on chain first.
+
+        Registration waits for its receipt so the codes are known before the
+        steps are written; it only happens the first time a step text is used.
+
+        :param steps: The tracking steps
+        :param sender: The address to send a registration transaction from
+        :return: The step codes, in order
+        """
+        if self.step_dictionary.missing(steps):
+            with self._step_registration_lock:
+                # Another writer may have registered them in the meantime
+                self._refresh_step_dictionary()
+                missing = self.step_dictionary.missing(steps)
+                if missing:
+                    tx_hash = self._send_transaction(self.contract.functions.registerSteps(missing), sender)
+                    self.wait_for_receipt(tx_hash)
+                    logger.info(f"Registered tracking steps {missing} with transaction hash: {tx_hash}")
+                    self._refresh_step_dictionary()
+        return self.step_dictionary.encode(steps)
+
     def get_all_batches(self) -> Optional[List[Dict]]:
         """
         Retrieve all batches from the blockchain.
@@ -411,12 +875,23 @@ class BlockchainService:
         :return: A list of batch dictionaries or None if there's an error
         """
         try:
+            if self.indexer and self.indexer.last_block is not None:
+                return self.indexer.get_all_batches()
+
             batch_count = self.get_batch_count()
             if batch_count is None or batch_count == 0:
                 return []
 
+            batch_ids = list(range(1, batch_count + 1))
+            if self.rpc_batch_size > 1 and (self.provider_url.startswith(('http://', 'https://'))
+                                            or is_inproc_url(self.provider_url)):
+                batches, failures = self.get_batches_batched(batch_ids)
+                if failures:
+                    logger.warning(f"Failed to retrieve {len(failures)} batches: {sorted(failures)}")
+                return batches
+
             batches = []
-            for batch_id in range(1, batch_count + 1):
+            for batch_id in batch_ids:
                 batch = self.get_batch(batch_id)
                 if batch:
                     batches.append(batch)
@@ -426,47 +901,292 @@ class BlockchainService:
             logger.error(f"Error retrieving all batches: {str(e)}")
             return None
 
-    def get_batch(self, batch_id: int) -> Optional[Dict]:
+    def get_batches_range(self, start: int, count: int) -> Optional[List[Dict]]:
         """
-        Retrieve batch information from the blockchain.
+        Retrieve a page of consecutive batches with a single getBatches call.
 
-        :param batch_id: The ID of the batch to retrieve
-        :return: A dictionary with batch information or None if there's an error
+        :param start: The ID of the first batch in the page
+        :param count: The maximum number of batches to return
+        :return: A list of batch dictionaries (shorter than count at the end) or None if there's an error
         """
         try:
+            if start <= 0 or count <= 0:
+                raise ValueError("Start and count must be positive integers")
+
+            if self.indexer and self.indexer.last_block is not None:
+                return self.indexer.get_batches_range(start, count)
+
             if not self.contract:
                 raise ValueError("Contract not loaded")
 
-            batch_data = self.contract.functions.getBatchHistory(batch_id).call()
-            return {
-                'id': batch_id,
-                'name': batch_data[0],
-                'origin': batch_data[1],
-                'tracking_history': batch_data[2],
-                'timestamp': batch_data[3]
-            }
+            with track_rpc('getBatches'):
+                page = self.contract.functions.getBatches(start, count).call()
+            return [
+                self._format_batch(start + offset, batch_data, self._decode_steps(batch_data[2]))
+                for offset, batch_data in enumerate(page)
+            ]
         except Exception as e:
-            logger.error(f"Error retrieving batch {batch_id}: {str(e)}")
+            logger.error(f"Error retrieving batches {start}-{start + count - 1}: {str(e)}")
             return None
 
-    def get_all_batches(self) -> Optional[List[Dict]]:
+    def iter_batches(self, start: int = 1, page_size: int = 100) -> Iterator[Dict]:
         """
-        Retrieve all batches from the blockchain.
+        Yield batches in ID order, fetching one getBatches page at a time.
 
-        :return: A list of batch dictionaries or None if there's an error
+        :param start: The ID of the first batch to yield
+        :param page_size: The number of batches requested per page
+        :return: An iterator over batch dictionaries
+        """
+        while True:
+            page = self.get_batches_range(start, page_size)
+            if page is None:
+                raise RuntimeError(f"Failed to retrieve batches starting at ID {start}")
+            yield from page
+            if len(page) < page_size:
+                return
+            start = page[-1]['id'] + 1
+
+    def get_batches_batched(self, batch_ids: List[int],
+                            chunk_size: Optional[int] = None) -> Tuple[List[Dict], Dict[int, str]]:
+        """
+        Retrieve many batches using JSON-RPC batch requests.
+
+        Each HTTP request carries up to chunk_size getBatchHistory eth_calls, all
+        pinned to the same block so the result is a consistent snapshot.
+
+        :param batch_ids: The IDs of the batches to retrieve
+        :param chunk_size: Calls per HTTP request (default: BLOCKCHAIN_RPC_BATCH_SIZE)
+        :return: Tuple of (batches in ID order, mapping of failed batch ID to error message)
+        """
+        if not self.contract:
+            raise ValueError("Contract not loaded")
+
+        chunk_size = max(1, chunk_size or self.rpc_batch_size)
+        fn_abi = next(
+            item for item in self.contract_abi
+            if item.get('type') == 'function' and item.get('name') == 'getBatchHistory'
+        )
+        output_types = [self._abi_type(output) for output in fn_abi['outputs']]
+        selector = Web3.keccak(text='getBatchHistory(uint256)')[:4]
+        block = hex(self.w3.eth.block_number)
+
+        results: Dict[int, Dict] = {}
+        failures: Dict[int, str] = {}
+        for offset in range(0, len(batch_ids), chunk_size):
+            chunk = batch_ids[offset:offset + chunk_size]
+            payload = [
+                {
+                    'jsonrpc': '2.0',
+                    'id': batch_id,
+                    'method': 'eth_call',
+                    'params': [
+                        {'to': self.contract.address, 'data': Web3.to_hex(selector + encode(['uint256'], [batch_id]))},
+                        block
+                    ]
+                }
+                for batch_id in chunk
+            ]
+
+            try:
+                with track_rpc('getBatchHistory_batch'):
+                    replies = self._send_rpc_batch(payload)
+            except Exception as e:
+                logger.error(f"Error in batched read of batches {chunk[0]}-{chunk[-1]}: {str(e)}")
+                failures.update({batch_id: str(e) for batch_id in chunk})
+                continue
+
+            for reply in replies:
+                batch_id = reply.get('id')
+                if 'error' in reply:
+                    failures[batch_id] = reply['error'].get('message', str(reply['error']))
+                    continue
+                try:
+                    decoded = decode(output_types, Web3.to_bytes(hexstr=reply['result']))
+                    # A struct return value decodes as a single tuple
+                    batch_data = decoded[0] if len(decoded) == 1 else decoded
+                    results[batch_id] = self._format_batch(batch_id, batch_data, self._decode_steps(batch_data[2]))
+                except Exception as e:
+                    failures[batch_id] = f"Decode error: {str(e)}"
+
+            for batch_id in chunk:
+                if batch_id not in results and batch_id not in failures:
+                    failures[batch_id] = "Missing from batch response"
+
+        return [results[batch_id] for batch_id in batch_ids if batch_id in results], failures
+
+    def _send_rpc_batch(self, payload: List[Dict]) -> List[Dict]:
+        """
+        Send a JSON-RPC batch and return its replies.
+
+        Over HTTP the batch is one POST. The in-process EVM has no transport to
+        batch over, so each call goes through Web3 and is answered in the same
+        reply format.
+
+        :param payload: The JSON-RPC requests
+        :return: The JSON-RPC replies
+        :raises ValueError: If the node does not support batch requests
+        """
+        if is_inproc_url(self.provider_url):
+            replies = []
+            for request in payload:
+                try:
+                    result = self.w3.manager.request_blocking(request['method'], request['params'])
+                    if not isinstance(result, str):
+                        result = Web3.to_hex(result)
+                    replies.append({'id': request['id'], 'result': result})
+                except Exception as e:
+                    replies.append({'id': request['id'], 'error': {'message': str(e)}})
+            return replies
+
+        posted = time.perf_counter()
+        response = self._http_session.post(self.provider_url, json=payload, timeout=self.http_timeout)
+        record_rpc(payload[0]['method'], time.perf_counter() - posted, count=len(payload))
+        response.raise_for_status()
+        replies = response.json()
+        if not isinstance(replies, list):
+            # Nodes without batch support answer with a single error object
+            raise ValueError(replies.get('error', {}).get('message', 'Batch requests not supported'))
+        return replies
+
+    def get_batch_events(self, batch_id: int, from_block: Optional[int] = None,
+                         to_block: Optional[int] = None) -> Optional[List[Dict]]:
+        """
+        Retrieve the BatchCreated and TrackingStepAdded events of one batch.
+
+        batchId is an indexed topic, so the node filters the logs. The whole
+        range is requested at once; only ranges the provider refuses as too
+        large are halved, with the halves of each round fetched concurrently,
+        up to log_max_requests eth_getLogs calls.
+
+        :param batch_id: The ID of the batch
+        :param from_block: The first block to search (default: the batch's creation block if indexed, else 0)
+        :param to_block: The last block to search (default and maximum: the latest block)
+        :return: The batch's events in chain order or None if there's an error
         """
         try:
-            batch_count = self.get_batch_count()
-            if batch_count is None or batch_count == 0:
+            if not self.contract:
+                raise ValueError("Contract not loaded")
+
+            head = self.w3.eth.block_number
+            to_block = head if to_block is None else min(to_block, head)
+            if from_block is None:
+                from_block = self._batch_created_block(batch_id)
+            if from_block > to_block:
                 return []
 
-            batches = []
-            for batch_id in range(1, batch_count + 1):
-                batch = self.get_batch(batch_id)
-                if batch:
-                    batches.append(batch)
+            topics = [
+                [self._event_topic('BatchCreated'), self._event_topic('TrackingStepAdded')],
+                Web3.to_hex(encode(['uint256'], [batch_id]))
+            ]
+            logs = []
+            pending = [(from_block, to_block)]
+            requests = 0
+            with ThreadPoolExecutor(max_workers=max(1, self.log_workers)) as pool:
+                while pending:
+                    requests += len(pending)
+                    if requests > self.log_max_requests:
+                        raise ValueError(
+                            f"Blocks {from_block}-{to_block} need more than {self.log_max_requests} "
+                            f"eth_getLogs calls; narrow the range"
+                        )
+                    # Each range runs in a copy of this context so its calls count towards the current request
+                    futures = [
+                        (start, end, pool.submit(contextvars.copy_context().run, self._get_logs, topics, start, end))
+                        for start, end in pending
+                    ]
+                    pending = []
+                    for start, end, future in futures:
+                        result = future.result()
+                        if result is None:
+                            middle = (start + end) // 2
+                            logger.debug(f"Provider capped eth_getLogs for blocks {start}-{end}; splitting at {middle}")
+                            pending += [(start, middle), (middle + 1, end)]
+                        else:
+                            logs.extend(result)
 
-            return batches
+            logs.sort(key=lambda log: (log['blockNumber'], log['logIndex']))
+            return [self._format_event(log) for log in logs]
         except Exception as e:
-            logger.error(f"Error retrieving all batches: {str(e)}")
+            logger.error(f"Error retrieving events for batch {batch_id}: {str(e)}")
+            return None
+
+    def _batch_created_block(self, batch_id: int) -> int:
+        """The block a batch was created in, if the indexer has it; otherwise 0."""
+        if self.indexer:
+            block_number = self.indexer.get_batch_block(batch_id)
+            if block_number is not None:
+                return block_number
+        return 0
+
+    def _get_logs(self, topics: List, from_block: int, to_block: int) -> Optional[List]:
+        """
+        Fetch contract logs for a block range.
+
+        :param topics: The eth_getLogs topic filter
+        :param from_block: The first block of the range
+        :param to_block: The last block of the range
+        :return: The raw log entries, or None if the provider refused the range as too large to answer
+        """
+        try:
+            with track_rpc('eth_getLogs'):
+                return list(self.w3.eth.get_logs({
+                    'address': self.contract.address,
+                    'fromBlock': from_block,
+                    'toBlock': to_block,
+                    'topics': topics
+                }))
+        except Exception as e:
+            if from_block >= to_block or not any(marker in str(e).lower() for marker in LOG_LIMIT_ERRORS):
+                raise
             return None
+
+    def _event_topic(self, event_name: str) -> str:
+        """
+        Compute topic0 for a contract event from its ABI definition.
+
+        :param event_name: The name of the event
+        :return: The hex-encoded keccak hash of the event signature
+        """
+        event_abi = next(
+            item for item in self.contract.abi
+            if item.get('type') == 'event' and item.get('name') == event_name
+        )
+        signature = f"{event_name}({','.join(arg['type'] for arg in event_abi['inputs'])})"
+        return Web3.to_hex(Web3.keccak(text=signature))
+
+    def _format_event(self, log) -> Dict:
+        """
+        Decode a BatchCreated or TrackingStepAdded log into an API event dictionary.
+
+        :param log: The raw log entry
+        :return: A dictionary with the event name, its position on chain and its fields
+        """
+        if Web3.to_hex(log['topics'][0]) == self._event_topic('BatchCreated'):
+            args = self.contract.events.BatchCreated().process_log(log)['args']
+            fields = {'event': 'BatchCreated', 'name': args['name'], 'origin': args['origin']}
+        else:
+            args = self.contract.events.TrackingStepAdded().process_log(log)['args']
+            fields = {
+                'event': 'TrackingStepAdded',
+                'step': self._decode_steps([args['stepCode']])[0],
+                'note': args['note']
+            }
+        return {
+            **fields,
+            'block_number': log['blockNumber'],
+            'log_index': log['logIndex'],
+            'transaction_hash': Web3.to_hex(log['transactionHash'])
+        }
+
+    @staticmethod
+    def _abi_type(param: Dict) -> str:
+        """
+        Build the canonical ABI type string for a function input or output.
+
+        :param param: The ABI parameter definition
+        :return: The type string, with tuple components expanded
+        """
+        if param['type'].startswith('tuple'):
+            components = ','.join(BlockchainService._abi_type(c) for c in param['components'])
+            return f"({components}){param['type'][len('tuple'):]}"
+        return param['type']
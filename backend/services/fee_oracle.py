@@ -0,0 +1,166 @@
+"""
+Fee oracle for transactions sent by the blockchain service.
+Caches gas fee parameters with a TTL and refreshes them in the background so
+writes do not pay a gas price RPC on every request.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from .metrics import track_rpc
+
+logger = logging.getLogger(__name__)
+
+FEE_MODES = ('auto', 'legacy', 'eip1559')
+
+
+class FeeOracle:
+    """Cached source of legacy gasPrice or EIP-1559 fee parameters."""
+
+    def __init__(self, w3, ttl: float = 15.0, refresh_interval: Optional[float] = None,
+                 mode: str = 'auto', default_priority_fee: int = 1_000_000_000):
+        """
+        Initialize the fee oracle.
+
+        :param w3: A connected Web3 instance
+        :param ttl: Seconds before cached fees are considered stale and re-read on demand
+        :param refresh_interval: Seconds between background refreshes (default: half the TTL)
+        :param mode: 'legacy', 'eip1559', or 'auto' to pick based on the latest block
+        :param default_priority_fee: Priority fee in wei used when the node cannot suggest one
+        """
+        if mode not in FEE_MODES:
+            raise ValueError(f"Fee mode must be one of {', '.join(FEE_MODES)}")
+
+        self.w3 = w3
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval if refresh_interval is not None else ttl / 2
+        self.mode = mode
+        self.default_priority_fee = default_priority_fee
+
+        self._lock = threading.Lock()
+        self._fees: Optional[Dict[str, int]] = None
+        self._updated_at: Optional[float] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get_fee_params(self) -> Dict[str, int]:
+        """
+        Get fee fields for a transaction, refreshing them if the cache is stale.
+
+        :return: Either {'gasPrice': ...} or {'maxFeePerGas': ..., 'maxPriorityFeePerGas': ...}
+        """
+        with self._lock:
+            if self._fees is not None and time.monotonic() - self._updated_at < self.ttl:
+                return dict(self._fees)
+        return self.refresh()
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Read current fee parameters from the node and cache them.
+
+        :return: The refreshed fee fields
+        """
+        fees = self._read_fees()
+        with self._lock:
+            self._fees = fees
+            self._updated_at = time.monotonic()
+        return dict(fees)
+
+    async def get_fee_params_async(self) -> Dict[str, int]:
+        """
+        Get fee fields for a transaction when the oracle wraps an AsyncWeb3 instance.
+
+        :return: Either {'gasPrice': ...} or {'maxFeePerGas': ..., 'maxPriorityFeePerGas': ...}
+        """
+        with self._lock:
+            if self._fees is not None and time.monotonic() - self._updated_at < self.ttl:
+                return dict(self._fees)
+
+        # Read outside the lock; concurrent refreshes just overwrite each other
+        fees = await self._read_fees_async()
+        with self._lock:
+            self._fees = fees
+            self._updated_at = time.monotonic()
+        return dict(fees)
+
+    def _read_fees(self) -> Dict[str, int]:
+        if self.mode != 'legacy':
+            with track_rpc('get_block'):
+                base_fee = self.w3.eth.get_block('latest').get('baseFeePerGas')
+            if base_fee is not None:
+                try:
+                    priority_fee = self.w3.eth.max_priority_fee
+                except Exception as e:
+                    logger.debug(f"Node cannot suggest a priority fee; using default: {str(e)}")
+                    priority_fee = self.default_priority_fee
+                # Leave room for the base fee to double before the transaction is priced out
+                return {
+                    'maxFeePerGas': 2 * base_fee + priority_fee,
+                    'maxPriorityFeePerGas': priority_fee
+                }
+            if self.mode == 'eip1559':
+                raise ValueError("Latest block has no base fee; EIP-1559 fees are unavailable")
+
+        with track_rpc('gas_price'):
+            return {'gasPrice': self.w3.eth.gas_price}
+
+    async def _read_fees_async(self) -> Dict[str, int]:
+        if self.mode != 'legacy':
+            with track_rpc('get_block'):
+                base_fee = (await self.w3.eth.get_block('latest')).get('baseFeePerGas')
+            if base_fee is not None:
+                try:
+                    priority_fee = await self.w3.eth.max_priority_fee
+                except Exception as e:
+                    logger.debug(f"Node cannot suggest a priority fee; using default: {str(e)}")
+                    priority_fee = self.default_priority_fee
+                return {
+                    'maxFeePerGas': 2 * base_fee + priority_fee,
+                    'maxPriorityFeePerGas': priority_fee
+                }
+            if self.mode == 'eip1559':
+                raise ValueError("Latest block has no base fee; EIP-1559 fees are unavailable")
+
+        with track_rpc('gas_price'):
+            return {'gasPrice': await self.w3.eth.gas_price}
+
+    def status(self) -> Dict:
+        """
+        Describe the cached fees for health reporting.
+
+        :return: A dictionary with the mode, cached fee fields and cache age in seconds
+        """
+        with self._lock:
+            age = time.monotonic() - self._updated_at if self._updated_at is not None else None
+            return {
+                'mode': self.mode,
+                'fees': dict(self._fees) if self._fees else None,
+                'age_seconds': round(age, 3) if age is not None else None,
+                'ttl_seconds': self.ttl,
+                'stale': age is None or age >= self.ttl
+            }
+
+    def start(self):
+        """Start refreshing fees in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="fee-oracle", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.refresh_interval + 5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing fee oracle: {str(e)}")
+            self._stop_event.wait(self.refresh_interval)
@@ -0,0 +1,143 @@
+"""
+Connection health monitor for the blockchain provider.
+Probes the node on an interval in the background so request handlers can
+check connectivity without a round trip of their own.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Background prober tracking provider reachability, latency and chain head."""
+
+    def __init__(self, w3, interval: float = 5.0, failure_threshold: int = 1, window: int = 100):
+        """
+        Initialize the health monitor.
+
+        :param w3: The Web3 instance to probe
+        :param interval: Seconds between probes
+        :param failure_threshold: Consecutive failed probes before the provider is reported as down
+        :param window: Number of recent probe latencies kept for percentiles
+        """
+        self.w3 = w3
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._last_block: Optional[int] = None
+        self._last_probe_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._consecutive_failures = 0
+        self._probes = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def probe(self) -> bool:
+        """
+        Probe the provider once by reading the current block number.
+
+        :return: True if the provider answered
+        """
+        started = time.monotonic()
+        try:
+            block_number = self.w3.eth.block_number
+            error = None
+        except Exception as e:
+            block_number = None
+            error = str(e)
+        finished = time.monotonic()
+
+        with self._lock:
+            self._probes += 1
+            self._last_probe_at = finished
+            if error is None:
+                self._latencies.append(finished - started)
+                self._last_block = block_number
+                self._consecutive_failures = 0
+                self._last_error = None
+            else:
+                self._consecutive_failures += 1
+                self._last_error = error
+            failures = self._consecutive_failures
+
+        if error is not None:
+            # Log the transition to failing rather than every failed probe
+            log = logger.warning if failures == 1 else logger.debug
+            log(f"Blockchain health probe failed: {error}")
+        return error is None
+
+    @property
+    def running(self) -> bool:
+        """Whether the background prober is active."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def connected(self) -> bool:
+        """Whether the provider is considered reachable, based on the latest probes."""
+        with self._lock:
+            return self._probes > 0 and self._consecutive_failures < self.failure_threshold
+
+    @property
+    def last_block(self) -> Optional[int]:
+        """The block number seen by the latest successful probe."""
+        with self._lock:
+            return self._last_block
+
+    def status(self) -> Dict:
+        """
+        Describe the provider health for reporting.
+
+        :return: A dictionary with connectivity, chain head, probe age and latency percentiles
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            age = time.monotonic() - self._last_probe_at if self._last_probe_at is not None else None
+            connected = self._probes > 0 and self._consecutive_failures < self.failure_threshold
+            return {
+                'connected': connected,
+                'last_block': self._last_block,
+                'probe_age_seconds': round(age, 3) if age is not None else None,
+                'probe_interval_seconds': self.interval,
+                'consecutive_failures': self._consecutive_failures,
+                'last_error': self._last_error,
+                'latency_ms': {
+                    'p50': self._percentile(latencies, 50),
+                    'p95': self._percentile(latencies, 95),
+                    'p99': self._percentile(latencies, 99)
+                }
+            }
+
+    @staticmethod
+    def _percentile(values, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile of sorted latencies, in milliseconds."""
+        if not values:
+            return None
+        rank = max(0, min(len(values) - 1, int(round(percentile / 100 * len(values))) - 1))
+        return round(values[rank] * 1000, 3)
+
+    def start(self):
+        """Probe once, then keep probing in a background thread."""
+        if self.running:
+            return
+        self.probe()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.probe()
@@ -0,0 +1,26 @@
+"""
+Shared HTTP connection pools.
+Builds keep-alive requests sessions for the blockchain provider and the Claude
+API so each call reuses an open (TLS) connection instead of opening a new one.
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def build_session(pool_size: int = 10, max_retries: int = 0) -> requests.Session:
+    """
+    Build a requests session backed by a keep-alive connection pool.
+
+    The pool is safe to share across Flask worker threads; up to pool_size
+    connections per host are kept open for reuse.
+
+    :param pool_size: Maximum number of pooled connections per host
+    :param max_retries: Retries for failed connection attempts (not for failed responses)
+    :return: The configured session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=max_retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
@@ -0,0 +1,335 @@
+"""
+Event indexer for the BatchTracker smart contract.
+Follows BatchCreated / StepRegistered / TrackingStepAdded logs and materializes
+batches into a local SQLite store so reads can be answered without a node round
+trip. Tracking steps are stored as text, decoded through the step dictionary.
+"""
+
+import logging
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BatchIndexer:
+    """Local read replica of BatchTracker state, fed by contract event logs."""
+
+    def __init__(self, w3, contract, db_path: str = ":memory:", start_block: int = 0,
+                 poll_interval: float = 2.0, max_block_range: int = 2000, confirmations: int = 0):
+        """
+        Initialize the indexer.
+
+        :param w3: A connected Web3 instance
+        :param contract: The BatchTracker contract instance whose events are followed
+        :param db_path: Path of the SQLite database (default: in-memory)
+        :param start_block: First block to scan when the database is empty
+        :param poll_interval: Seconds between background sync passes
+        :param max_block_range: Maximum number of blocks requested per eth_getLogs call
+        :param confirmations: Blocks to stay behind the head to avoid indexing reorged logs
+        """
+        self.w3 = w3
+        self.contract = contract
+        self.db_path = db_path
+        self.start_block = start_block
+        self.poll_interval = poll_interval
+        self.max_block_range = max_block_range
+        self.confirmations = confirmations
+        self.listeners: List[Callable[[str, Dict], None]] = []
+
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._create_schema()
+
+        self._topics = {
+            self._event_topic('BatchCreated'): 'BatchCreated',
+            self._event_topic('StepRegistered'): 'StepRegistered',
+            self._event_topic('TrackingStepAdded'): 'TrackingStepAdded',
+        }
+
+    def _create_schema(self):
+        """Create the index tables if they do not exist yet."""
+        with self._lock, self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                CREATE TABLE IF NOT EXISTS batches (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    origin TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    block_number INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS tracking_steps (
+                    batch_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    step TEXT NOT NULL,
+                    block_number INTEGER NOT NULL,
+                    PRIMARY KEY (batch_id, position)
+                );
+                CREATE TABLE IF NOT EXISTS step_names (
+                    code INTEGER PRIMARY KEY,
+                    step TEXT NOT NULL
+                );
+            """)
+
+            # An index built for another contract is of no use; start over
+            address = self._get_meta('contract_address')
+            if address is not None and address != self.contract.address:
+                logger.warning(f"Index at {self.db_path} was built for {address}; rebuilding")
+                self._db.executescript("DELETE FROM meta; DELETE FROM batches; DELETE FROM tracking_steps; "
+                                      "DELETE FROM step_names;")
+            self._set_meta('contract_address', self.contract.address)
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_meta(self, key: str, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _event_topic(self, event_name: str) -> str:
+        """
+        Compute topic0 for a contract event from its ABI definition.
+
+        :param event_name: The name of the event
+        :return: The hex-encoded keccak hash of the event signature
+        """
+        event_abi = next(
+            item for item in self.contract.abi
+            if item.get('type') == 'event' and item.get('name') == event_name
+        )
+        signature = f"{event_name}({','.join(arg['type'] for arg in event_abi['inputs'])})"
+        return self.w3.to_hex(self.w3.keccak(text=signature))
+
+    @property
+    def last_block(self) -> Optional[int]:
+        """The last block whose events are reflected in the index, or None before the first sync."""
+        with self._lock:
+            value = self._get_meta('last_block')
+        return int(value) if value is not None else None
+
+    def sync(self) -> Optional[int]:
+        """
+        Index all events up to the current head (minus confirmations).
+
+        :return: The last indexed block number, or None if nothing has been indexed yet
+        """
+        head = self.w3.eth.block_number - self.confirmations
+        last_block = self.last_block
+        from_block = self.start_block if last_block is None else last_block + 1
+
+        while from_block <= head:
+            to_block = min(from_block + self.max_block_range - 1, head)
+            logs = self.w3.eth.get_logs({
+                'address': self.contract.address,
+                'fromBlock': from_block,
+                'toBlock': to_block,
+                'topics': [list(self._topics)],
+            })
+            self._apply_logs(logs, to_block)
+            from_block = to_block + 1
+
+        return self.last_block
+
+    def _apply_logs(self, logs: List, to_block: int):
+        """
+        Apply a block range of event logs to the store in one SQLite transaction.
+
+        Block timestamps and step names come from the node before the lock is
+        taken, so indexed reads never wait on a network call.
+
+        :param logs: Raw logs returned by eth_getLogs
+        :param to_block: The last block covered by the logs
+        """
+        events = []
+        for log in sorted(logs, key=lambda entry: (entry['blockNumber'], entry['logIndex'])):
+            event_name = self._topics.get(self.w3.to_hex(log['topics'][0]))
+            if event_name is not None:
+                event = getattr(self.contract.events, event_name)().process_log(log)
+                events.append((event_name, dict(event['args']), log['blockNumber']))
+
+        # The contract stamps batches with block.timestamp, which the event omits
+        block_timestamps = {
+            block_number: self.w3.eth.get_block(block_number)['timestamp']
+            for block_number in sorted({block for name, _, block in events if name == 'BatchCreated'})
+        }
+        step_names = self._fetch_step_names(events)
+
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO step_names (code, step) VALUES (?, ?)", step_names.items())
+            for event_name, args, block_number in events:
+                if event_name == 'BatchCreated':
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO batches (id, name, origin, timestamp, block_number) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (args['batchId'], args['name'], args['origin'], block_timestamps[block_number], block_number)
+                    )
+                elif event_name == 'StepRegistered':
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO step_names (code, step) VALUES (?, ?)",
+                        (args['code'], args['step'])
+                    )
+                else:
+                    self._db.execute(
+                        "INSERT INTO tracking_steps (batch_id, position, step, block_number) "
+                        "SELECT ?, COUNT(*), ?, ? FROM tracking_steps WHERE batch_id = ?",
+                        (args['batchId'], self._step_name(args['stepCode']), block_number, args['batchId'])
+                    )
+            self._set_meta('last_block', to_block)
+
+        for event_name, args, _ in events:
+            for listener in self.listeners:
+                try:
+                    listener(event_name, args)
+                except Exception as e:
+                    logger.error(f"Error in index listener for {event_name}: {str(e)}")
+
+    def _fetch_step_names(self, events: List) -> Dict[int, str]:
+        """
+        Read the step names a range of events uses but neither registers nor finds in the index.
+
+        These are steps registered before start_block; each is read once with the
+        contract's stepNames(code) getter.
+
+        :param events: Decoded (event name, args, block number) tuples
+        :return: Step code to step text for the codes read from the contract
+        """
+        registered = {args['code'] for name, args, _ in events if name == 'StepRegistered'}
+        used = {args['stepCode'] for name, args, _ in events if name == 'TrackingStepAdded'} - registered
+        if not used:
+            return {}
+
+        with self._lock:
+            placeholders = ','.join('?' * len(used))
+            known = {
+                row['code'] for row in self._db.execute(
+                    f"SELECT code FROM step_names WHERE code IN ({placeholders})", sorted(used)
+                )
+            }
+        return {code: self.contract.functions.stepNames(code).call() for code in sorted(used - known)}
+
+    def _step_name(self, code: int) -> str:
+        """
+        Decode a step code from the step_names table. Caller holds the lock.
+
+        :param code: The step code from a TrackingStepAdded event
+        :return: The step text
+        """
+        row = self._db.execute("SELECT step FROM step_names WHERE code = ?", (code,)).fetchone()
+        if row is None:
+            raise ValueError(f"Step code {code} is not registered")
+        return row['step']
+
+    def start(self):
+        """Start following new events in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="batch-indexer", daemon=True)
+        self._thread.start()
+        logger.info(f"Batch indexer started (db: {self.db_path})")
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Error syncing batch index: {str(e)}")
+            self._stop_event.wait(self.poll_interval)
+
+    def get_batch(self, batch_id: int) -> Optional[Dict]:
+        """
+        Retrieve an indexed batch.
+
+        :param batch_id: The ID of the batch to retrieve
+        :return: A dictionary with batch information or None if the batch is not indexed
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, name, origin, timestamp FROM batches WHERE id = ?", (batch_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            steps = self._db.execute(
+                "SELECT step FROM tracking_steps WHERE batch_id = ? ORDER BY position", (batch_id,)
+            ).fetchall()
+        return self._format_batch(row, [step['step'] for step in steps])
+
+    def get_batch_block(self, batch_id: int) -> Optional[int]:
+        """
+        Get the block an indexed batch was created in.
+
+        :param batch_id: The ID of the batch
+        :return: The block number, or None if the batch is not indexed
+        """
+        with self._lock:
+            row = self._db.execute("SELECT block_number FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        return row['block_number'] if row else None
+
+    def get_all_batches(self) -> List[Dict]:
+        """
+        Retrieve every indexed batch ordered by ID.
+
+        :return: A list of batch dictionaries
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT id, name, origin, timestamp FROM batches ORDER BY id").fetchall()
+            history: Dict[int, List[str]] = {}
+            for step in self._db.execute(
+                    "SELECT batch_id, step FROM tracking_steps ORDER BY batch_id, position"):
+                history.setdefault(step['batch_id'], []).append(step['step'])
+        return [self._format_batch(row, history.get(row['id'], [])) for row in rows]
+
+    def get_batches_range(self, start: int, count: int) -> List[Dict]:
+        """
+        Retrieve up to count indexed batches with IDs from start upward.
+
+        :param start: The ID of the first batch in the page
+        :param count: The maximum number of batches to return
+        :return: A list of batch dictionaries ordered by ID
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, name, origin, timestamp FROM batches WHERE id >= ? ORDER BY id LIMIT ?",
+                (start, count)
+            ).fetchall()
+            history: Dict[int, List[str]] = {}
+            if rows:
+                for step in self._db.execute(
+                        "SELECT batch_id, step FROM tracking_steps WHERE batch_id BETWEEN ? AND ? "
+                        "ORDER BY batch_id, position", (rows[0]['id'], rows[-1]['id'])):
+                    history.setdefault(step['batch_id'], []).append(step['step'])
+        return [self._format_batch(row, history.get(row['id'], [])) for row in rows]
+
+    def get_batch_count(self) -> int:
+        """
+        Get the number of indexed batches.
+
+        :return: The batch count
+        """
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM batches").fetchone()[0]
+
+    @staticmethod
+    def _format_batch(row, tracking_history: List[str]) -> Dict:
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'origin': row['origin'],
+            'tracking_history': tracking_history,
+            'timestamp': row['timestamp']
+        }
@@ -0,0 +1,184 @@
+"""
+In-process EVM backend for the blockchain service.
+With provider_url="inproc://" the BatchTracker contract is compiled, deployed
+and run on eth-tester (py-evm) inside the process, so development, tests and
+load runs need no node and no HTTP round trips.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+INPROC_SCHEME = 'inproc://'
+CONTRACT_SOURCE = os.path.join(os.path.dirname(__file__), "..", "..", "contracts", "BatchTracker.sol")
+SOLC_VERSION = os.getenv('BLOCKCHAIN_INPROC_SOLC_VERSION', '0.8.19')
+
+# Batches per createBatches transaction while seeding (keeps each under the block gas limit)
+SEED_CHUNK_SIZE = 100
+
+
+def is_inproc_url(provider_url: str) -> bool:
+    """
+    Check whether a provider URL selects the in-process EVM.
+
+    :param provider_url: The provider URL given to the service
+    :return: True for inproc:// URLs
+    """
+    return provider_url.startswith(INPROC_SCHEME)
+
+
+def fixtures_path(provider_url: str) -> Optional[str]:
+    """
+    Get the fixture file to seed the in-process chain with.
+
+    :param provider_url: The provider URL, optionally inproc://?fixtures=<path>
+    :return: The path from the URL, else BLOCKCHAIN_INPROC_FIXTURES, or None
+    """
+    query = parse_qs(urlparse(provider_url).query)
+    if query.get('fixtures'):
+        return query['fixtures'][0]
+    return os.getenv('BLOCKCHAIN_INPROC_FIXTURES')
+
+
+def compile_contract(source: str = CONTRACT_SOURCE) -> Dict:
+    """
+    Compile the BatchTracker contract, reusing a cached build of the same source.
+
+    solc is installed through py-solc-x on first use.
+
+    :param source: Path of the Solidity file defining BatchTracker (default: contracts/BatchTracker.sol)
+    :return: Dictionary with the contract 'abi' and 'bin'
+    """
+    with open(source, 'rb') as f:
+        digest = hashlib.sha256(f.read() + SOLC_VERSION.encode()).hexdigest()[:16]
+    cache_path = os.path.join(tempfile.gettempdir(), 'bobachain-solc', f'BatchTracker-{digest}.json')
+
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            return json.load(f)
+
+    import solcx
+
+    if SOLC_VERSION not in {str(version) for version in solcx.get_installed_solc_versions()}:
+        logger.info(f"Installing solc {SOLC_VERSION}")
+        solcx.install_solc(SOLC_VERSION)
+
+    compiled = solcx.compile_files(
+        [os.path.abspath(source)],
+        output_values=['abi', 'bin'],
+        solc_version=SOLC_VERSION,
+        optimize=True
+    )
+    artifact = next(output for name, output in compiled.items() if name.endswith(':BatchTracker'))
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w') as f:
+        json.dump({'abi': artifact['abi'], 'bin': artifact['bin']}, f)
+    return artifact
+
+
+def start_chain() -> Tuple[Web3, str, List[Dict]]:
+    """
+    Start an in-memory chain and deploy BatchTracker from its first account.
+
+    :return: Tuple of (Web3 instance, deployed contract address, ABI of the compiled contract)
+    """
+    try:
+        from web3 import EthereumTesterProvider
+        w3 = Web3(EthereumTesterProvider())
+        artifact = compile_contract()
+    except ImportError as e:
+        raise RuntimeError(
+            f"inproc:// needs eth-tester[py-evm] and py-solc-x (pip install -r requirements-dev.txt): {str(e)}"
+        )
+
+    deployer = w3.eth.accounts[0]
+    factory = w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bin'])
+    receipt = w3.eth.wait_for_transaction_receipt(factory.constructor().transact({'from': deployer}))
+    logger.info(f"BatchTracker deployed in-process at {receipt['contractAddress']}")
+    return w3, receipt['contractAddress'], artifact['abi']
+
+
+def load_fixtures(path: str) -> List[Dict]:
+    """
+    Read seed batches from a JSON file.
+
+    The file holds a list of batches, or {"batches": [...]} as returned by
+    GET /api/batches; each batch needs a name and origin and may have a
+    tracking_history list.
+
+    :param path: The fixture file path
+    :return: List of batch dictionaries
+    """
+    with open(path) as f:
+        data = json.load(f)
+
+    batches = data['batches'] if isinstance(data, dict) else data
+    for index, batch in enumerate(batches):
+        if not batch.get('name') or not batch.get('origin'):
+            raise ValueError(f"Fixture batch {index} needs a name and an origin")
+    return [
+        {
+            'name': batch['name'],
+            'origin': batch['origin'],
+            'tracking_history': list(batch.get('tracking_history', []))
+        }
+        for batch in batches
+    ]
+
+
+def seed_batches(w3: Web3, contract, sender: str, batches: List[Dict]) -> int:
+    """
+    Create batches with their tracking history on the chain.
+
+    Batches go through createBatches in chunks; the distinct tracking steps are
+    registered in one registerSteps call, and batches sharing a tracking history
+    get it in a single addTrackingSteps call.
+
+    :param w3: The Web3 instance
+    :param contract: The BatchTracker contract instance
+    :param sender: The account sending the seeding transactions
+    :param batches: Batches as returned by load_fixtures
+    :return: The number of batches created
+    """
+    first_id = contract.functions.batchCount().call() + 1
+    histories: Dict[Tuple[str, ...], List[int]] = {}
+
+    for start in range(0, len(batches), SEED_CHUNK_SIZE):
+        chunk = batches[start:start + SEED_CHUNK_SIZE]
+        _transact(w3, contract.functions.createBatches(
+            [batch['name'] for batch in chunk],
+            [batch['origin'] for batch in chunk]
+        ), sender)
+        for offset, batch in enumerate(chunk):
+            if batch['tracking_history']:
+                histories.setdefault(tuple(batch['tracking_history']), []).append(first_id + start + offset)
+
+    distinct_steps = list(dict.fromkeys(step for steps in histories for step in steps))
+    if distinct_steps:
+        _transact(w3, contract.functions.registerSteps(distinct_steps), sender)
+    step_codes = {step: code for code, step in enumerate(contract.functions.getStepNames(0).call()) if code}
+
+    for steps, batch_ids in histories.items():
+        for start in range(0, len(batch_ids), SEED_CHUNK_SIZE):
+            _transact(w3, contract.functions.addTrackingSteps(
+                batch_ids[start:start + SEED_CHUNK_SIZE],
+                [step_codes[step] for step in steps]
+            ), sender)
+
+    return len(batches)
+
+
+def _transact(w3: Web3, function, sender: str):
+    """Send a seeding transaction and wait for it to be mined."""
+    gas = function.estimate_gas({'from': sender})
+    tx_hash = function.transact({'from': sender, 'gas': int(gas * 1.2)})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
@@ -0,0 +1,352 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+Every blockchain RPC and Claude call goes through track_rpc(), which records a
+latency histogram, an error counter and an in-flight gauge labelled by the
+call and by the API endpoint being served; GET /api/metrics renders them.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .request_trace import current_trace
+
+# Latency buckets in seconds, from a cached read to a slow Claude completion
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Endpoint label for calls made outside a request (indexer, fee oracle, write queue workers)
+BACKGROUND_ENDPOINT = 'background'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current_endpoint: contextvars.ContextVar = contextvars.ContextVar('metrics_endpoint', default=BACKGROUND_ENDPOINT)
+
+
+class _Metric:
+    """A named metric family with a fixed set of label names."""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def value(self, **labels) -> float:
+        """
+        Read the current value of one labelled series.
+
+        :param labels: The label values
+        :return: The value, 0 if the series has not been recorded
+        """
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """Snapshot of (sample name, labels, value) for rendering."""
+        with self._lock:
+            return [
+                (self.name, dict(zip(self.labelnames, key)), value)
+                for key, value in sorted(self._values.items())
+            ]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        """
+        Increase the counter.
+
+        :param amount: The non-negative amount to add
+        :param labels: The label values
+        """
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type_name = 'gauge'
+
+    def set(self, value: float, **labels):
+        """
+        Set the gauge.
+
+        :param value: The new value
+        :param labels: The label values
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        """
+        Increase (or with a negative amount, decrease) the gauge.
+
+        :param amount: The amount to add
+        :param labels: The label values
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        """
+        Decrease the gauge.
+
+        :param amount: The amount to subtract
+        :param labels: The label values
+        """
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, with their sum and count."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], List] = {}  # label key -> [bucket counts, sum, count]
+
+    def observe(self, value: float, **labels):
+        """
+        Record an observation.
+
+        :param value: The observed value (seconds for latencies)
+        :param labels: The label values
+        """
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        """
+        Read the number of observations of one labelled series.
+
+        :param labels: The label values
+        :return: The observation count
+        """
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            samples = []
+            for key, (counts, total, count) in sorted(self._series.items()):
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket", {**labels, 'le': _format_value(bound)}, cumulative))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+            return samples
+
+
+class MetricsRegistry:
+    """Collection of metric families rendered together."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        """Create (or return the existing) counter with this name."""
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        """Create (or return the existing) gauge with this name."""
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create (or return the existing) histogram with this name."""
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Iterable[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        :return: The exposition text
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation, quote=False)}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for sample_name, labels, value in metric.samples():
+                label_text = ','.join(f'{name}="{_escape(str(label))}"' for name, label in labels.items())
+                lines.append(f"{sample_name}{{{label_text}}} {_format_value(value)}" if label_text
+                             else f"{sample_name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+RPC_DURATION = REGISTRY.histogram(
+    'bobachain_rpc_duration_seconds',
+    'Latency of blockchain RPC and Claude API calls.',
+    ('method', 'endpoint')
+)
+RPC_ERRORS = REGISTRY.counter(
+    'bobachain_rpc_errors_total',
+    'Blockchain RPC and Claude API calls that failed.',
+    ('method', 'endpoint')
+)
+RPC_IN_FLIGHT = REGISTRY.gauge(
+    'bobachain_rpc_in_flight',
+    'Blockchain RPC and Claude API calls currently running.',
+    ('method', 'endpoint')
+)
+
+HTTP_DURATION = REGISTRY.histogram(
+    'bobachain_http_request_duration_seconds',
+    'Latency of API requests, including streamed bodies.',
+    ('endpoint', 'http_method')
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    'bobachain_http_requests_total',
+    'API requests served, by response status.',
+    ('endpoint', 'http_method', 'status')
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'bobachain_http_requests_in_flight',
+    'API requests currently being served.',
+    ('endpoint', 'http_method')
+)
+
+
+def set_endpoint(endpoint: Optional[str]) -> contextvars.Token:
+    """
+    Label calls made from now on in this thread with an API endpoint.
+
+    :param endpoint: The endpoint (route rule) being served, or None for background work
+    :return: A token for reset_endpoint()
+    """
+    return _current_endpoint.set(endpoint or BACKGROUND_ENDPOINT)
+
+
+def reset_endpoint(token: contextvars.Token):
+    """
+    Restore the endpoint label that was current before set_endpoint().
+
+    :param token: The token returned by set_endpoint()
+    """
+    _current_endpoint.reset(token)
+
+
+def current_endpoint() -> str:
+    """The endpoint label for calls made in this thread."""
+    return _current_endpoint.get()
+
+
+class TrackedCall:
+    """
+    Context manager timing one outgoing call (see track_rpc).
+
+    An exception leaving the block counts as an error; callers that handle
+    failures themselves (returning None instead of raising) call fail().
+    A generator being closed early (GeneratorExit) is not an error.
+    """
+
+    def __init__(self, method: str):
+        """
+        Initialize the timer for a call.
+
+        :param method: The contract function, Web3 method or API call being made
+        """
+        self.method = method
+        self.endpoint = current_endpoint()
+        self.failed = False
+        self.duration: Optional[float] = None
+        self._started: Optional[float] = None
+
+    def fail(self):
+        """Count this call as an error even though no exception escapes the block."""
+        self.failed = True
+
+    def __enter__(self) -> 'TrackedCall':
+        RPC_IN_FLIGHT.inc(method=self.method, endpoint=self.endpoint)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self.duration = time.perf_counter() - self._started
+        RPC_IN_FLIGHT.dec(method=self.method, endpoint=self.endpoint)
+        RPC_DURATION.observe(self.duration, method=self.method, endpoint=self.endpoint)
+        failed = self.failed or (exc_type is not None and not issubclass(exc_type, GeneratorExit))
+        if failed:
+            RPC_ERRORS.inc(method=self.method, endpoint=self.endpoint)
+        trace = current_trace()
+        if trace is not None:
+            trace.record_call(self.method, self.duration, failed)
+        return False
+
+
+def track_rpc(method: str) -> TrackedCall:
+    """
+    Time an outgoing blockchain RPC or Claude call.
+
+        with track_rpc('getBatchHistory'):
+            contract.functions.getBatchHistory(batch_id).call()
+
+    :param method: The contract function, Web3 method or API call being made
+    :return: The context manager recording the call
+    """
+    return TrackedCall(method)
+
+
+def _escape(text: str, quote: bool = True) -> str:
+    """Escape a label value (or, without quotes, HELP text) for the exposition format."""
+    text = text.replace('\\', '\\\\').replace('\n', '\\n')
+    return text.replace('"', '\\"') if quote else text
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value or bucket bound the way Prometheus expects."""
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
@@ -0,0 +1,98 @@
+"""
+Nonce manager for transactions sent by the blockchain service.
+Hands out nonces locally so concurrent writes never reuse a nonce and do not
+need a get_transaction_count round trip each.
+"""
+
+import logging
+import threading
+from typing import Dict
+
+from .metrics import track_rpc
+
+logger = logging.getLogger(__name__)
+
+# Fragments of node error messages that mean our local nonce is out of step with the chain
+NONCE_ERROR_MESSAGES = (
+    'nonce too low',
+    'nonce too high',
+    'invalid nonce',
+    'already known',
+    'known transaction',
+    'replacement transaction underpriced',
+    "the tx doesn't have the correct nonce",
+)
+
+
+class NonceManager:
+    """Thread-safe, per-sender nonce allocator."""
+
+    def __init__(self, w3):
+        """
+        Initialize the nonce manager.
+
+        :param w3: A connected Web3 instance used to read the chain nonce
+        """
+        self.w3 = w3
+        self._lock = threading.Lock()
+        self._next_nonce: Dict[str, int] = {}
+
+    def allocate(self, sender: str) -> int:
+        """
+        Reserve the next nonce for a sender.
+
+        The chain nonce (including pending transactions) is read only on the
+        first allocation for a sender or after a resync.
+
+        :param sender: The sending address
+        :return: The nonce to use for the next transaction
+        """
+        with self._lock:
+            if sender not in self._next_nonce:
+                with track_rpc('get_transaction_count'):
+                    self._next_nonce[sender] = self.w3.eth.get_transaction_count(sender, 'pending')
+                logger.debug(f"Synced nonce for {sender}: {self._next_nonce[sender]}")
+            nonce = self._next_nonce[sender]
+            self._next_nonce[sender] = nonce + 1
+            return nonce
+
+    async def allocate_async(self, sender: str) -> int:
+        """
+        Reserve the next nonce for a sender when the manager wraps an AsyncWeb3 instance.
+
+        :param sender: The sending address
+        :return: The nonce to use for the next transaction
+        """
+        with self._lock:
+            if sender in self._next_nonce:
+                nonce = self._next_nonce[sender]
+                self._next_nonce[sender] = nonce + 1
+                return nonce
+
+        # Read outside the lock; if another caller synced meanwhile, its value wins
+        with track_rpc('get_transaction_count'):
+            chain_nonce = await self.w3.eth.get_transaction_count(sender, 'pending')
+        with self._lock:
+            nonce = self._next_nonce.setdefault(sender, chain_nonce)
+            self._next_nonce[sender] = nonce + 1
+            return nonce
+
+    def resync(self, sender: str):
+        """
+        Discard the local nonce for a sender so the next allocation re-reads the chain.
+
+        :param sender: The sending address
+        """
+        with self._lock:
+            self._next_nonce.pop(sender, None)
+
+    @staticmethod
+    def is_nonce_error(error: Exception) -> bool:
+        """
+        Check whether a send failure was caused by a stale nonce.
+
+        :param error: The exception raised while sending
+        :return: True if resyncing and retrying may succeed
+        """
+        message = str(error).lower()
+        return any(fragment in message for fragment in NONCE_ERROR_MESSAGES)
@@ -0,0 +1,277 @@
+"""
+Per-request accounting of blockchain RPC and Claude calls.
+While an API request is served, every JSON-RPC request sent through Web3 (and
+every batched read or Claude API request) is counted and timed in a
+RequestTrace, which the API reports in Server-Timing and X-RPC-Calls response
+headers. SlowRequestProfiler profiles a sample of requests and keeps the
+profiles of those that turn out slow.
+"""
+
+import contextvars
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from web3.middleware import Web3Middleware
+
+logger = logging.getLogger(__name__)
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('request_trace', default=None)
+
+
+class RequestTrace:
+    """Counts and durations of the outgoing calls made while serving one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.rpc: Dict[str, List] = {}    # JSON-RPC or API method -> [requests, seconds]
+        self.calls: Dict[str, List] = {}  # track_rpc() call -> [calls, seconds, errors]
+
+    def record_rpc(self, method: str, duration: float, count: int = 1):
+        """
+        Record requests sent over the wire.
+
+        :param method: The JSON-RPC method (e.g. eth_call) or API request name
+        :param duration: Seconds the round trip took
+        :param count: Requests carried by the round trip (more than one for JSON-RPC batches)
+        """
+        with self._lock:
+            entry = self.rpc.setdefault(method, [0, 0.0])
+            entry[0] += count
+            entry[1] += duration
+
+    def record_call(self, method: str, duration: float, failed: bool = False):
+        """
+        Record a service-level call timed by track_rpc(), including its ABI encoding and decoding.
+
+        :param method: The contract function, Web3 method or API call
+        :param duration: Seconds the call took
+        :param failed: Whether the call failed
+        """
+        with self._lock:
+            entry = self.calls.setdefault(method, [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] += 1 if failed else 0
+
+    @property
+    def rpc_count(self) -> int:
+        """Total requests sent to the node and the Claude API."""
+        with self._lock:
+            return sum(count for count, _ in self.rpc.values())
+
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """
+        Build the Server-Timing header value.
+
+        Each tracked call and each wire method gets an entry with its total
+        duration and count; "total" is the time spent on the request so far.
+
+        :return: The header value
+        """
+        with self._lock:
+            entries = [
+                f'{_token(method)};dur={seconds * 1000:.2f};desc="{count}x{f", {errors} failed" if errors else ""}"'
+                for method, (count, seconds, errors) in sorted(self.calls.items())
+            ]
+            entries += [
+                f'rpc.{_token(method)};dur={seconds * 1000:.2f};desc="{count}x"'
+                for method, (count, seconds) in sorted(self.rpc.items())
+            ]
+        entries.append(f'total;dur={self.elapsed() * 1000:.2f}')
+        return ', '.join(entries)
+
+    def summary(self) -> Dict:
+        """
+        Describe the trace for logging.
+
+        :return: A dictionary of elapsed milliseconds, request count and per-method counts
+        """
+        with self._lock:
+            return {
+                'elapsed_ms': round(self.elapsed() * 1000, 2),
+                'rpc_calls': sum(count for count, _ in self.rpc.values()),
+                'rpc': {method: count for method, (count, _) in sorted(self.rpc.items())},
+                'calls': {method: count for method, (count, _, _) in sorted(self.calls.items())}
+            }
+
+
+def start_trace() -> RequestTrace:
+    """
+    Start tracing the calls made from this thread.
+
+    :return: The new trace
+    """
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def end_trace():
+    """Stop tracing the calls made from this thread."""
+    _current_trace.set(None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """The trace of the request being served by this thread, if any."""
+    return _current_trace.get()
+
+
+class RPCTracingMiddleware(Web3Middleware):
+    """Web3 middleware recording each JSON-RPC request in the current request's trace."""
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            trace = _current_trace.get()
+            if trace is None:
+                return make_request(method, params)
+            started = time.perf_counter()
+            try:
+                return make_request(method, params)
+            finally:
+                trace.record_rpc(method, time.perf_counter() - started)
+        return middleware
+
+
+def record_rpc(method: str, duration: float, count: int = 1):
+    """
+    Record requests sent outside Web3 (batched reads, Claude) in the current request's trace, if any.
+
+    :param method: The JSON-RPC method or API request name
+    :param duration: Seconds the round trip took
+    :param count: Requests carried by the round trip
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record_rpc(method, duration, count)
+
+
+def install_rpc_tracing(w3):
+    """
+    Add request tracing to a Web3 instance.
+
+    :param w3: The Web3 instance whose JSON-RPC requests should be traced
+    """
+    try:
+        w3.middleware_onion.add(RPCTracingMiddleware, name='request_trace')
+    except ValueError:
+        # Already installed
+        pass
+
+
+class SlowRequestProfiler:
+    """
+    Profiles a sample of requests with cProfile and writes the profiles of slow ones to disk.
+
+    Only one request is profiled at a time, so profiling overhead stays bounded
+    under load; a request arriving while another is profiled is not sampled.
+    """
+
+    def __init__(self, threshold_ms: float, sample_rate: float = 0.1, output_dir: str = './profiles',
+                 max_files: int = 100):
+        """
+        Initialize the profiler.
+
+        :param threshold_ms: Profiles of requests slower than this are kept (0 disables profiling)
+        :param sample_rate: Fraction of requests profiled
+        :param output_dir: Directory the .prof files (pstats format) are written to
+        :param max_files: Number of profiles kept; the oldest are deleted beyond this
+        """
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self._busy = threading.Lock()
+        self._written = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any request can be profiled."""
+        return self.threshold_ms > 0 and self.sample_rate > 0
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """
+        Start profiling the current request if it is sampled.
+
+        :return: The running profile, or None if the request is not profiled
+        """
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except Exception as e:
+            self._busy.release()
+            logger.error(f"Error starting request profile: {str(e)}")
+            return None
+        return profile
+
+    def finish(self, profile: cProfile.Profile, elapsed_ms: float, label: str) -> Optional[str]:
+        """
+        Stop a profile started by start() and write it to disk if the request was slow.
+
+        :param profile: The profile returned by start()
+        :param elapsed_ms: How long the request took
+        :param label: Short description of the request (method and route) for the file name
+        :return: The path of the written profile, or None if it was discarded
+        """
+        try:
+            profile.disable()
+        finally:
+            self._busy.release()
+
+        if elapsed_ms < self.threshold_ms:
+            return None
+
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime())
+            path = os.path.join(self.output_dir, f"{stamp}-{_token(label)}-{int(elapsed_ms)}ms.prof")
+            profile.dump_stats(path)
+            self._written += 1
+            self._prune()
+            logger.info(f"Profile of {label} ({elapsed_ms:.0f} ms) written to {path}")
+            return path
+        except Exception as e:
+            logger.error(f"Error writing request profile: {str(e)}")
+            return None
+
+    def status(self) -> Dict:
+        """
+        Describe the profiler for reporting.
+
+        :return: A dictionary with the threshold, sample rate, output directory and profiles written
+        """
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': self.threshold_ms,
+            'sample_rate': self.sample_rate,
+            'output_dir': self.output_dir,
+            'profiles_written': self._written
+        }
+
+    def _prune(self):
+        """Delete the oldest profiles beyond max_files."""
+        profiles = sorted(
+            (entry for entry in os.scandir(self.output_dir) if entry.name.endswith('.prof')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in profiles[:max(0, len(profiles) - self.max_files)]:
+            os.remove(entry.path)
+
+
+def _token(text: str) -> str:
+    """Reduce text to characters allowed in a Server-Timing name or a file name."""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', text).strip('_') or 'request'
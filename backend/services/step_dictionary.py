@@ -0,0 +1,84 @@
+"""
+Client-side copy of the BatchTracker step dictionary.
+The contract stores tracking steps as uint16 codes into an on-chain list of
+step names; this cache maps between the two so the service can send codes and
+return step text without a dictionary lookup on the node per step.
+"""
+
+import threading
+from typing import Dict, Iterable, List
+
+# Code 0 is reserved on chain for "not registered"
+RESERVED_CODE = 0
+
+
+class StepDictionary:
+    """Thread-safe, append-only mapping between step text and step codes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names: List[str] = ['']  # index = code
+        self._codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        """The number of codes known, including the reserved code 0 (the next code to fetch)."""
+        with self._lock:
+            return len(self._names)
+
+    def extend(self, from_code: int, names: Iterable[str]):
+        """
+        Add step names read from the chain.
+
+        :param from_code: The code of the first name
+        :param names: Consecutive step names, as returned by getStepNames(from_code)
+        """
+        with self._lock:
+            for code, name in enumerate(names, start=from_code):
+                if code < len(self._names):
+                    continue
+                if code > len(self._names):
+                    raise ValueError(f"Step code {code} read before code {len(self._names)}")
+                self._names.append(name)
+                self._codes.setdefault(name, code)
+
+    def missing(self, steps: Iterable[str]) -> List[str]:
+        """
+        Find the steps that have no code yet.
+
+        :param steps: Step texts
+        :return: The unknown steps, deduplicated, in first-seen order
+        """
+        with self._lock:
+            return list(dict.fromkeys(step for step in steps if step not in self._codes))
+
+    def encode(self, steps: Iterable[str]) -> List[int]:
+        """
+        Translate step texts to codes.
+
+        :param steps: Step texts, all registered
+        :return: The step codes
+        :raises KeyError: If a step is not registered
+        """
+        with self._lock:
+            return [self._codes[step] for step in steps]
+
+    def knows(self, codes: Iterable[int]) -> bool:
+        """Whether every code can be decoded without refreshing from the chain."""
+        with self._lock:
+            return all(RESERVED_CODE < code < len(self._names) for code in codes)
+
+    def decode(self, codes: Iterable[int]) -> List[str]:
+        """
+        Translate step codes to texts.
+
+        :param codes: Step codes read from the chain
+        :return: The step texts
+        :raises KeyError: If a code is unknown
+        """
+        with self._lock:
+            names = []
+            for code in codes:
+                if not RESERVED_CODE < code < len(self._names):
+                    raise KeyError(f"Unknown step code {code}")
+                names.append(self._names[code])
+            return names
@@ -0,0 +1,205 @@
+"""
+Write queue for blockchain transactions.
+Runs write operations on a pool of worker threads so API requests can return
+immediately, and tracks each job from queued through submitted to mined.
+Workers only submit; one poller thread follows every pending receipt, so slow
+blocks do not hold up later submissions.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from web3.exceptions import TimeExhausted
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_SUBMITTED = 'submitted'
+JOB_MINED = 'mined'
+JOB_FAILED = 'failed'
+
+# Service methods that may be queued, mapped to the message logged on failure
+OPERATIONS = {
+    'create_batch': "Failed to create batch on blockchain",
+    'add_tracking_step': "Failed to add tracking step",
+}
+
+
+class WriteQueue:
+    """Asynchronous executor and status tracker for blockchain write jobs."""
+
+    def __init__(self, service, workers: int = 4, max_jobs: int = 10000):
+        """
+        Initialize the write queue.
+
+        Receipts are polled with the service's BLOCKCHAIN_RECEIPT_TIMEOUT and
+        BLOCKCHAIN_RECEIPT_POLL_INTERVAL settings.
+
+        :param service: The BlockchainService used to send transactions
+        :param workers: Number of worker threads submitting transactions
+        :param max_jobs: Number of jobs remembered before the oldest finished ones are forgotten
+        """
+        self.service = service
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="write-queue")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        # Submitted jobs awaiting their receipt: job ID -> (operation, tx_hash, deadline)
+        self._pending: Dict[str, Tuple[str, str, float]] = {}
+        self._pending_added = threading.Condition(self._lock)
+        self._poller: Optional[threading.Thread] = None
+        self._closing = False
+
+    def enqueue(self, operation: str, **params) -> Dict:
+        """
+        Queue a write operation.
+
+        :param operation: The BlockchainService method to call ('create_batch' or 'add_tracking_step')
+        :param params: Keyword arguments for the method
+        :return: A snapshot of the new job
+        """
+        job = self._add_job(operation, params, status=JOB_QUEUED, tx_hash=None)
+        self._executor.submit(self._run, job['id'])
+        return job
+
+    def track(self, operation: str, tx_hash: str, **params) -> Dict:
+        """
+        Follow a transaction that was already sent until it is mined.
+
+        Used when a request stops waiting for its receipt; the job resolves
+        the batch ID like a queued write would.
+
+        :param operation: The BlockchainService method that sent the transaction
+        :param tx_hash: The transaction hash
+        :param params: The keyword arguments the method was called with
+        :return: A snapshot of the new job, already in the submitted state
+        """
+        job = self._add_job(operation, params, status=JOB_SUBMITTED, tx_hash=tx_hash)
+        self._watch(job['id'], operation, tx_hash)
+        return job
+
+    def _add_job(self, operation: str, params: Dict, status: str, tx_hash: Optional[str]) -> Dict:
+        """Store a new job and return a snapshot of it."""
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unsupported write operation: {operation}")
+
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'operation': operation,
+            'params': params,
+            'status': status,
+            'tx_hash': tx_hash,
+            'batch_id': params.get('batch_id'),
+            'error': None,
+            'created_at': now,
+            'updated_at': now
+        }
+        with self._lock:
+            self._jobs[job['id']] = job
+            self._evict()
+            return dict(job)
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """
+        Get the current state of a job.
+
+        :param job_id: The job ID returned by enqueue
+        :return: A snapshot of the job, or None if it is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs and optionally wait for running ones to be submitted and mined."""
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            self._closing = True
+            self._pending_added.notify()
+            poller = self._poller
+        if wait and poller:
+            poller.join()
+
+    def _update(self, job_id: str, **changes):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(changes, updated_at=time.time())
+
+    def _evict(self):
+        """Forget the oldest finished jobs once more than max_jobs are stored."""
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in (JOB_MINED, JOB_FAILED)]
+        for job_id in finished[:excess]:
+            del self._jobs[job_id]
+
+    def _run(self, job_id: str):
+        job = self.get_job(job_id)
+        operation = job['operation']
+        try:
+            tx_hash = getattr(self.service, operation)(**job['params'])
+            if not tx_hash:
+                raise RuntimeError(OPERATIONS[operation])
+            self._update(job_id, status=JOB_SUBMITTED, tx_hash=tx_hash)
+        except Exception as e:
+            logger.error(f"Write job {job_id} ({operation}) failed: {str(e)}")
+            self._update(job_id, status=JOB_FAILED, error=str(e))
+            return
+
+        self._watch(job_id, operation, tx_hash)
+
+    def _watch(self, job_id: str, operation: str, tx_hash: str):
+        """Hand a submitted job to the receipt poller, starting it on first use."""
+        with self._lock:
+            self._pending[job_id] = (operation, tx_hash, time.monotonic() + self.service.receipt_timeout)
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll_receipts, name="write-queue-receipts",
+                                                daemon=True)
+                self._poller.start()
+            self._pending_added.notify()
+
+    def _poll_receipts(self):
+        """Poll every pending receipt in turn, backing off from the poll interval up to one second."""
+        delay = self.service.receipt_poll_interval
+        while True:
+            with self._lock:
+                while not self._pending and not self._closing:
+                    self._pending_added.wait()
+                if not self._pending:
+                    return
+                pending = list(self._pending.items())
+
+            for job_id, (operation, tx_hash, deadline) in pending:
+                try:
+                    receipt = self.service.get_receipt(tx_hash)
+                    if receipt is None:
+                        if time.monotonic() < deadline:
+                            continue
+                        raise TimeExhausted(
+                            f"Transaction {tx_hash} not mined after {self.service.receipt_timeout} seconds"
+                        )
+                    if operation == 'create_batch':
+                        batch_ids = self.service.created_batch_ids(receipt)
+                        self._update(job_id, status=JOB_MINED, batch_id=batch_ids[0] if batch_ids else None)
+                    else:
+                        self._update(job_id, status=JOB_MINED)
+                except Exception as e:
+                    logger.error(f"Write job {job_id} ({operation}) failed: {str(e)}")
+                    self._update(job_id, status=JOB_FAILED, error=str(e))
+                with self._lock:
+                    del self._pending[job_id]
+
+            with self._lock:
+                # A new submission is polled straight away, then backed off again
+                if self._pending and self._pending_added.wait(delay):
+                    delay = self.service.receipt_poll_interval
+                else:
+                    delay = min(delay * 2, 1.0)
@@ -0,0 +1,65 @@
+// BatchTracker before the step dictionary, storing tracking steps as strings.
+// Kept only so tests/test_inproc.py can compare gas against contracts/BatchTracker.sol.
+pragma solidity ^0.8.0;
+
+contract BatchTracker {
+    struct Batch {
+        string name;
+        string origin;
+        string[] trackingHistory;
+        uint256 timestamp;
+    }
+
+    mapping(uint256 => Batch) public batches;
+    uint256 public batchCount;
+
+    event BatchCreated(uint256 batchId, string name, string origin);
+    event TrackingStepAdded(uint256 batchId, string step);
+
+    function createBatch(string memory _name, string memory _origin) public {
+        batchCount++;
+        batches[batchCount] = Batch(_name, _origin, new string[](0), block.timestamp);
+        emit BatchCreated(batchCount, _name, _origin);
+    }
+
+    function createBatches(string[] memory _names, string[] memory _origins) public {
+        require(_names.length == _origins.length, "Names and origins length mismatch");
+        for (uint256 i = 0; i < _names.length; i++) {
+            createBatch(_names[i], _origins[i]);
+        }
+    }
+
+    function addTrackingStep(uint256 _batchId, string memory _step) public {
+        require(_batchId > 0 && _batchId <= batchCount, "Batch does not exist");
+        batches[_batchId].trackingHistory.push(_step);
+        emit TrackingStepAdded(_batchId, _step);
+    }
+
+    function addTrackingSteps(uint256[] memory _batchIds, string[] memory _steps) public {
+        for (uint256 i = 0; i < _batchIds.length; i++) {
+            for (uint256 j = 0; j < _steps.length; j++) {
+                addTrackingStep(_batchIds[i], _steps[j]);
+            }
+        }
+    }
+
+    function getBatchHistory(uint256 _batchId) public view returns (Batch memory) {
+        require(_batchId > 0 && _batchId <= batchCount, "Batch does not exist");
+        return batches[_batchId];
+    }
+
+    function getBatches(uint256 _fromId, uint256 _count) public view returns (Batch[] memory) {
+        require(_fromId > 0, "Batch IDs start at 1");
+        if (_fromId > batchCount) {
+            return new Batch[](0);
+        }
+
+        uint256 available = batchCount - _fromId + 1;
+        uint256 size = _count < available ? _count : available;
+        Batch[] memory page = new Batch[](size);
+        for (uint256 i = 0; i < size; i++) {
+            page[i] = batches[_fromId + i];
+        }
+        return page;
+    }
+}
@@ -6,7 +6,7 @@ Tests cover all endpoints, error handling, and validation.
 import pytest
 import json
 from flask import json as flask_json
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
 import sys
 import os
 
@@ -14,6 +14,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app, validate_batch_creation_data, validate_batch_id, validate_tracking_step
+from services.blockchain import BlockchainService
 
 
 @pytest.fixture
@@ -29,6 +30,11 @@ def mock_blockchain_service():
     """Fixture to provide a mock blockchain service."""
     with patch('app.blockchain_service') as mock:
         mock.is_connected.return_value = True
+        mock.as_of_block.return_value = None
+        mock.get_diagnostics.return_value = {}
+        mock.head_block.return_value = None
+        mock.data_generation.return_value = 0
+        mock.cached_step_count.return_value = None
         yield mock
 
 
@@ -126,9 +132,47 @@ class TestHealthCheck:
         """Test health check when blockchain is not connected."""
         with patch('app.blockchain_service') as mock:
             mock.is_connected.return_value = False
+            mock.get_diagnostics.return_value = {}
             response = client.get('/api/health')
             assert response.status_code == 503
 
+    def test_health_check_reports_diagnostics(self, client, mock_blockchain_service):
+        """Test that background component state is included in the health report."""
+        mock_blockchain_service.get_diagnostics.return_value = {
+            'fee_oracle': {'mode': 'auto', 'age_seconds': 1.5, 'stale': False}
+        }
+
+        response = client.get('/api/health')
+
+        data = response.get_json()
+        assert data['diagnostics']['fee_oracle']['age_seconds'] == 1.5
+
+    def test_health_check_real_service(self, client):
+        """Test the health report of a real BlockchainService, with only the node behind Web3 mocked."""
+        w3 = MagicMock()
+        w3.is_connected.return_value = True
+        w3.eth.block_number = 7
+        w3.eth.get_block.return_value = {'number': 7, 'baseFeePerGas': 10}
+        w3.eth.max_priority_fee = 2
+        w3.eth.accounts = []
+        with patch('services.blockchain.Web3', return_value=w3):
+            service = BlockchainService(provider_url='http://127.0.0.1:1')
+        service.health_monitor.stop()
+        service.fee_oracle.stop()
+        service.fee_oracle.refresh()
+
+        with patch('app.blockchain_service', service):
+            response = client.get('/api/health')
+
+        assert response.status_code == 200
+        diagnostics = response.get_json()['diagnostics']
+        assert diagnostics['fee_oracle']['fees'] == {'maxFeePerGas': 22, 'maxPriorityFeePerGas': 2}
+        assert diagnostics['fee_oracle']['age_seconds'] is not None
+        assert diagnostics['connection']['connected'] is True
+        assert diagnostics['connection']['last_block'] == 7
+        assert diagnostics['connection']['probe_age_seconds'] is not None
+        assert diagnostics['connection']['latency_ms']['p50'] is not None
+
 
 class TestCreateBatch:
     """Tests for the create batch endpoint."""
@@ -136,7 +180,7 @@ class TestCreateBatch:
     def test_create_batch_success(self, client, mock_blockchain_service):
         """Test successful batch creation."""
         mock_blockchain_service.create_batch.return_value = "0x123abc"
-        mock_blockchain_service.get_batch_count.return_value = 1
+        mock_blockchain_service.get_created_batch_id.return_value = 1
 
         response = client.post('/api/batch', json={
             "name": "Tapioca Pearls",
@@ -146,6 +190,9 @@ class TestCreateBatch:
         assert response.status_code == 201
         data = response.get_json()
         assert data['message'] == "Batch created successfully"
+        assert data['batch_id'] == 1
+        mock_blockchain_service.get_created_batch_id.assert_called_once_with("0x123abc", timeout=2.0)
+        mock_blockchain_service.get_batch_count.assert_not_called()
         assert data['name'] == "Tapioca Pearls"
         assert data['origin'] == "Taiwan"
         assert 'tx_hash' in data
@@ -206,6 +253,165 @@ class TestCreateBatch:
             assert response.status_code == 503
 
 
+class TestBulkCreateBatches:
+    """Tests for the bulk batch creation endpoint."""
+
+    def test_bulk_create_success(self, client, mock_blockchain_service):
+        """Test that batches are created and chunk ID ranges returned."""
+        mock_blockchain_service.create_batches.return_value = [
+            {'tx_hash': '0xaaa', 'count': 2, 'first_batch_id': 1, 'last_batch_id': 2},
+            {'tx_hash': '0xbbb', 'count': 1, 'first_batch_id': 3, 'last_batch_id': 3}
+        ]
+
+        response = client.post('/api/batches/bulk', json={"batches": [
+            {"name": "Tapioca Pearls", "origin": "Taiwan"},
+            {"name": "Milk Tea", "origin": "China"},
+            {"name": "Brown Sugar", "origin": "Okinawa"}
+        ]})
+
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data['count'] == 3
+        assert data['chunks'][1]['first_batch_id'] == 3
+        mock_blockchain_service.create_batches.assert_called_once_with(
+            names=["Tapioca Pearls", "Milk Tea", "Brown Sugar"],
+            origins=["Taiwan", "China", "Okinawa"]
+        )
+
+    def test_bulk_create_invalid_item(self, client, mock_blockchain_service):
+        """Test that an invalid item is reported with its index."""
+        response = client.post('/api/batches/bulk', json={"batches": [
+            {"name": "Tapioca Pearls", "origin": "Taiwan"},
+            {"name": "Milk Tea"}
+        ]})
+
+        assert response.status_code == 400
+        assert response.get_json()['error'].startswith("Batch 1:")
+        mock_blockchain_service.create_batches.assert_not_called()
+
+    def test_bulk_create_empty(self, client, mock_blockchain_service):
+        """Test that an empty batch list is rejected."""
+        response = client.post('/api/batches/bulk', json={"batches": []})
+
+        assert response.status_code == 400
+
+    def test_bulk_create_partial_failure(self, client, mock_blockchain_service):
+        """Test that failed chunks are reported alongside successful ones."""
+        mock_blockchain_service.create_batches.return_value = [
+            {'tx_hash': '0xaaa', 'count': 1, 'first_batch_id': 1, 'last_batch_id': 1},
+            {'tx_hash': None, 'count': 1, 'error': 'insufficient funds'}
+        ]
+
+        response = client.post('/api/batches/bulk', json={"batches": [
+            {"name": "Tapioca Pearls", "origin": "Taiwan"},
+            {"name": "Milk Tea", "origin": "China"}
+        ]})
+
+        assert response.status_code == 500
+        assert len(response.get_json()['chunks']) == 2
+
+
+class TestAsyncWrites:
+    """Tests for writes answered with 202 Accepted and the job status endpoint."""
+
+    @pytest.fixture
+    def mock_write_queue(self):
+        """Fixture to provide a mock write queue."""
+        with patch('app.write_queue') as mock:
+            mock.enqueue.return_value = {'id': 'job123', 'status': 'queued'}
+            yield mock
+
+    def test_create_batch_async(self, client, mock_blockchain_service, mock_write_queue):
+        """Test that clients preferring async get a job instead of waiting for the transaction."""
+        response = client.post('/api/batch', json={
+            "name": "Tapioca Pearls",
+            "origin": "Taiwan"
+        }, headers={'Prefer': 'respond-async'})
+
+        assert response.status_code == 202
+        data = response.get_json()
+        assert data['job_id'] == 'job123'
+        assert response.headers['Location'].endswith('/api/jobs/job123')
+        mock_write_queue.enqueue.assert_called_once_with('create_batch', name="Tapioca Pearls", origin="Taiwan")
+        mock_blockchain_service.create_batch.assert_not_called()
+
+    def test_create_batch_not_mined_in_time(self, client, mock_blockchain_service, mock_write_queue):
+        """Test that a batch still pending after the short wait is handed to a job."""
+        mock_blockchain_service.create_batch.return_value = "0x123abc"
+        mock_blockchain_service.get_created_batch_id.return_value = None
+        mock_write_queue.track.return_value = {'id': 'job456', 'status': 'submitted'}
+
+        response = client.post('/api/batch', json={
+            "name": "Tapioca Pearls",
+            "origin": "Taiwan"
+        })
+
+        assert response.status_code == 202
+        data = response.get_json()
+        assert data['batch_id'] is None
+        assert data['tx_hash'] == "0x123abc"
+        assert data['job_id'] == 'job456'
+        assert data['status'] == 'submitted'
+        assert response.headers['Location'].endswith('/api/jobs/job456')
+        mock_write_queue.track.assert_called_once_with(
+            'create_batch', "0x123abc", name="Tapioca Pearls", origin="Taiwan"
+        )
+
+    def test_create_batch_wait(self, client, mock_blockchain_service, mock_write_queue):
+        """Test that ?wait=true waits the full receipt timeout."""
+        mock_blockchain_service.create_batch.return_value = "0x123abc"
+        mock_blockchain_service.get_created_batch_id.return_value = 1
+
+        response = client.post('/api/batch?wait=true', json={
+            "name": "Tapioca Pearls",
+            "origin": "Taiwan"
+        })
+
+        assert response.status_code == 201
+        assert response.get_json()['batch_id'] == 1
+        mock_blockchain_service.get_created_batch_id.assert_called_once_with("0x123abc", timeout=None)
+        mock_write_queue.track.assert_not_called()
+
+    def test_add_tracking_step_async(self, client, mock_blockchain_service, mock_write_queue):
+        """Test that tracking steps can be queued."""
+        response = client.post('/api/batch/1/tracking', json={
+            "step": "Harvested"
+        }, headers={'Prefer': 'respond-async'})
+
+        assert response.status_code == 202
+        mock_write_queue.enqueue.assert_called_once_with('add_tracking_step', batch_id=1, step="Harvested", note='')
+
+    def test_async_writes_still_validated(self, client, mock_blockchain_service, mock_write_queue):
+        """Test that invalid writes are rejected before being queued."""
+        response = client.post('/api/batch', json={"name": "Tapioca Pearls"},
+                               headers={'Prefer': 'respond-async'})
+
+        assert response.status_code == 400
+        mock_write_queue.enqueue.assert_not_called()
+
+    def test_get_job(self, client, mock_write_queue):
+        """Test that job status includes the transaction and resolved batch ID."""
+        mock_write_queue.get_job.return_value = {
+            'id': 'job123', 'operation': 'create_batch', 'status': 'mined',
+            'tx_hash': '0x123abc', 'batch_id': 7, 'error': None
+        }
+
+        response = client.get('/api/jobs/job123')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['status'] == 'mined'
+        assert data['batch_id'] == 7
+
+    def test_get_job_not_found(self, client, mock_write_queue):
+        """Test that unknown jobs return 404."""
+        mock_write_queue.get_job.return_value = None
+
+        response = client.get('/api/jobs/unknown')
+
+        assert response.status_code == 404
+
+
 class TestGetBatch:
     """Tests for the get batch endpoint."""
 
@@ -227,6 +433,24 @@ class TestGetBatch:
         assert data['name'] == 'Tapioca Pearls'
         assert data['origin'] == 'Taiwan'
 
+    def test_get_batch_reports_index_freshness(self, client, mock_blockchain_service):
+        """Test batch retrieval served from the local index includes its block marker."""
+        mock_blockchain_service.get_batch.return_value = {
+            'id': 1,
+            'name': 'Tapioca Pearls',
+            'origin': 'Taiwan',
+            'tracking_history': ['Harvested'],
+            'timestamp': 1234567890
+        }
+        mock_blockchain_service.as_of_block.return_value = 42
+
+        response = client.get('/api/batch/1')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['as_of_block'] == 42
+        assert data['tracking_history'] == ['Harvested']
+
     def test_get_batch_not_found(self, client, mock_blockchain_service):
         """Test batch retrieval when batch doesn't exist."""
         mock_blockchain_service.get_batch.return_value = None
@@ -265,6 +489,51 @@ class TestGetBatch:
             assert response.status_code == 503
 
 
+class TestBatchEvents:
+    """Tests for the batch event timeline endpoint."""
+
+    def test_get_batch_events(self, client, mock_blockchain_service):
+        """Test that the batch's events are returned with the requested block range passed on."""
+        mock_blockchain_service.get_batch_events.return_value = [
+            {"event": "BatchCreated", "name": "Tapioca Pearls", "origin": "Taiwan",
+             "block_number": 3, "log_index": 0, "transaction_hash": "0xab"}
+        ]
+
+        response = client.get('/api/batch/1/events?from_block=2&to_block=9')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['batch_id'] == 1
+        assert data['count'] == 1
+        assert data['events'][0]['event'] == 'BatchCreated'
+        mock_blockchain_service.get_batch_events.assert_called_once_with(1, from_block=2, to_block=9)
+
+    def test_service_defaults_for_omitted_range(self, client, mock_blockchain_service):
+        """Test that omitted bounds are left to the service (creation block to latest block)."""
+        mock_blockchain_service.get_batch_events.return_value = []
+
+        response = client.get('/api/batch/1/events')
+
+        assert response.status_code == 200
+        mock_blockchain_service.get_batch_events.assert_called_once_with(1, from_block=None, to_block=None)
+
+    def test_invalid_block_range(self, client, mock_blockchain_service):
+        """Test that malformed, negative or inverted block ranges are rejected."""
+        for query in ('from_block=abc', 'to_block=-1', 'from_block=9&to_block=2'):
+            response = client.get(f'/api/batch/1/events?{query}')
+            assert response.status_code == 400
+
+        mock_blockchain_service.get_batch_events.assert_not_called()
+
+    def test_get_batch_events_error(self, client, mock_blockchain_service):
+        """Test that a failed log query returns 500."""
+        mock_blockchain_service.get_batch_events.return_value = None
+
+        response = client.get('/api/batch/1/events')
+
+        assert response.status_code == 500
+
+
 class TestAddTrackingStep:
     """Tests for the add tracking step endpoint."""
 
@@ -283,6 +552,29 @@ class TestAddTrackingStep:
         assert data['step'] == 'Harvested'
         assert 'tx_hash' in data
 
+    def test_add_tracking_step_with_note(self, client, mock_blockchain_service):
+        """Test that an optional note is passed through and echoed."""
+        mock_blockchain_service.add_tracking_step.return_value = "0x456def"
+
+        response = client.post('/api/batch/1/tracking', json={
+            "step": "Shipped",
+            "note": "Container MSKU 123"
+        })
+
+        assert response.status_code == 201
+        assert response.get_json()['note'] == "Container MSKU 123"
+        mock_blockchain_service.add_tracking_step.assert_called_once_with(
+            batch_id=1, step="Shipped", note="Container MSKU 123"
+        )
+
+    def test_add_tracking_step_invalid_note(self, client, mock_blockchain_service):
+        """Test that a note that is not a string or is too long is rejected."""
+        for note in (42, "x" * 1001):
+            response = client.post('/api/batch/1/tracking', json={"step": "Shipped", "note": note})
+            assert response.status_code == 400
+
+        mock_blockchain_service.add_tracking_step.assert_not_called()
+
     def test_add_tracking_step_missing_step(self, client, mock_blockchain_service):
         """Test adding tracking step with missing step."""
         response = client.post('/api/batch/1/tracking', json={})
@@ -312,6 +604,66 @@ class TestAddTrackingStep:
         assert response.status_code == 500
 
 
+class TestBulkTrackingSteps:
+    """Tests for the multi-batch tracking step endpoint."""
+
+    def test_add_step_to_many_batches(self, client, mock_blockchain_service):
+        """Test that one step is applied to every listed batch in one call."""
+        mock_blockchain_service.add_tracking_steps.return_value = "0x789abc"
+
+        response = client.post('/api/batches/tracking', json={
+            "batch_ids": [1, "2", 3],
+            "step": "Arrived DC-4"
+        })
+
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data['batch_ids'] == [1, 2, 3]
+        assert data['steps'] == ["Arrived DC-4"]
+        mock_blockchain_service.add_tracking_steps.assert_called_once_with(
+            batch_ids=[1, 2, 3], steps=["Arrived DC-4"]
+        )
+
+    def test_add_several_steps(self, client, mock_blockchain_service):
+        """Test that a list of steps is accepted."""
+        mock_blockchain_service.add_tracking_steps.return_value = "0x789abc"
+
+        response = client.post('/api/batches/tracking', json={
+            "batch_ids": [1],
+            "steps": ["Unloaded", "Inspected"]
+        })
+
+        assert response.status_code == 201
+        assert response.get_json()['steps'] == ["Unloaded", "Inspected"]
+
+    def test_invalid_batch_id(self, client, mock_blockchain_service):
+        """Test that every batch ID is validated."""
+        response = client.post('/api/batches/tracking', json={
+            "batch_ids": [1, 0],
+            "step": "Arrived DC-4"
+        })
+
+        assert response.status_code == 400
+        mock_blockchain_service.add_tracking_steps.assert_not_called()
+
+    def test_missing_step(self, client, mock_blockchain_service):
+        """Test that a step is required."""
+        response = client.post('/api/batches/tracking', json={"batch_ids": [1]})
+
+        assert response.status_code == 400
+
+    def test_blockchain_error(self, client, mock_blockchain_service):
+        """Test that a failed transaction is reported."""
+        mock_blockchain_service.add_tracking_steps.return_value = None
+
+        response = client.post('/api/batches/tracking', json={
+            "batch_ids": [1, 2],
+            "step": "Arrived DC-4"
+        })
+
+        assert response.status_code == 500
+
+
 class TestGetAllBatches:
     """Tests for the get all batches endpoint."""
 
@@ -341,6 +693,29 @@ class TestGetAllBatches:
         assert data['count'] == 2
         assert len(data['batches']) == 2
 
+    def test_get_all_batches_async_reads(self, client, mock_blockchain_service):
+        """Test that the full list is read through the async service when there is no local index."""
+        with patch('app.async_blockchain_service') as async_service:
+            async_service.get_all_batches = AsyncMock(return_value=[{'id': 1, 'name': 'Tapioca Pearls'}])
+            response = client.get('/api/batches')
+
+        assert response.status_code == 200
+        assert response.get_json()['count'] == 1
+        async_service.get_all_batches.assert_awaited_once()
+        mock_blockchain_service.get_all_batches.assert_not_called()
+
+    def test_get_all_batches_index_preferred_over_async_reads(self, client, mock_blockchain_service):
+        """Test that an indexed service answers full reads itself even with async reads enabled."""
+        mock_blockchain_service.as_of_block.return_value = 42
+        mock_blockchain_service.get_all_batches.return_value = []
+        with patch('app.async_blockchain_service') as async_service:
+            async_service.get_all_batches = AsyncMock()
+            response = client.get('/api/batches')
+
+        assert response.status_code == 200
+        async_service.get_all_batches.assert_not_awaited()
+        mock_blockchain_service.get_all_batches.assert_called_once()
+
     def test_get_all_batches_empty(self, client, mock_blockchain_service):
         """Test retrieval of all batches when none exist."""
         mock_blockchain_service.get_all_batches.return_value = []
@@ -361,6 +736,179 @@ class TestGetAllBatches:
         assert response.status_code == 500
 
 
+class TestBatchPagination:
+    """Tests for cursor pagination and NDJSON streaming of the batch list."""
+
+    def test_get_batches_first_page(self, client, mock_blockchain_service):
+        """Test that a limit returns one page and a cursor to the next."""
+        mock_blockchain_service.get_batches_range.return_value = [
+            {'id': 1, 'name': 'Tapioca Pearls', 'origin': 'Taiwan', 'tracking_history': [], 'timestamp': 1},
+            {'id': 2, 'name': 'Milk Tea', 'origin': 'China', 'tracking_history': [], 'timestamp': 2}
+        ]
+
+        response = client.get('/api/batches?limit=2')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['count'] == 2
+        assert data['next_cursor'] == 2
+        mock_blockchain_service.get_batches_range.assert_called_once_with(1, 2)
+        mock_blockchain_service.get_all_batches.assert_not_called()
+
+    def test_get_batches_last_page(self, client, mock_blockchain_service):
+        """Test that a short page resumes after the cursor and ends pagination."""
+        mock_blockchain_service.get_batches_range.return_value = [
+            {'id': 3, 'name': 'Brown Sugar', 'origin': 'Okinawa', 'tracking_history': [], 'timestamp': 3}
+        ]
+
+        response = client.get('/api/batches?limit=2&cursor=2')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['next_cursor'] is None
+        mock_blockchain_service.get_batches_range.assert_called_once_with(3, 2)
+
+    def test_get_batches_invalid_limit(self, client, mock_blockchain_service):
+        """Test that out-of-range limits are rejected."""
+        for limit in ['0', 'abc', '100000']:
+            response = client.get(f'/api/batches?limit={limit}')
+            assert response.status_code == 400
+            assert 'limit' in response.get_json()['error'].lower()
+
+    def test_get_batches_invalid_cursor(self, client, mock_blockchain_service):
+        """Test that malformed cursors are rejected."""
+        response = client.get('/api/batches?cursor=-5')
+
+        assert response.status_code == 400
+        assert 'cursor' in response.get_json()['error'].lower()
+
+    def test_get_batches_ndjson_stream(self, client, mock_blockchain_service):
+        """Test that NDJSON clients receive one batch per line."""
+        mock_blockchain_service.iter_batches.return_value = iter([
+            {'id': 1, 'name': 'Tapioca Pearls', 'origin': 'Taiwan', 'tracking_history': [], 'timestamp': 1},
+            {'id': 2, 'name': 'Milk Tea', 'origin': 'China', 'tracking_history': [], 'timestamp': 2},
+            {'id': 3, 'name': 'Brown Sugar', 'origin': 'Okinawa', 'tracking_history': [], 'timestamp': 3}
+        ])
+
+        response = client.get('/api/batches?limit=2', headers={'Accept': 'application/x-ndjson'})
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)['id'] for line in lines] == [1, 2]
+
+    def test_get_batches_ndjson_stream_error(self, client, mock_blockchain_service):
+        """Test that a failure mid-stream is reported in-band."""
+        def failing_batches(**kwargs):
+            yield {'id': 1, 'name': 'Tapioca Pearls', 'origin': 'Taiwan', 'tracking_history': [], 'timestamp': 1}
+            raise RuntimeError("node went away")
+        mock_blockchain_service.iter_batches.side_effect = failing_batches
+
+        response = client.get('/api/batches', headers={'Accept': 'application/x-ndjson'})
+
+        lines = response.get_data(as_text=True).splitlines()
+        assert json.loads(lines[0])['id'] == 1
+        assert 'error' in json.loads(lines[-1])
+
+
+class TestConditionalRequests:
+    """Tests for ETag / If-None-Match revalidation of batch reads."""
+
+    BATCH = {
+        'id': 1,
+        'name': 'Tapioca Pearls',
+        'origin': 'Taiwan',
+        'tracking_history': ['Harvested', 'Processed'],
+        'timestamp': 1234567890
+    }
+
+    def test_get_batch_sets_etag(self, client, mock_blockchain_service):
+        """Test that a batch response carries a version-based ETag."""
+        mock_blockchain_service.get_batch.return_value = self.BATCH
+
+        response = client.get('/api/batch/1')
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] == '"batch-1-2"'
+        assert response.headers['Cache-Control'] == 'no-cache'
+
+    def test_get_batch_not_modified_without_read(self, client, mock_blockchain_service):
+        """Test that a cached, unchanged batch is answered with 304 and no blockchain read."""
+        mock_blockchain_service.cached_step_count.return_value = 2
+
+        response = client.get('/api/batch/1', headers={'If-None-Match': '"batch-1-2"'})
+
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.headers['ETag'] == '"batch-1-2"'
+        mock_blockchain_service.get_batch.assert_not_called()
+
+    def test_get_batch_modified(self, client, mock_blockchain_service):
+        """Test that a batch with new tracking steps is sent in full."""
+        mock_blockchain_service.get_batch.return_value = self.BATCH
+
+        response = client.get('/api/batch/1', headers={'If-None-Match': '"batch-1-1"'})
+
+        assert response.status_code == 200
+        assert response.get_json()['tracking_history'] == ['Harvested', 'Processed']
+
+    def test_get_batch_etag_includes_indexed_block(self, client, mock_blockchain_service):
+        """Test that indexed responses are versioned by the indexed block too."""
+        mock_blockchain_service.get_batch.return_value = self.BATCH
+        mock_blockchain_service.as_of_block.return_value = 42
+
+        response = client.get('/api/batch/1')
+
+        assert response.headers['ETag'] == '"batch-1-2-42"'
+
+    def test_get_batches_not_modified_at_same_head(self, client, mock_blockchain_service):
+        """Test that the batch list is revalidated against the chain head without reading batches."""
+        mock_blockchain_service.head_block.return_value = 100
+        mock_blockchain_service.get_all_batches.return_value = [self.BATCH]
+
+        first = client.get('/api/batches')
+        etag = first.headers['ETag']
+        second = client.get('/api/batches', headers={'If-None-Match': etag})
+
+        assert first.status_code == 200
+        assert second.status_code == 304
+        assert mock_blockchain_service.get_all_batches.call_count == 1
+
+    def test_get_batches_new_block_invalidates(self, client, mock_blockchain_service):
+        """Test that a new chain head produces a new ETag."""
+        mock_blockchain_service.head_block.return_value = 100
+        mock_blockchain_service.get_all_batches.return_value = [self.BATCH]
+        etag = client.get('/api/batches').headers['ETag']
+
+        mock_blockchain_service.head_block.return_value = 101
+        response = client.get('/api/batches', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_get_batches_local_write_invalidates(self, client, mock_blockchain_service):
+        """Test that a write seen by the service changes the ETag before the monitored head moves."""
+        mock_blockchain_service.head_block.return_value = 100
+        mock_blockchain_service.get_all_batches.return_value = [self.BATCH]
+        etag = client.get('/api/batches').headers['ETag']
+
+        mock_blockchain_service.data_generation.return_value = 1
+        response = client.get('/api/batches', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_get_batches_etag_varies_by_page(self, client, mock_blockchain_service):
+        """Test that different pages at the same head have different ETags."""
+        mock_blockchain_service.head_block.return_value = 100
+        mock_blockchain_service.get_batches_range.return_value = [self.BATCH]
+
+        first = client.get('/api/batches?limit=1')
+        second = client.get('/api/batches?limit=1&cursor=1')
+
+        assert first.headers['ETag'] != second.headers['ETag']
+
+
 class TestSummary:
     """Tests for the summary endpoint."""
 
@@ -395,6 +943,116 @@ class TestSummary:
         assert data['batch_count'] == 0
 
 
+class TestConfig:
+    """Tests for the configuration endpoint."""
+
+    def test_config_reports_ai_state(self, client, mock_blockchain_service):
+        """Test that the Claude circuit breaker and summary cache are reported."""
+        response = client.get('/api/config')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['claude_circuit']['state'] in ('closed', 'open', 'half_open')
+        assert 'hits' in data['summary_cache']
+
+
+class TestMetrics:
+    """Tests for the Prometheus metrics endpoint."""
+
+    def test_metrics_exposition(self, client, mock_blockchain_service):
+        """Test that metrics are served in the Prometheus text format with breaker and cache state."""
+        mock_blockchain_service.get_diagnostics.return_value = {'batch_cache': {'size': 3, 'hit_rate': 0.5}}
+
+        response = client.get('/api/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        text = response.get_data(as_text=True)
+        assert '# TYPE bobachain_rpc_duration_seconds histogram' in text
+        assert 'bobachain_claude_circuit_state{state="closed"} 1' in text
+        assert 'bobachain_cache_entries{cache="batch"} 3' in text
+        assert 'bobachain_blockchain_connected 1' in text
+
+    def test_requests_labelled_by_route(self, client, mock_blockchain_service):
+        """Test that request metrics use the route rule, not the raw path, as the endpoint label."""
+        mock_blockchain_service.get_batch.return_value = None
+
+        client.get('/api/batch/123456')
+        text = client.get('/api/metrics').get_data(as_text=True)
+
+        assert 'bobachain_http_requests_total{endpoint="/api/batch/<batch_id>",http_method="GET",status="404"}' in text
+        assert '/api/batch/123456' not in text
+
+
+class TestRequestTracing:
+    """Tests for the per-request RPC accounting headers."""
+
+    def test_rpc_calls_reported_in_headers(self, client, mock_blockchain_service):
+        """Test that the RPC calls made while serving a request are counted in its headers."""
+        from services.request_trace import record_rpc
+
+        def get_all_batches():
+            record_rpc('eth_call', 0.01, count=3)
+            return []
+
+        mock_blockchain_service.get_all_batches.side_effect = get_all_batches
+
+        response = client.get('/api/batches')
+
+        assert response.status_code == 200
+        assert response.headers['X-RPC-Calls'] == '3'
+        assert 'rpc.eth_call;dur=10.00;desc="3x"' in response.headers['Server-Timing']
+        assert 'total;dur=' in response.headers['Server-Timing']
+
+    def test_requests_traced_separately(self, client, mock_blockchain_service):
+        """Test that calls are not carried over from one request to the next."""
+        client.get('/api/health')
+        response = client.get('/api/health')
+
+        assert response.headers['X-RPC-Calls'] == '0'
+
+
+class TestSummaryStream:
+    """Tests for the streaming summary endpoint."""
+
+    def test_stream_local_summary_per_batch(self, client, mock_blockchain_service):
+        """Test that the local summary is streamed as one event per batch."""
+        mock_blockchain_service.get_all_batches.return_value = [
+            {'id': 1, 'name': 'Tapioca Pearls', 'origin': 'Taiwan', 'tracking_history': ['Harvested']},
+            {'id': 2, 'name': 'Milk Tea', 'origin': 'China', 'tracking_history': ['Brewing']}
+        ]
+
+        with patch('ai.assistant.CLAUDE_API_KEY', None):
+            response = client.get('/api/summary/stream')
+            frames = response.get_data(as_text=True).strip().split('\n\n')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        texts = [json.loads(frame[len('data: '):])['text'] for frame in frames[:-1]]
+        assert len(texts) == 2
+        assert 'Tapioca Pearls' in texts[0] and 'Milk Tea' in texts[1]
+        assert frames[-1] == 'event: done\ndata: {"batch_count": 2}'
+
+    def test_stream_error_reported_in_band(self, client, mock_blockchain_service):
+        """Test that a failure after streaming starts is sent as an error event."""
+        mock_blockchain_service.get_all_batches.return_value = []
+
+        with patch('app.stream_summary', side_effect=RuntimeError("stream broke")):
+            response = client.get('/api/summary/stream')
+            body = response.get_data(as_text=True)
+
+        assert response.status_code == 200
+        assert body.startswith('event: error')
+
+    def test_stream_blockchain_error(self, client, mock_blockchain_service):
+        """Test that a failed batch read is reported before streaming starts."""
+        mock_blockchain_service.get_all_batches.return_value = None
+
+        response = client.get('/api/summary/stream')
+
+        assert response.status_code == 500
+
+
 class TestErrorHandlers:
     """Tests for error handling."""
 
@@ -0,0 +1,352 @@
+"""
+Tests for the AI assistant module.
+The Claude API is mocked so no API key or network access is required.
+"""
+
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import assistant
+from ai.circuit_breaker import CircuitBreaker, STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN
+from ai.summary_cache import SummaryCache
+
+RAW_DATA = {
+    'batches': [
+        {'id': 1, 'name': 'Tapioca Pearls', 'origin': 'Taiwan', 'tracking_history': ['Harvested']},
+        {'id': 2, 'name': 'Milk Tea', 'origin': 'China', 'tracking_history': ['Brewing', 'Bottled']}
+    ]
+}
+
+
+@pytest.fixture(autouse=True)
+def breaker():
+    """Fixture to give every test a fresh circuit breaker."""
+    breaker = CircuitBreaker(min_calls=2, open_seconds=60)
+    with patch.object(assistant, 'claude_breaker', breaker):
+        yield breaker
+
+
+@pytest.fixture(autouse=True)
+def sleep():
+    """Fixture to skip real retry backoff sleeps."""
+    with patch.object(assistant.time, 'sleep') as sleep:
+        yield sleep
+
+
+@pytest.fixture
+def cache():
+    """Fixture to provide an empty summary cache in place of the module cache."""
+    cache = SummaryCache(max_entries=4)
+    with patch.object(assistant, 'summary_cache', cache):
+        yield cache
+
+
+class TestSummaryCache:
+    """Tests for the content-addressed summary cache."""
+
+    def test_key_ignores_order_and_id_type(self):
+        """Test that equivalent batch data produces the same key."""
+        reordered = {'batches': [
+            {**RAW_DATA['batches'][1], 'id': '2', 'timestamp': 5},
+            RAW_DATA['batches'][0]
+        ]}
+
+        assert SummaryCache.make_key(RAW_DATA, 'model', '1') == SummaryCache.make_key(reordered, 'model', '1')
+
+    def test_key_changes_with_data_model_and_prompt(self):
+        """Test that new steps, another model or a new prompt version change the key."""
+        key = SummaryCache.make_key(RAW_DATA, 'model', '1')
+        grown = {'batches': [RAW_DATA['batches'][0], {**RAW_DATA['batches'][1], 'tracking_history': ['Brewing']}]}
+
+        assert SummaryCache.make_key(grown, 'model', '1') != key
+        assert SummaryCache.make_key(RAW_DATA, 'other', '1') != key
+        assert SummaryCache.make_key(RAW_DATA, 'model', '2') != key
+
+    def test_lru_eviction(self):
+        """Test that the least recently used summary is evicted when full."""
+        cache = SummaryCache(max_entries=2)
+        cache.put('a', 'A')
+        cache.put('b', 'B')
+        cache.get('a')
+        cache.put('c', 'C')
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 'A'
+        assert cache.stats()['evictions'] == 1
+
+    def test_ttl_expiry(self):
+        """Test that expired summaries are misses."""
+        cache = SummaryCache(ttl=0)
+        cache.put('a', 'A')
+
+        assert cache.get('a') is None
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Test that summaries written to disk are served by a new cache instance."""
+        db_path = str(tmp_path / 'summaries.db')
+        SummaryCache(db_path=db_path).put('a', 'A')
+
+        restarted = SummaryCache(db_path=db_path)
+
+        assert restarted.get('a') == 'A'
+        assert restarted.stats()['disk_hits'] == 1
+
+
+class TestGenerateSummary:
+    """Tests for summary generation."""
+
+    def test_claude_summary_cached(self, cache):
+        """Test that unchanged data is summarized by Claude only once."""
+        with patch.object(assistant, 'CLAUDE_API_KEY', 'test-key'), \
+                patch.object(assistant, '_generate_claude_summary', return_value='Claude summary') as claude:
+            first = assistant.generate_summary(RAW_DATA)
+            second = assistant.generate_summary(RAW_DATA)
+
+        assert first == second == 'Claude summary'
+        assert claude.call_count == 1
+
+    def test_fallback_summary_not_served_for_claude(self, cache):
+        """Test that a local fallback summary does not stop Claude being retried."""
+        with patch.object(assistant, 'CLAUDE_API_KEY', 'test-key'), \
+                patch.object(assistant, '_generate_claude_summary', side_effect=[None, 'Claude summary']):
+            fallback = assistant.generate_summary(RAW_DATA)
+            retried = assistant.generate_summary(RAW_DATA)
+
+        assert 'Tapioca Pearls' in fallback
+        assert retried == 'Claude summary'
+
+    def test_local_summary_cached(self, cache):
+        """Test that local summaries are cached when Claude is not configured."""
+        with patch.object(assistant, 'CLAUDE_API_KEY', None), \
+                patch.object(assistant, 'summarize_blockchain_data', return_value='Local summary') as local:
+            assistant.generate_summary(RAW_DATA)
+            assistant.generate_summary(RAW_DATA)
+
+        assert local.call_count == 1
+
+
+class TestMapReduceSummary:
+    """Tests for sharded summarization of large batch sets."""
+
+    @pytest.fixture
+    def many_batches(self):
+        """Fixture to provide batches from several origins."""
+        return {'batches': [
+            {'id': i, 'name': f'Batch {i}', 'origin': ['Taiwan', 'China', 'Japan'][i % 3],
+             'tracking_history': ['Harvested', 'Shipped']}
+            for i in range(1, 31)
+        ]}
+
+    def test_small_data_uses_single_prompt(self, cache):
+        """Test that data within the budget is summarized in one call."""
+        with patch.object(assistant, 'call_claude_haiku', return_value='Summary') as claude:
+            assert assistant._generate_claude_summary(RAW_DATA) == 'Summary'
+
+        assert claude.call_count == 1
+
+    def test_shards_grouped_by_origin_within_budget(self, many_batches):
+        """Test that shards respect the token budget and keep origins together."""
+        shards = assistant._shard_batches(many_batches['batches'], token_budget=60)
+
+        assert sum(len(shard) for shard in shards) == 30
+        for shard in shards:
+            tokens = sum(assistant._estimate_tokens(assistant._format_batch_text(batch)) for batch in shard)
+            assert tokens <= 60 or len(shard) == 1
+        origins = [batch['origin'] for shard in shards for batch in shard]
+        assert origins == sorted(origins)
+
+    def test_map_then_reduce(self, cache, many_batches):
+        """Test that shards are summarized separately and then combined."""
+        prompts = []
+
+        def claude(prompt, max_tokens=1024):
+            prompts.append(prompt)
+            return 'Combined' if prompt.count('Part ') else f'Shard {len(prompts)}'
+
+        with patch.object(assistant, 'SUMMARY_SHARD_TOKENS', 200), \
+                patch.object(assistant, 'call_claude_haiku', side_effect=claude):
+            summary = assistant._generate_claude_summary(many_batches)
+
+        assert summary == 'Combined'
+        assert 'partial summaries of 30' in prompts[-1]
+        assert len(prompts) > 2
+
+    def test_failed_shard_falls_back_to_local(self, cache, many_batches):
+        """Test that a failed shard is replaced by a local digest that keeps the reduce prompt in budget."""
+        prompts = []
+
+        def claude(prompt, max_tokens=1024):
+            prompts.append(prompt)
+            if 'Part ' in prompt:
+                return 'Combined'
+            return None if 'China' in prompt else 'Shard summary'
+
+        with patch.object(assistant, 'SUMMARY_SHARD_TOKENS', 400), \
+                patch.object(assistant, 'call_claude_haiku', side_effect=claude):
+            summary = assistant._generate_claude_summary(many_batches)
+
+        assert summary == 'Combined'
+        assert 'China: 10' in prompts[-1]
+        assert 'Shard summary' in prompts[-1]
+        assert assistant._estimate_tokens(prompts[-1]) <= 400
+
+    def test_all_shards_failed_skips_reduce(self, cache, many_batches):
+        """Test that no reduce call is made when every shard fails."""
+        with patch.object(assistant, 'SUMMARY_SHARD_TOKENS', 200), \
+                patch.object(assistant, 'call_claude_haiku', return_value=None) as claude:
+            assert assistant._generate_claude_summary(many_batches) is None
+
+        assert all('Part ' not in call.args[0] for call in claude.call_args_list)
+
+
+def claude_stream(*texts, status_code=200):
+    """Build a mocked streaming Messages API response producing texts."""
+    events = [{'type': 'message_start'}] + [
+        {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': text}}
+        for text in texts
+    ] + [{'type': 'message_stop'}]
+    lines = []
+    for event in events:
+        lines += [f"event: {event['type']}", f"data: {json.dumps(event)}", ""]
+    response = MagicMock(status_code=status_code, text='overloaded')
+    response.__enter__.return_value = response
+    response.iter_lines.return_value = lines
+    return response
+
+
+class TestStreamSummary:
+    """Tests for streamed summaries."""
+
+    def test_stream_forwards_text_deltas(self, cache):
+        """Test that Claude text deltas are yielded as they arrive and the result cached."""
+        with patch.object(assistant, 'CLAUDE_API_KEY', 'test-key'), \
+                patch.object(assistant, '_session') as session:
+            session.post.return_value = claude_stream('Boba ', 'is ', 'flowing.')
+            chunks = list(assistant.stream_summary(RAW_DATA))
+            cached = assistant.generate_summary(RAW_DATA)
+
+        assert chunks == ['Boba ', 'is ', 'flowing.']
+        assert cached == 'Boba is flowing.'
+        assert session.post.call_args.kwargs['json']['stream'] is True
+        assert session.post.call_count == 1
+
+    def test_stream_falls_back_before_first_token(self, cache):
+        """Test that a Claude error before any text streams the local summary instead."""
+        with patch.object(assistant, 'CLAUDE_API_KEY', 'test-key'), \
+                patch.object(assistant, '_session') as session:
+            session.post.return_value = claude_stream(status_code=529)
+            chunks = list(assistant.stream_summary(RAW_DATA))
+
+        assert ''.join(chunks) == assistant.summarize_blockchain_data(RAW_DATA)
+        assert len(chunks) == 2
+
+    def test_local_stream_matches_summary(self):
+        """Test that the batch-by-batch local stream joins to the local summary."""
+        assert list(assistant._iter_local_summary({'batches': []})) == ["No batch data available for summary."]
+        assert assistant.summarize_blockchain_data(RAW_DATA).startswith("Batch ID: 1\nName: Tapioca Pearls\n")
+
+
+def claude_response(status_code, text='Summary', headers=None):
+    """Build a mocked non-streaming Messages API response."""
+    return MagicMock(
+        status_code=status_code,
+        headers=headers or {},
+        text='error',
+        json=MagicMock(return_value={'content': [{'type': 'text', 'text': text}]})
+    )
+
+
+class TestCircuitBreaker:
+    """Tests for the circuit breaker and retries around Claude calls."""
+
+    def test_opens_on_failure_rate_and_skips_api(self, breaker):
+        """Test that repeated server errors open the circuit and later calls skip the API."""
+        with patch.object(assistant, 'CLAUDE_API_KEY', 'test-key'), \
+                patch.object(assistant, '_session') as session:
+            session.post.return_value = claude_response(500)
+            assert assistant.call_claude_haiku('prompt') is None
+            assert assistant.call_claude_haiku('prompt') is None
+            assert assistant.call_claude_haiku('prompt') is None
+
+        assert breaker.state == STATE_OPEN
+        assert session.post.call_count == 2
+        assert breaker.status()['rejected_calls'] == 1
+
+    def test_client_errors_do_not_open(self, breaker):
+        """Test that 4xx responses other than 429 are not counted as API failures."""
+        with patch.object(assistant, 'CLAUDE_API_KEY', 'test-key'), \
+                patch.object(assistant, '_session') as session:
+            session.post.return_value = claude_response(400)
+            for _ in range(3):
+                assistant.call_claude_haiku('prompt')
+
+        assert breaker.state == STATE_CLOSED
+
+    def test_slow_calls_open(self):
+        """Test that calls over the latency threshold open the circuit."""
+        breaker = CircuitBreaker(slow_call_seconds=1, min_calls=2)
+        breaker.record(True, 5)
+        breaker.record(True, 5)
+
+        assert breaker.state == STATE_OPEN
+
+    def test_half_open_allows_single_probe(self):
+        """Test that one probe is let through after the open period and success closes the circuit."""
+        breaker = CircuitBreaker(min_calls=1, open_seconds=0)
+        breaker.record(False, 0.1)
+
+        assert breaker.state == STATE_HALF_OPEN
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False
+        breaker.record(True, 0.1)
+        assert breaker.state == STATE_CLOSED
+
+    def test_failed_probe_reopens(self):
+        """Test that a failed half-open probe opens the circuit again."""
+        breaker = CircuitBreaker(min_calls=1, open_seconds=0)
+        breaker.record(False, 0.1)
+        breaker.allow_request()
+        breaker.open_seconds = 60
+        breaker.record(False, 0.1)
+
+        assert breaker.state == STATE_OPEN
+
+    def test_overload_retried_with_backoff(self, breaker, sleep):
+        """Test that 529 responses are retried, honoring retry-after."""
+        with patch.object(assistant, 'CLAUDE_API_KEY', 'test-key'), \
+                patch.object(assistant, '_session') as session:
+            session.post.side_effect = [
+                claude_response(529, headers={'retry-after': '2'}),
+                claude_response(200, text='Recovered')
+            ]
+            assert assistant.call_claude_haiku('prompt') == 'Recovered'
+
+        sleep.assert_called_once_with(2.0)
+        assert breaker.state == STATE_CLOSED
+
+    def test_retry_budget_limits_retries(self, breaker):
+        """Test that retries stop once the retry budget is spent."""
+        breaker._retry_tokens = 1
+        with patch.object(assistant, 'CLAUDE_API_KEY', 'test-key'), \
+                patch.object(assistant, '_session') as session:
+            session.post.return_value = claude_response(429)
+            assert assistant.call_claude_haiku('prompt') is None
+
+        assert session.post.call_count == 2
+
+    def test_open_circuit_falls_back_to_local(self, breaker, cache):
+        """Test that summaries go straight to local summarization while the circuit is open."""
+        breaker.record(False, 0.1)
+        breaker.record(False, 0.1)
+        with patch.object(assistant, 'CLAUDE_API_KEY', 'test-key'), \
+                patch.object(assistant, '_session') as session:
+            summary = assistant.generate_summary(RAW_DATA)
+
+        session.post.assert_not_called()
+        assert summary == assistant.summarize_blockchain_data(RAW_DATA)
@@ -0,0 +1,982 @@
+"""
+Tests for the BlockchainService.
+The Web3 provider and HTTP session are mocked so no blockchain node is required.
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import AsyncMock, Mock, PropertyMock
+from eth_abi import encode
+from eth_account import Account
+from web3 import Web3
+from web3.providers.base import BaseProvider
+from web3.exceptions import TimeExhausted, TransactionNotFound
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.async_blockchain import AsyncBlockchainService
+from services.batch_cache import BatchCache, StepEventWatcher
+from services.blockchain import BlockchainService
+from services.fee_oracle import FeeOracle
+from services.health_monitor import HealthMonitor
+from services.step_dictionary import StepDictionary
+from services.write_queue import WriteQueue
+
+CONTRACT_ADDRESS = Web3.to_checksum_address('0x' + '12' * 20)
+# getBatchHistory returns the Batch struct, ABI-encoded as a single tuple
+BATCH_TYPES = ['(string,string,uint16[],uint256)']
+
+# Step dictionary the service fixture starts with: Harvested=1, Processed=2, Shipped=3
+KNOWN_STEPS = ['Harvested', 'Processed', 'Shipped']
+
+
+@pytest.fixture
+def service():
+    """Fixture to provide a service with a loaded contract and mocked node access."""
+    service = BlockchainService(provider_url='http://127.0.0.1:1')
+    service.contract_abi = BlockchainService._get_default_abi()
+    service.contract = Web3().eth.contract(address=CONTRACT_ADDRESS, abi=service.contract_abi)
+    service.w3 = Mock()
+    service.w3.eth.block_number = 10
+    service.nonce_manager.w3 = service.w3
+    service.fee_oracle = FeeOracle(service.w3, mode='legacy')
+    service._http_session = Mock()
+    service.step_dictionary.extend(1, KNOWN_STEPS)
+    health_monitor = service.health_monitor
+    yield service
+    health_monitor.stop()
+
+
+def rpc_result(batch_id, name, origin, history, timestamp):
+    """Build a successful eth_call reply for getBatchHistory."""
+    return {
+        'jsonrpc': '2.0',
+        'id': batch_id,
+        'result': Web3.to_hex(encode(BATCH_TYPES, [(name, origin, history, timestamp)]))
+    }
+
+
+class StaticCallProvider(BaseProvider):
+    """Provider answering every eth_call with fixed return data."""
+
+    def __init__(self, result: bytes):
+        super().__init__()
+        self.result = result
+
+    def make_request(self, method, params):
+        if method == 'eth_chainId':
+            return {'jsonrpc': '2.0', 'id': 1, 'result': '0x1'}
+        return {'jsonrpc': '2.0', 'id': 1, 'result': Web3.to_hex(self.result)}
+
+    def is_connected(self, show_traceback=False):
+        return True
+
+
+class TestContractABI:
+    """Tests that the default ABI decodes what the contract returns."""
+
+    def test_get_batch_decodes_struct_return(self, service):
+        """Test that getBatchHistory's Batch struct return data decodes through the default ABI."""
+        w3 = Web3(StaticCallProvider(encode(BATCH_TYPES, [('Tapioca Pearls', 'Taiwan', [1, 3], 1700000000)])))
+        service.contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=service.contract_abi)
+
+        batch = service.get_batch(1)
+
+        assert batch['name'] == 'Tapioca Pearls'
+        assert batch['origin'] == 'Taiwan'
+        assert batch['tracking_history'] == ['Harvested', 'Shipped']
+
+
+class TestBatchedReads:
+    """Tests for JSON-RPC batched batch reads."""
+
+    def test_batched_reads_chunk_requests(self, service):
+        """Test that calls are packed into one HTTP request per chunk."""
+        def post(url, json, timeout):
+            response = Mock()
+            response.json.return_value = [
+                rpc_result(call['id'], f"Batch {call['id']}", 'Taiwan', [1], 100)
+                for call in reversed(json)
+            ]
+            return response
+        service._http_session.post.side_effect = post
+
+        batches, failures = service.get_batches_batched([1, 2, 3, 4, 5], chunk_size=2)
+
+        assert service._http_session.post.call_count == 3
+        assert failures == {}
+        assert [batch['id'] for batch in batches] == [1, 2, 3, 4, 5]
+        assert batches[0] == {
+            'id': 1,
+            'name': 'Batch 1',
+            'origin': 'Taiwan',
+            'tracking_history': ['Harvested'],
+            'timestamp': 100
+        }
+
+        calls = service._http_session.post.call_args_list[0].kwargs['json']
+        assert [call['method'] for call in calls] == ['eth_call', 'eth_call']
+        assert all(call['params'][1] == hex(10) for call in calls)
+
+    def test_batched_reads_report_partial_failures(self, service):
+        """Test that per-call errors are reported by batch ID."""
+        response = Mock()
+        response.json.return_value = [
+            rpc_result(1, 'Tapioca Pearls', 'Taiwan', [], 100),
+            {'jsonrpc': '2.0', 'id': 2, 'error': {'code': 3, 'message': 'execution reverted'}},
+        ]
+        service._http_session.post.return_value = response
+
+        batches, failures = service.get_batches_batched([1, 2, 3])
+
+        assert [batch['id'] for batch in batches] == [1]
+        assert failures[2] == 'execution reverted'
+        assert 3 in failures
+
+    def test_batched_reads_whole_chunk_failure(self, service):
+        """Test that a failed HTTP request marks every batch in the chunk as failed."""
+        service._http_session.post.side_effect = ConnectionError("connection refused")
+
+        batches, failures = service.get_batches_batched([1, 2], chunk_size=10)
+
+        assert batches == []
+        assert set(failures) == {1, 2}
+
+    def test_inproc_reads_use_batched_path(self, service):
+        """Test that the in-process EVM serves full reads through the batched path, one call per batch."""
+        service.provider_url = 'inproc://'
+        service.contract = Mock(address=CONTRACT_ADDRESS)
+        service.contract.functions.batchCount.return_value.call.return_value = 2
+        service.w3.manager.request_blocking.side_effect = lambda method, params: (
+            rpc_result(int(params[0]['data'][-2:], 16), 'Milk Tea', 'China', [2], 100)['result']
+        )
+
+        batches = service.get_all_batches()
+
+        assert [batch['id'] for batch in batches] == [1, 2]
+        assert batches[1]['tracking_history'] == ['Processed']
+        assert service.w3.manager.request_blocking.call_count == 2
+        service._http_session.post.assert_not_called()
+
+
+class TestRangeReads:
+    """Tests for paginated getBatches reads."""
+
+    def test_get_batches_range(self, service):
+        """Test that a page is read with one contract call and numbered from start."""
+        service.contract = Mock()
+        service.contract.functions.getBatches.return_value.call.return_value = [
+            ('Tapioca Pearls', 'Taiwan', [1], 100),
+            ('Milk Tea', 'China', [], 101),
+        ]
+
+        batches = service.get_batches_range(5, 10)
+
+        service.contract.functions.getBatches.assert_called_once_with(5, 10)
+        assert [batch['id'] for batch in batches] == [5, 6]
+        assert batches[1]['name'] == 'Milk Tea'
+
+    def test_get_batches_range_invalid(self, service):
+        """Test that non-positive arguments are rejected."""
+        assert service.get_batches_range(0, 10) is None
+        assert service.get_batches_range(1, 0) is None
+
+    def test_iter_batches_pages_until_short_page(self, service):
+        """Test that iteration requests pages until one comes back short."""
+        pages = {
+            1: [{'id': 1}, {'id': 2}],
+            3: [{'id': 3}],
+        }
+        service.get_batches_range = Mock(side_effect=lambda start, count: pages[start])
+
+        assert [batch['id'] for batch in service.iter_batches(page_size=2)] == [1, 2, 3]
+        assert service.get_batches_range.call_count == 2
+
+
+class TestNonceManagement:
+    """Tests for locally allocated transaction nonces."""
+
+    @pytest.fixture
+    def writer(self, service):
+        """Fixture to provide a service ready to send transactions."""
+        service.contract = Mock()
+        service.from_address = '0xSender'
+        service.private_key = None
+        service.w3.eth.gas_price = 1
+        service.w3.eth.get_transaction_count.return_value = 7
+        service.contract.functions.createBatch.return_value.build_transaction.side_effect = lambda tx: dict(tx)
+        service.contract.functions.addTrackingStep.return_value.build_transaction.side_effect = lambda tx: dict(tx)
+        service.w3.eth.send_transaction.side_effect = lambda tx: bytes([tx['nonce']])
+        return service
+
+    def test_signed_transaction_sent_raw(self, writer):
+        """Test that with a private key the transaction is signed locally and sent raw."""
+        account = Account.create()
+        writer.private_key = account.key.hex()
+        writer.from_address = account.address
+        writer.w3.eth.account = Account
+        writer.contract.functions.createBatch.return_value.build_transaction.side_effect = lambda tx: {
+            **tx, 'to': CONTRACT_ADDRESS, 'value': 0, 'data': '0x', 'chainId': 1337
+        }
+        writer.w3.eth.send_raw_transaction.side_effect = lambda raw: Web3.keccak(raw)
+
+        tx_hash = writer.create_batch('Tapioca Pearls', 'Taiwan')
+
+        raw = writer.w3.eth.send_raw_transaction.call_args.args[0]
+        assert tx_hash == Web3.keccak(raw).hex()
+        assert Account.recover_transaction(raw) == account.address
+        writer.w3.eth.send_transaction.assert_not_called()
+
+    def test_nonces_allocated_locally(self, writer):
+        """Test that the chain nonce is read once and then incremented locally."""
+        assert writer.create_batch('Tapioca Pearls', 'Taiwan') == '07'
+        assert writer.add_tracking_step(1, 'Harvested') == '08'
+        assert writer.create_batch('Milk Tea', 'China') == '09'
+
+        writer.w3.eth.get_transaction_count.assert_called_once_with('0xSender', 'pending')
+
+    def test_nonce_error_resyncs_and_retries(self, writer):
+        """Test that a stale nonce is resynced from the chain and the send retried."""
+        writer.create_batch('Tapioca Pearls', 'Taiwan')
+        sent = []
+
+        def send(tx):
+            sent.append(tx['nonce'])
+            if len(sent) == 1:
+                raise ValueError("nonce too low")
+            return bytes([tx['nonce']])
+        writer.w3.eth.send_transaction.side_effect = send
+        writer.w3.eth.get_transaction_count.return_value = 12
+
+        assert writer.create_batch('Milk Tea', 'China') == '0c'
+        assert sent == [8, 12]
+
+    def test_concurrent_allocations_are_unique(self, service):
+        """Test that concurrent callers never receive the same nonce."""
+        from concurrent.futures import ThreadPoolExecutor
+        service.w3.eth.get_transaction_count.return_value = 0
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            nonces = list(pool.map(lambda _: service.nonce_manager.allocate('0xSender'), range(200)))
+
+        assert sorted(nonces) == list(range(200))
+
+
+class TestFeeOracle:
+    """Tests for cached fee parameters."""
+
+    def test_legacy_fees_cached(self, service):
+        """Test that legacy gas prices are read once per TTL."""
+        oracle = FeeOracle(service.w3, ttl=60, mode='legacy')
+        service.w3.eth.gas_price = 20
+
+        assert oracle.get_fee_params() == {'gasPrice': 20}
+        service.w3.eth.gas_price = 30
+        assert oracle.get_fee_params() == {'gasPrice': 20}
+        assert oracle.status()['age_seconds'] is not None
+
+    def test_eip1559_fees(self, service):
+        """Test that EIP-1559 fees are derived from the base fee when available."""
+        oracle = FeeOracle(service.w3, mode='auto')
+        service.w3.eth.get_block.return_value = {'baseFeePerGas': 100}
+        service.w3.eth.max_priority_fee = 2
+
+        assert oracle.get_fee_params() == {'maxFeePerGas': 202, 'maxPriorityFeePerGas': 2}
+
+    def test_auto_mode_falls_back_to_legacy(self, service):
+        """Test that pre-London chains get a legacy gas price."""
+        oracle = FeeOracle(service.w3, mode='auto')
+        service.w3.eth.get_block.return_value = {}
+        service.w3.eth.gas_price = 20
+
+        assert oracle.get_fee_params() == {'gasPrice': 20}
+
+    def test_stale_cache_is_refreshed(self, service):
+        """Test that fees older than the TTL are re-read."""
+        oracle = FeeOracle(service.w3, ttl=0, mode='legacy')
+        service.w3.eth.gas_price = 20
+        oracle.get_fee_params()
+        service.w3.eth.gas_price = 30
+
+        assert oracle.get_fee_params() == {'gasPrice': 30}
+
+
+class TestBulkCreate:
+    """Tests for chunked bulk batch creation."""
+
+    @pytest.fixture
+    def bulk_writer(self, service):
+        """Fixture to provide a service whose createBatches costs 100 gas per batch."""
+        service.contract = Mock()
+        service.from_address = '0xSender'
+        service.w3.eth.get_block.return_value = {'gasLimit': 500}
+        service.contract.functions.createBatches.side_effect = lambda names, origins: Mock(
+            names=names, estimate_gas=Mock(return_value=100 * len(names))
+        )
+        sent = []
+
+        def send(function, sender, gas):
+            sent.append((list(function.names), gas))
+            return f"0x{len(sent)}"
+        service._send_transaction = Mock(side_effect=send)
+
+        next_id = iter(range(1, 1000))
+        counts = {}
+        service.wait_for_receipt = Mock(side_effect=lambda tx_hash: tx_hash)
+        service.created_batch_ids = Mock(
+            side_effect=lambda tx_hash: [next(next_id) for _ in range(counts[tx_hash])]
+        )
+        service.sent = sent
+        service.counts = counts
+        return service
+
+    def test_chunks_split_under_gas_budget(self, bulk_writer):
+        """Test that chunks exceeding the block gas budget are halved."""
+        names = [f"Batch {i}" for i in range(12)]
+        bulk_writer.counts.update({'0x1': 3, '0x2': 3, '0x3': 3, '0x4': 3})
+
+        results = bulk_writer.create_batches(names, ['Taiwan'] * 12, chunk_size=12)
+
+        assert [len(chunk) for chunk, _ in bulk_writer.sent] == [3, 3, 3, 3]
+        assert [name for chunk, _ in bulk_writer.sent for name in chunk] == names
+        assert all(gas <= 450 for _, gas in bulk_writer.sent)
+        assert [(r['first_batch_id'], r['last_batch_id']) for r in results] == [(1, 3), (4, 6), (7, 9), (10, 12)]
+
+    def test_failed_estimate_splits_chunk(self, bulk_writer):
+        """Test that a chunk the node refuses to estimate is halved instead of aborting the call."""
+        def estimate(names):
+            if len(names) > 2:
+                raise ValueError('gas required exceeds allowance (30000000)')
+            return 100 * len(names)
+        bulk_writer.contract.functions.createBatches.side_effect = lambda names, origins: Mock(
+            names=names, estimate_gas=Mock(side_effect=lambda tx: estimate(names))
+        )
+        names = [f"Batch {i}" for i in range(4)]
+        bulk_writer.counts.update({'0x1': 2, '0x2': 2})
+
+        results = bulk_writer.create_batches(names, ['Taiwan'] * 4, chunk_size=4)
+
+        assert [chunk for chunk, _ in bulk_writer.sent] == [names[:2], names[2:]]
+        assert [(r['first_batch_id'], r['last_batch_id']) for r in results] == [(1, 2), (3, 4)]
+
+    def test_mismatched_lengths_rejected(self, bulk_writer):
+        """Test that names and origins must line up."""
+        assert bulk_writer.create_batches(['Tapioca Pearls'], []) is None
+
+
+class TestStepDictionary:
+    """Tests for encoding tracking steps as dictionary codes."""
+
+    @pytest.fixture
+    def step_writer(self, service):
+        """Fixture to provide a service whose contract keeps a step list in memory."""
+        chain_steps = [''] + KNOWN_STEPS
+        service.contract = Mock()
+        service.from_address = '0xSender'
+        service.contract.functions.getStepNames.side_effect = lambda from_code: Mock(
+            call=Mock(return_value=list(chain_steps[from_code:]))
+        )
+
+        def send(function, sender, gas=None):
+            if function is service.contract.functions.registerSteps.return_value:
+                steps = service.contract.functions.registerSteps.call_args.args[0]
+                chain_steps.extend(step for step in steps if step not in chain_steps)
+            return '0xab'
+        service._send_transaction = Mock(side_effect=send)
+        service.wait_for_receipt = Mock(return_value={'status': 1})
+        service.contract.functions.addTrackingSteps.return_value.estimate_gas.return_value = 100
+        return service
+
+    def test_known_steps_sent_as_codes(self, step_writer):
+        """Test that registered steps are encoded without touching the chain dictionary."""
+        step_writer.add_tracking_steps([1, 2], ['Shipped', 'Harvested'])
+
+        step_writer.contract.functions.addTrackingSteps.assert_called_once_with([1, 2], [3, 1])
+        step_writer.contract.functions.registerSteps.assert_not_called()
+
+    def test_new_steps_registered_once(self, step_writer):
+        """Test that unseen steps are registered in one transaction before they are written."""
+        step_writer.add_tracking_step(1, 'Delivered', note='Signed by J. Chen')
+        step_writer.add_tracking_step(2, 'Delivered')
+
+        step_writer.contract.functions.registerSteps.assert_called_once_with(['Delivered'])
+        step_writer.wait_for_receipt.assert_called_once_with('0xab')
+        step_writer.contract.functions.addTrackingStep.assert_any_call(1, 4, 'Signed by J. Chen')
+        step_writer.contract.functions.addTrackingStep.assert_any_call(2, 4, '')
+
+    def test_unknown_code_refreshes_dictionary(self, step_writer):
+        """Test that a code registered by another writer is fetched before decoding."""
+        step_writer.step_dictionary = StepDictionary()
+        step_writer.contract.functions.getBatchHistory.return_value.call.return_value = (
+            'Tapioca Pearls', 'Taiwan', [1, 3], 100
+        )
+
+        assert step_writer.get_batch(1)['tracking_history'] == ['Harvested', 'Shipped']
+        step_writer.contract.functions.getStepNames.assert_called_once_with(1)
+
+    def test_out_of_order_extend_rejected(self):
+        """Test that a gap in the codes read from the chain is an error."""
+        dictionary = StepDictionary()
+        with pytest.raises(ValueError):
+            dictionary.extend(2, ['Processed'])
+        with pytest.raises(KeyError):
+            dictionary.decode([0])
+
+
+class TestBatchEvents:
+    """Tests for per-batch event queries over block ranges."""
+
+    @pytest.fixture
+    def event_reader(self, service):
+        """Fixture to provide a service whose node serves logs for batch 2 and rejects ranges over 4 blocks."""
+        created = Web3.keccak(text='BatchCreated(uint256,string,string)')
+        step_added = Web3.keccak(text='TrackingStepAdded(uint256,uint16,string)')
+        batch_topic = encode(['uint256'], [2])
+
+        def log(block_number, topics, data):
+            return {
+                'address': CONTRACT_ADDRESS, 'blockHash': b'\x00' * 32, 'blockNumber': block_number,
+                'data': data, 'logIndex': 0, 'topics': topics, 'transactionHash': bytes([block_number]) * 32,
+                'transactionIndex': 0, 'removed': False,
+            }
+
+        chain_logs = [
+            log(2, [created, batch_topic], encode(['string', 'string'], ['Tapioca Pearls', 'Taiwan'])),
+            log(7, [step_added, batch_topic, encode(['uint16'], [1])], encode(['string'], [''])),
+            log(18, [step_added, batch_topic, encode(['uint16'], [3])], encode(['string'], ['Reefer 4'])),
+        ]
+        requested = []
+
+        def get_logs(params):
+            requested.append((params['fromBlock'], params['toBlock']))
+            if params['toBlock'] - params['fromBlock'] >= 4:
+                raise ValueError("query returned more than 10000 results")
+            return [entry for entry in chain_logs if params['fromBlock'] <= entry['blockNumber'] <= params['toBlock']]
+
+        service.w3.eth.get_logs.side_effect = get_logs
+        service.w3.eth.block_number = 19
+        service.requested = requested
+        return service
+
+    def test_whole_range_first(self, event_reader):
+        """Test that a range the provider accepts is fetched in a single call."""
+        event_reader.w3.eth.block_number = 3
+
+        events = event_reader.get_batch_events(2)
+
+        assert [event['event'] for event in events] == ['BatchCreated']
+        assert event_reader.requested == [(0, 3)]
+
+    def test_ranges_split_until_accepted(self, event_reader):
+        """Test that refused ranges are halved and the events come back in chain order."""
+        events = event_reader.get_batch_events(2)
+
+        assert [(event['event'], event['block_number']) for event in events] == [
+            ('BatchCreated', 2), ('TrackingStepAdded', 7), ('TrackingStepAdded', 18)
+        ]
+        assert events[0]['name'] == 'Tapioca Pearls'
+        assert (events[2]['step'], events[2]['note']) == ('Shipped', 'Reefer 4')
+        # 0-19 is refused and halved, then each half again, until every range spans under 4 blocks
+        assert sorted(event_reader.requested) == sorted(
+            [(0, 19), (0, 9), (10, 19), (0, 4), (5, 9), (10, 14), (15, 19),
+             (0, 2), (3, 4), (5, 7), (8, 9), (10, 12), (13, 14), (15, 17), (18, 19)]
+        )
+
+    def test_to_block_clamped_to_head(self, event_reader):
+        """Test that a to_block beyond the chain head is not searched."""
+        event_reader.w3.eth.block_number = 3
+
+        event_reader.get_batch_events(2, to_block=2000000000)
+
+        assert event_reader.requested == [(0, 3)]
+
+    def test_from_block_defaults_to_creation_block(self, event_reader):
+        """Test that the indexed creation block bounds the default search."""
+        event_reader.indexer = Mock()
+        event_reader.indexer.get_batch_block.return_value = 17
+
+        event_reader.get_batch_events(2)
+
+        event_reader.indexer.get_batch_block.assert_called_once_with(2)
+        assert event_reader.requested == [(17, 19)]
+
+    def test_request_cap(self, event_reader):
+        """Test that a range needing more than log_max_requests calls fails instead of fanning out."""
+        event_reader.log_max_requests = 6
+
+        assert event_reader.get_batch_events(2) is None
+        # The first two rounds (1 + 2 calls) run; the third (4 more) would exceed the cap
+        assert len(event_reader.requested) == 3
+
+    def test_filter_uses_batch_topic(self, event_reader):
+        """Test that the node is asked only for logs whose indexed batchId matches."""
+        event_reader.get_batch_events(2, from_block=5, to_block=7)
+
+        params = event_reader.w3.eth.get_logs.call_args.args[0]
+        assert (params['fromBlock'], params['toBlock']) == (5, 7)
+        assert params['topics'][1] == Web3.to_hex(encode(['uint256'], [2]))
+        assert len(params['topics'][0]) == 2
+
+    def test_other_errors_not_split(self, event_reader):
+        """Test that a failure unrelated to result limits fails the query without retrying."""
+        event_reader.w3.eth.get_logs.side_effect = ConnectionError("node down")
+
+        assert event_reader.get_batch_events(2) is None
+        assert event_reader.w3.eth.get_logs.call_count == 1
+
+
+class TestWriteQueue:
+    """Tests for the asynchronous write queue."""
+
+    @pytest.fixture
+    def queue(self):
+        """Fixture to provide a write queue over a mock service."""
+        service = Mock(receipt_timeout=5, receipt_poll_interval=0.001)
+        queue = WriteQueue(service, workers=2)
+        yield queue
+        queue.shutdown()
+
+    def test_create_batch_job_mined(self, queue):
+        """Test that a job moves to mined with the batch ID from the receipt."""
+        queue.service.create_batch.return_value = '0x123abc'
+        queue.service.created_batch_ids.return_value = [7]
+
+        job = queue.enqueue('create_batch', name='Tapioca Pearls', origin='Taiwan')
+        queue.shutdown()
+
+        result = queue.get_job(job['id'])
+        assert result['status'] == 'mined'
+        assert result['tx_hash'] == '0x123abc'
+        assert result['batch_id'] == 7
+        queue.service.create_batch.assert_called_once_with(name='Tapioca Pearls', origin='Taiwan')
+
+    def test_failed_send_marks_job_failed(self, queue):
+        """Test that a failed submission is reported on the job."""
+        queue.service.add_tracking_step.return_value = None
+
+        job = queue.enqueue('add_tracking_step', batch_id=1, step='Harvested')
+        queue.shutdown()
+
+        result = queue.get_job(job['id'])
+        assert result['status'] == 'failed'
+        assert result['error'] == "Failed to add tracking step"
+
+    def test_track_sent_transaction(self, queue):
+        """Test that an already sent transaction is followed until mined."""
+        queue.service.created_batch_ids.return_value = [9]
+
+        job = queue.track('create_batch', '0x456def', name='Tapioca Pearls', origin='Taiwan')
+        assert job['status'] == 'submitted'
+        assert job['tx_hash'] == '0x456def'
+        queue.shutdown()
+
+        result = queue.get_job(job['id'])
+        assert result['status'] == 'mined'
+        assert result['batch_id'] == 9
+        queue.service.create_batch.assert_not_called()
+        queue.service.get_receipt.assert_called_once_with('0x456def')
+
+    def test_submissions_not_blocked_by_pending_receipts(self, queue):
+        """Test that workers keep submitting while earlier receipts are still pending."""
+        mined = threading.Event()
+        queue.service.create_batch.side_effect = lambda name, origin: f"0x{name}"
+        queue.service.get_receipt.side_effect = lambda tx_hash: {'status': 1} if mined.is_set() else None
+        queue.service.created_batch_ids.side_effect = lambda receipt: [1]
+
+        jobs = [queue.enqueue('create_batch', name=str(i), origin='Taiwan') for i in range(6)]
+        deadline = time.monotonic() + 5
+        while any(queue.get_job(job['id'])['status'] == 'queued' for job in jobs) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert [queue.get_job(job['id'])['status'] for job in jobs] == ['submitted'] * 6
+        mined.set()
+        queue.shutdown()
+        assert [queue.get_job(job['id'])['status'] for job in jobs] == ['mined'] * 6
+
+    def test_receipt_timeout_marks_job_failed(self, queue):
+        """Test that a job whose receipt never arrives fails after the receipt timeout."""
+        queue.service.receipt_timeout = 0.01
+        queue.service.get_receipt.return_value = None
+
+        job = queue.track('add_tracking_step', '0x789abc', batch_id=1, step='Harvested')
+        queue.shutdown()
+
+        result = queue.get_job(job['id'])
+        assert result['status'] == 'failed'
+        assert 'not mined' in result['error']
+
+    def test_unknown_operation_rejected(self, queue):
+        """Test that only write operations can be queued."""
+        with pytest.raises(ValueError):
+            queue.enqueue('get_all_batches')
+
+
+class TestReceipts:
+    """Tests for receipt polling and batch ID resolution."""
+
+    def test_receipt_polled_until_mined(self, service):
+        """Test that a pending transaction is polled with backoff until mined."""
+        service.w3.eth.get_transaction_receipt.side_effect = [
+            TransactionNotFound("pending"), None, {'status': 1, 'logs': []}
+        ]
+
+        receipt = service.wait_for_receipt('0x123abc', timeout=5, poll_interval=0.001)
+
+        assert receipt['status'] == 1
+        assert service.w3.eth.get_transaction_receipt.call_count == 3
+
+    def test_receipt_timeout(self, service):
+        """Test that waiting gives up after the timeout."""
+        service.w3.eth.get_transaction_receipt.return_value = None
+
+        with pytest.raises(TimeExhausted):
+            service.wait_for_receipt('0x123abc', timeout=0.01, poll_interval=0.005)
+
+    def test_reverted_transaction(self, service):
+        """Test that a reverted transaction is reported as an error."""
+        service.w3.eth.get_transaction_receipt.return_value = {'status': 0, 'logs': []}
+
+        with pytest.raises(ValueError):
+            service.wait_for_receipt('0x123abc')
+
+    def test_get_created_batch_id(self, service):
+        """Test that the batch ID comes from the receipt's BatchCreated log."""
+        service.w3.eth.get_transaction_receipt.return_value = {'status': 1, 'logs': []}
+        service.created_batch_ids = Mock(return_value=[42])
+
+        assert service.get_created_batch_id('0x123abc') == 42
+
+    def test_get_created_batch_id_unresolved(self, service):
+        """Test that an unresolvable ID yields None instead of raising."""
+        service.w3.eth.get_transaction_receipt.return_value = None
+
+        assert service.get_created_batch_id('0x123abc', timeout=0) is None
+
+
+class TestHealthMonitor:
+    """Tests for the background connection prober."""
+
+    def test_probe_tracks_head_and_latency(self, service):
+        """Test that a successful probe records the chain head and latency."""
+        monitor = HealthMonitor(service.w3)
+        service.w3.eth.block_number = 123
+
+        assert monitor.probe() is True
+
+        status = monitor.status()
+        assert monitor.connected is True
+        assert status['last_block'] == 123
+        assert status['latency_ms']['p50'] is not None
+        assert status['probe_age_seconds'] is not None
+
+    def test_consecutive_failures(self, service):
+        """Test that the provider is reported down after the failure threshold."""
+        monitor = HealthMonitor(service.w3, failure_threshold=2)
+        monitor.probe()
+        type(service.w3.eth).block_number = PropertyMock(side_effect=ConnectionError("connection refused"))
+
+        monitor.probe()
+        assert monitor.connected is True
+        monitor.probe()
+        assert monitor.connected is False
+        assert monitor.status()['consecutive_failures'] == 2
+
+    def test_not_connected_before_first_probe(self, service):
+        """Test that an unprobed provider is not reported as connected."""
+        assert HealthMonitor(service.w3).connected is False
+
+    def test_is_connected_uses_cached_probe(self, service):
+        """Test that is_connected reads the monitor instead of calling the node."""
+        service.health_monitor = Mock(running=True, connected=True)
+
+        assert service.is_connected() is True
+        service.w3.is_connected.assert_not_called()
+
+    def test_percentiles(self):
+        """Test nearest-rank latency percentiles."""
+        latencies = [i / 1000 for i in range(1, 101)]
+
+        assert HealthMonitor._percentile(latencies, 50) == 50.0
+        assert HealthMonitor._percentile(latencies, 99) == 99.0
+        assert HealthMonitor._percentile([], 50) is None
+
+
+class TestBatchCache:
+    """Tests for the read-through batch cache."""
+
+    @pytest.fixture
+    def reader(self, service):
+        """Fixture to provide a service whose contract reads are counted."""
+        service.contract = Mock()
+        service.contract.functions.getBatchHistory.side_effect = lambda batch_id: Mock(
+            call=Mock(return_value=(f"Batch {batch_id}", 'Taiwan', [1], 100))
+        )
+        return service
+
+    def test_repeated_reads_served_from_cache(self, reader):
+        """Test that a hot batch is read from the chain only once."""
+        first = reader.get_batch(1)
+        first['tracking_history'].append('Mutated by caller')
+        second = reader.get_batch(1)
+
+        assert reader.contract.functions.getBatchHistory.call_count == 1
+        assert second['tracking_history'] == ['Harvested']
+        stats = reader.get_diagnostics()['batch_cache']
+        assert (stats['hits'], stats['misses']) == (1, 1)
+
+    def test_lru_eviction(self, reader):
+        """Test that the least recently used batch is evicted when full."""
+        reader.batch_cache = BatchCache(max_size=2)
+        reader.get_batch(1)
+        reader.get_batch(2)
+        reader.get_batch(1)
+        reader.get_batch(3)
+        reader.get_batch(1)
+        reader.get_batch(2)
+
+        assert reader.contract.functions.getBatchHistory.call_count == 4
+        assert reader.batch_cache.stats()['evictions'] == 2
+
+    def test_expired_entries_refetched(self, reader):
+        """Test that entries older than the TTL are treated as misses."""
+        reader.batch_cache = BatchCache(ttl=0)
+        reader.get_batch(1)
+        reader.get_batch(1)
+
+        assert reader.contract.functions.getBatchHistory.call_count == 2
+
+    def test_local_tracking_step_invalidates(self, reader):
+        """Test that sending a tracking step drops the cached batch."""
+        reader.from_address = '0xSender'
+        reader._send_transaction = Mock(return_value='ab')
+        reader.get_batch(1)
+        reader.get_batch(2)
+
+        reader.add_tracking_step(1, 'Shipped')
+        reader.get_batch(1)
+        reader.get_batch(2)
+
+        assert reader.contract.functions.getBatchHistory.call_count == 3
+        assert reader.batch_cache.stats()['invalidations'] == 1
+
+    def test_receipt_invalidates_again(self, reader):
+        """Test that a history re-cached while the step was pending is dropped once it is mined."""
+        reader.from_address = '0xSender'
+        reader._send_transaction = Mock(return_value='ab')
+        reader.get_batch(1)
+        reader.add_tracking_step(1, 'Shipped')
+        reader.get_batch(1)  # read before the transaction is mined
+        reader.tracked_batch_ids = Mock(return_value=[1])
+        reader.created_batch_ids = Mock(return_value=[])
+        reader.w3.eth.get_transaction_receipt.return_value = {'status': 1, 'logs': []}
+
+        reader.wait_for_receipt('ab')
+
+        assert reader.batch_cache.get(1) is None
+        assert reader.batch_cache.stats()['invalidations'] == 2
+
+    def test_created_batch_receipt_bumps_generation(self, service):
+        """Test that a mined batch creation changes the data generation used by list ETags."""
+        service.w3.eth.get_transaction_receipt.return_value = {'status': 1, 'logs': []}
+        service.tracked_batch_ids = Mock(return_value=[])
+        service.created_batch_ids = Mock(return_value=[5])
+        generation = service.data_generation()
+
+        service.wait_for_receipt('0x123abc')
+
+        assert service.data_generation() == generation + 1
+
+    def test_stale_read_not_cached(self):
+        """Test that a read racing an invalidation is not stored."""
+        cache = BatchCache()
+        generation = cache.generation
+        cache.invalidate(1)
+        cache.put(1, {'id': 1, 'tracking_history': []}, generation=generation)
+
+        assert cache.get(1) is None
+
+    def test_watcher_invalidates_on_step_event(self, service):
+        """Test that TrackingStepAdded logs drop exactly the affected batches."""
+        service.w3.to_hex = Web3.to_hex
+        service.w3.keccak = Web3.keccak
+        for batch_id in (1, 2):
+            service.batch_cache.put(batch_id, {'id': batch_id, 'tracking_history': []})
+        watcher = StepEventWatcher(service.w3, service.contract, service.batch_cache)
+        watcher.poll()
+
+        service.w3.eth.block_number = 12
+        service.w3.eth.get_logs.return_value = [{
+            'address': CONTRACT_ADDRESS,
+            'blockHash': b'\x00' * 32,
+            'blockNumber': 11,
+            'data': encode(['string'], ['']),
+            'logIndex': 0,
+            'topics': [
+                Web3.keccak(text='TrackingStepAdded(uint256,uint16,string)'),
+                encode(['uint256'], [2]),
+                encode(['uint16'], [3])
+            ],
+            'transactionHash': b'\x00' * 32,
+            'transactionIndex': 0,
+            'removed': False,
+        }]
+        watcher.poll()
+
+        params = service.w3.eth.get_logs.call_args.args[0]
+        assert (params['fromBlock'], params['toBlock']) == (11, 12)
+        assert service.batch_cache.get(1) is not None
+        assert service.batch_cache.get(2) is None
+        assert watcher.last_block == 12
+
+    def test_watcher_catches_up_in_bounded_windows(self, service):
+        """Test that a long stall is read back in max_block_range windows."""
+        service.w3.to_hex = Web3.to_hex
+        service.w3.keccak = Web3.keccak
+        watcher = StepEventWatcher(service.w3, service.contract, service.batch_cache, max_block_range=100)
+        service.w3.eth.block_number = 10
+        watcher.poll()
+
+        service.w3.eth.block_number = 260
+        service.w3.eth.get_logs.return_value = []
+        watcher.poll()
+
+        ranges = [(call.args[0]['fromBlock'], call.args[0]['toBlock'])
+                  for call in service.w3.eth.get_logs.call_args_list]
+        assert ranges == [(11, 110), (111, 210), (211, 260)]
+        assert watcher.last_block == 260
+
+
+class TestAsyncBlockchainService:
+    """Tests for the AsyncWeb3-based service."""
+
+    @pytest.fixture
+    def async_service(self):
+        """Fixture to provide an async service with a mocked contract."""
+        service = AsyncBlockchainService(provider_url='http://127.0.0.1:1', max_concurrency=4)
+        service.contract = Mock()
+        return service
+
+    def test_get_all_batches_fans_out_with_bound(self, async_service):
+        """Test that reads run concurrently but never exceed the concurrency bound."""
+        in_flight = 0
+        peak = 0
+
+        async def call(batch_id):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return (f"Batch {batch_id}", 'Taiwan', [], batch_id)
+
+        async_service.contract.functions.batchCount.return_value.call = AsyncMock(return_value=20)
+        async_service.contract.functions.getBatchHistory.side_effect = (
+            lambda batch_id: Mock(call=lambda: call(batch_id))
+        )
+
+        batches = asyncio.run(async_service.get_all_batches())
+
+        assert [batch['id'] for batch in batches] == list(range(1, 21))
+        assert peak == 4
+
+    def test_get_batch_error(self, async_service):
+        """Test that a failed read yields None."""
+        async_service.contract.functions.getBatchHistory.return_value.call = AsyncMock(
+            side_effect=ValueError("execution reverted")
+        )
+
+        assert asyncio.run(async_service.get_batch(99)) is None
+
+    def test_create_batch_allocates_nonces_locally(self, async_service):
+        """Test that async writes read the chain nonce once per sender."""
+        async_service.from_address = '0xSender'
+        async_service.w3 = Mock()
+        async_service.nonce_manager.w3 = async_service.w3
+        async_service.fee_oracle = FeeOracle(async_service.w3, ttl=60, mode='legacy')
+        async_service.w3.eth.get_transaction_count = AsyncMock(return_value=3)
+        gas_price = PropertyMock(side_effect=lambda: asyncio.sleep(0, result=1))
+        type(async_service.w3.eth).gas_price = gas_price
+        async_service.contract.functions.createBatch.return_value.build_transaction = AsyncMock(
+            side_effect=lambda tx: dict(tx)
+        )
+        async_service.w3.eth.send_transaction = AsyncMock(side_effect=lambda tx: bytes([tx['nonce']]))
+
+        async def create_two():
+            first = await async_service.create_batch('Tapioca Pearls', 'Taiwan')
+            second = await async_service.create_batch('Milk Tea', 'China')
+            return first, second
+
+        assert asyncio.run(create_two()) == ('03', '04')
+        async_service.w3.eth.get_transaction_count.assert_awaited_once_with('0xSender', 'pending')
+        # Fees come from the cached oracle, not a gas price read per write
+        assert gas_price.call_count == 1
+        built = async_service.contract.functions.createBatch.return_value.build_transaction.call_args[0][0]
+        assert built['gasPrice'] == 1
+
+    def test_signed_transaction_sent_raw(self, async_service):
+        """Test that with a private key async writes are signed locally and sent raw."""
+        account = Account.create()
+        async_service.private_key = account.key.hex()
+        async_service.from_address = account.address
+        async_service.w3 = Mock()
+        async_service.w3.eth.account = Account
+        async_service.nonce_manager.w3 = async_service.w3
+        async_service.w3.eth.get_transaction_count = AsyncMock(return_value=0)
+        async_service.fee_oracle.get_fee_params_async = AsyncMock(return_value={'gasPrice': 1})
+        async_service.contract.functions.createBatch.return_value.build_transaction = AsyncMock(
+            side_effect=lambda tx: {**tx, 'to': CONTRACT_ADDRESS, 'value': 0, 'data': '0x', 'chainId': 1337}
+        )
+        async_service.w3.eth.send_raw_transaction = AsyncMock(side_effect=lambda raw: Web3.keccak(raw))
+
+        tx_hash = asyncio.run(async_service.create_batch('Tapioca Pearls', 'Taiwan'))
+
+        raw = async_service.w3.eth.send_raw_transaction.await_args.args[0]
+        assert tx_hash == Web3.keccak(raw).hex()
+        assert Account.recover_transaction(raw) == account.address
+
+    def test_async_eip1559_fees(self, async_service):
+        """Test that the oracle derives EIP-1559 fees from an AsyncWeb3 node."""
+        w3 = Mock()
+        w3.eth.get_block = AsyncMock(return_value={'baseFeePerGas': 100})
+        type(w3.eth).max_priority_fee = PropertyMock(side_effect=lambda: asyncio.sleep(0, result=2))
+        oracle = FeeOracle(w3, ttl=60, mode='auto')
+
+        assert asyncio.run(oracle.get_fee_params_async()) == {'maxFeePerGas': 202, 'maxPriorityFeePerGas': 2}
+        assert oracle.status()['fees'] == {'maxFeePerGas': 202, 'maxPriorityFeePerGas': 2}
+
+    def test_concurrent_new_step_registered_once(self, async_service):
+        """Test that concurrent writers of the same new step send a single registerSteps."""
+        async_service.from_address = '0xSender'
+        async_service.w3 = Mock()
+        registered = ['']  # index = code; code 0 is reserved
+
+        async def get_step_names(from_code):
+            await asyncio.sleep(0.01)
+            return registered[from_code:]
+
+        async def send(contract_function, sender, gas=2000000):
+            await asyncio.sleep(0.01)
+            return '0xabc'
+
+        async def wait_for_receipt(tx_hash):
+            registered.append('Harvested')
+
+        async_service.contract.functions.getStepNames.side_effect = (
+            lambda from_code: Mock(call=lambda: get_step_names(from_code))
+        )
+        async_service.w3.eth.wait_for_transaction_receipt = wait_for_receipt
+        async_service._send_transaction = AsyncMock(side_effect=send)
+
+        async def add_three():
+            return await asyncio.gather(*(
+                async_service.add_tracking_step(batch_id, 'Harvested') for batch_id in (1, 2, 3)
+            ))
+
+        assert asyncio.run(add_three()) == ['0xabc'] * 3
+        async_service.contract.functions.registerSteps.assert_called_once_with(['Harvested'])
+        async_service.contract.functions.addTrackingStep.assert_any_call(3, 1, '')
@@ -0,0 +1,213 @@
+"""
+Tests for the BatchTracker event indexer.
+Event logs are ABI-encoded by hand so no blockchain node is required.
+"""
+
+import pytest
+import threading
+from types import SimpleNamespace
+from unittest.mock import Mock
+from eth_abi import encode
+from web3 import Web3
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.blockchain import BlockchainService
+from services.indexer import BatchIndexer
+
+CONTRACT_ADDRESS = Web3.to_checksum_address('0x' + '12' * 20)
+
+
+class FakeEth:
+    """Minimal stand-in for w3.eth serving a fixed list of logs."""
+
+    def __init__(self):
+        self.block_number = 0
+        self.logs = []
+        self.get_logs_calls = 0
+
+    def get_logs(self, params):
+        self.get_logs_calls += 1
+        return [
+            log for log in self.logs
+            if params['fromBlock'] <= log['blockNumber'] <= params['toBlock']
+        ]
+
+    def get_block(self, block_number):
+        return {'timestamp': 1700000000 + block_number}
+
+
+def make_log(block_number, log_index, signature, types, values, indexed=()):
+    """Build a raw log entry as returned by eth_getLogs; indexed holds (type, value) topic pairs."""
+    return {
+        'address': CONTRACT_ADDRESS,
+        'blockHash': b'\x00' * 32,
+        'blockNumber': block_number,
+        'data': encode(types, values),
+        'logIndex': log_index,
+        'topics': [Web3.keccak(text=signature)] + [encode([abi_type], [value]) for abi_type, value in indexed],
+        'transactionHash': b'\x00' * 32,
+        'transactionIndex': 0,
+        'removed': False,
+    }
+
+
+def batch_created(block_number, log_index, batch_id, name, origin):
+    return make_log(block_number, log_index, 'BatchCreated(uint256,string,string)',
+                    ['string', 'string'], [name, origin], indexed=[('uint256', batch_id)])
+
+
+def step_registered(block_number, log_index, code, step):
+    return make_log(block_number, log_index, 'StepRegistered(uint16,string)',
+                    ['uint16', 'string'], [code, step])
+
+
+def step_added(block_number, log_index, batch_id, step_code, note=''):
+    return make_log(block_number, log_index, 'TrackingStepAdded(uint256,uint16,string)',
+                    ['string'], [note], indexed=[('uint256', batch_id), ('uint16', step_code)])
+
+
+@pytest.fixture
+def eth():
+    return FakeEth()
+
+
+@pytest.fixture
+def indexer(eth, tmp_path):
+    """Fixture to provide an indexer over the fake chain."""
+    w3 = SimpleNamespace(eth=eth, to_hex=Web3.to_hex, keccak=Web3.keccak)
+    contract = Web3().eth.contract(address=CONTRACT_ADDRESS, abi=BlockchainService._get_default_abi())
+    return BatchIndexer(w3, contract, db_path=str(tmp_path / 'index.db'), max_block_range=2)
+
+
+class TestBatchIndexer:
+    """Tests for event materialization."""
+
+    def test_sync_materializes_batches(self, indexer, eth):
+        """Test that created batches and their steps are indexed in log order."""
+        eth.logs = [
+            batch_created(1, 0, 1, 'Tapioca Pearls', 'Taiwan'),
+            step_registered(1, 1, 1, 'Harvested'),
+            step_registered(1, 2, 2, 'Processed'),
+            step_added(2, 1, 1, 2),
+            step_added(2, 0, 1, 1),
+            batch_created(3, 0, 2, 'Milk Tea', 'China'),
+        ]
+        eth.block_number = 4
+
+        assert indexer.last_block is None
+        assert indexer.sync() == 4
+
+        assert indexer.get_batch(1) == {
+            'id': 1,
+            'name': 'Tapioca Pearls',
+            'origin': 'Taiwan',
+            'tracking_history': ['Harvested', 'Processed'],
+            'timestamp': 1700000001
+        }
+        assert [batch['id'] for batch in indexer.get_all_batches()] == [1, 2]
+        assert indexer.get_batch_count() == 2
+        assert indexer.get_batch(3) is None
+        assert (indexer.get_batch_block(1), indexer.get_batch_block(2)) == (1, 3)
+        assert indexer.get_batch_block(3) is None
+
+    def test_get_batches_range(self, indexer, eth):
+        """Test that range reads page through batches by ID."""
+        eth.logs = [batch_created(1, i, i + 1, f'Batch {i + 1}', 'Taiwan') for i in range(5)]
+        eth.logs.append(step_registered(1, 5, 1, 'Harvested'))
+        eth.logs.append(step_added(1, 6, 3, 1))
+        eth.block_number = 1
+        indexer.sync()
+
+        page = indexer.get_batches_range(2, 2)
+
+        assert [batch['id'] for batch in page] == [2, 3]
+        assert page[1]['tracking_history'] == ['Harvested']
+        assert indexer.get_batches_range(6, 2) == []
+
+    def test_sync_is_incremental(self, indexer, eth):
+        """Test that a second sync only scans new blocks."""
+        eth.logs = [batch_created(1, 0, 1, 'Tapioca Pearls', 'Taiwan')]
+        eth.block_number = 1
+        indexer.sync()
+
+        eth.logs.append(step_registered(2, 0, 1, 'Shipped'))
+        eth.logs.append(step_added(2, 1, 1, 1))
+        eth.block_number = 2
+        eth.get_logs_calls = 0
+        indexer.sync()
+
+        assert eth.get_logs_calls == 1
+        assert indexer.get_batch(1)['tracking_history'] == ['Shipped']
+
+    def test_index_persists_across_instances(self, indexer, eth, tmp_path):
+        """Test that a restarted indexer resumes from the stored block."""
+        eth.logs = [batch_created(1, 0, 1, 'Tapioca Pearls', 'Taiwan')]
+        eth.block_number = 1
+        indexer.sync()
+
+        reopened = BatchIndexer(indexer.w3, indexer.contract, db_path=str(tmp_path / 'index.db'))
+        assert reopened.last_block == 1
+        assert reopened.get_batch(1)['name'] == 'Tapioca Pearls'
+
+    def test_listeners_receive_events(self, indexer, eth):
+        """Test that listeners are notified of applied events."""
+        received = []
+        indexer.listeners.append(lambda name, args: received.append((name, args['batchId'])))
+        eth.logs = [batch_created(1, 0, 1, 'Tapioca Pearls', 'Taiwan'), step_added(1, 1, 1, 1)]
+        eth.block_number = 1
+        indexer.contract = Mock(wraps=indexer.contract)
+        indexer.contract.functions.stepNames.return_value.call.return_value = 'Harvested'
+
+        indexer.sync()
+
+        assert received == [('BatchCreated', 1), ('TrackingStepAdded', 1)]
+
+    def test_steps_registered_before_start_block(self, indexer, eth):
+        """Test that a step code with no indexed StepRegistered event is read from the contract once."""
+        eth.logs = [batch_created(1, 0, 1, 'Tapioca Pearls', 'Taiwan'), step_added(1, 1, 1, 4), step_added(1, 2, 1, 4)]
+        eth.block_number = 1
+        indexer.contract = Mock(wraps=indexer.contract)
+        indexer.contract.functions.stepNames.return_value.call.return_value = 'Delivered'
+
+        indexer.sync()
+        eth.logs.append(step_added(2, 0, 1, 4))
+        eth.block_number = 2
+        indexer.sync()
+
+        assert indexer.get_batch(1)['tracking_history'] == ['Delivered', 'Delivered', 'Delivered']
+        indexer.contract.functions.stepNames.assert_called_once_with(4)
+
+    def test_reads_not_blocked_by_node_calls(self, indexer, eth):
+        """Test that indexed reads are answered while a sync waits on the node."""
+        eth.logs = [batch_created(1, 0, 1, 'Tapioca Pearls', 'Taiwan')]
+        eth.block_number = 1
+        indexer.sync()
+
+        node_called = threading.Event()
+        release = threading.Event()
+
+        def slow_get_block(block_number):
+            node_called.set()
+            release.wait(5)
+            return {'timestamp': 1700000000 + block_number}
+
+        eth.get_block = slow_get_block
+        eth.logs.append(batch_created(2, 0, 2, 'Milk Tea', 'China'))
+        eth.block_number = 2
+        syncing = threading.Thread(target=indexer.sync)
+        syncing.start()
+        try:
+            assert node_called.wait(5)
+            read = threading.Thread(target=indexer.get_batch, args=(1,))
+            read.start()
+            read.join(1)
+            assert not read.is_alive()
+        finally:
+            release.set()
+            syncing.join(5)
+
+        assert indexer.get_batch(2)['name'] == 'Milk Tea'
@@ -0,0 +1,212 @@
+"""
+Tests for the Prometheus metrics registry, RPC call tracking and per-request tracing.
+"""
+
+import pytest
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web3 import Web3, EthereumTesterProvider
+
+from services import metrics, request_trace
+from services.metrics import MetricsRegistry, track_rpc
+from services.request_trace import SlowRequestProfiler
+
+
+@pytest.fixture
+def registry():
+    """Fixture to provide an empty registry."""
+    return MetricsRegistry()
+
+
+class TestMetricsRegistry:
+    """Tests for counters, gauges, histograms and the text exposition format."""
+
+    def test_counter_renders_labels(self, registry):
+        """Test counters accumulate per label set and render with HELP and TYPE lines."""
+        counter = registry.counter('calls_total', 'Calls made.', ('method',))
+        counter.inc(method='batchCount')
+        counter.inc(2, method='batchCount')
+
+        text = registry.render()
+        assert '# HELP calls_total Calls made.' in text
+        assert '# TYPE calls_total counter' in text
+        assert 'calls_total{method="batchCount"} 3' in text
+
+    def test_counter_rejects_decrease(self, registry):
+        """Test counters cannot go down."""
+        counter = registry.counter('calls_total', 'Calls made.')
+        with pytest.raises(ValueError):
+            counter.inc(-1)
+
+    def test_labels_must_match(self, registry):
+        """Test recording with the wrong label names is an error."""
+        counter = registry.counter('calls_total', 'Calls made.', ('method',))
+        with pytest.raises(ValueError):
+            counter.inc(endpoint='/api/batches')
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        """Test histogram buckets count every observation at or below their bound."""
+        histogram = registry.histogram('latency_seconds', 'Latency.', ('method',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, method='getBatchHistory')
+
+        text = registry.render()
+        assert 'latency_seconds_bucket{method="getBatchHistory",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{method="getBatchHistory",le="1"} 2' in text
+        assert 'latency_seconds_bucket{method="getBatchHistory",le="+Inf"} 3' in text
+        assert 'latency_seconds_sum{method="getBatchHistory"} 5.55' in text
+        assert 'latency_seconds_count{method="getBatchHistory"} 3' in text
+
+    def test_label_values_escaped(self, registry):
+        """Test quotes, backslashes and newlines in label values are escaped."""
+        gauge = registry.gauge('state', 'State.', ('name',))
+        gauge.set(1, name='a"b\\c\nd')
+        assert 'state{name="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+    def test_register_returns_existing_metric(self, registry):
+        """Test registering a name twice returns the same metric, unless the type differs."""
+        counter = registry.counter('calls_total', 'Calls made.')
+        assert registry.counter('calls_total', 'Calls made.') is counter
+        with pytest.raises(ValueError):
+            registry.gauge('calls_total', 'Calls made.')
+
+
+class TestTrackRPC:
+    """Tests for timing outgoing calls."""
+
+    def test_success_recorded_under_endpoint(self):
+        """Test a call is timed under the endpoint set for the thread and leaves nothing in flight."""
+        token = metrics.set_endpoint('/api/test-success')
+        try:
+            with track_rpc('batchCount'):
+                assert metrics.RPC_IN_FLIGHT.value(method='batchCount', endpoint='/api/test-success') == 1
+        finally:
+            metrics.reset_endpoint(token)
+
+        assert metrics.RPC_DURATION.count(method='batchCount', endpoint='/api/test-success') == 1
+        assert metrics.RPC_IN_FLIGHT.value(method='batchCount', endpoint='/api/test-success') == 0
+        assert metrics.RPC_ERRORS.value(method='batchCount', endpoint='/api/test-success') == 0
+
+    def test_exception_counts_as_error(self):
+        """Test an exception leaving the block is counted as an error and re-raised."""
+        with pytest.raises(ConnectionError):
+            with track_rpc('test_failing_call'):
+                raise ConnectionError("node down")
+
+        assert metrics.RPC_ERRORS.value(method='test_failing_call', endpoint=metrics.BACKGROUND_ENDPOINT) == 1
+
+    def test_fail_counts_handled_error(self):
+        """Test fail() marks a call whose error was handled inside the block."""
+        with track_rpc('test_handled_call') as call:
+            call.fail()
+
+        assert metrics.RPC_ERRORS.value(method='test_handled_call', endpoint=metrics.BACKGROUND_ENDPOINT) == 1
+
+    def test_closed_generator_not_an_error(self):
+        """Test a generator closed by its consumer is not counted as a failed call."""
+        def stream():
+            with track_rpc('test_stream_call'):
+                yield 'a'
+                yield 'b'
+
+        chunks = stream()
+        next(chunks)
+        chunks.close()
+
+        assert metrics.RPC_DURATION.count(method='test_stream_call', endpoint=metrics.BACKGROUND_ENDPOINT) == 1
+        assert metrics.RPC_ERRORS.value(method='test_stream_call', endpoint=metrics.BACKGROUND_ENDPOINT) == 0
+
+
+class TestRequestTrace:
+    """Tests for per-request call accounting."""
+
+    @pytest.fixture(autouse=True)
+    def trace(self):
+        """Fixture to trace the calls made by the test's thread."""
+        trace = request_trace.start_trace()
+        yield trace
+        request_trace.end_trace()
+
+    def test_web3_requests_counted(self, trace):
+        """Test that each JSON-RPC request sent through Web3 is counted by method."""
+        w3 = Web3(EthereumTesterProvider())
+        request_trace.install_rpc_tracing(w3)
+
+        w3.eth.block_number
+        w3.eth.block_number
+        w3.eth.get_block('latest')
+
+        assert trace.rpc_count == 3
+        assert trace.summary()['rpc'] == {'eth_blockNumber': 2, 'eth_getBlockByNumber': 1}
+
+    def test_batched_requests_counted_per_call(self, trace):
+        """Test that a JSON-RPC batch counts every call it carries."""
+        request_trace.record_rpc('eth_call', 0.02, count=50)
+        assert trace.rpc_count == 50
+
+    def test_server_timing_lists_calls(self, trace):
+        """Test the Server-Timing value has tracked calls, wire methods and the total."""
+        with track_rpc('getBatchHistory'):
+            request_trace.record_rpc('eth_call', 0.004)
+
+        entries = trace.server_timing().split(', ')
+        assert entries[0].startswith('getBatchHistory;dur=')
+        assert entries[0].endswith('desc="1x"')
+        assert entries[1] == 'rpc.eth_call;dur=4.00;desc="1x"'
+        assert entries[2].startswith('total;dur=')
+
+    def test_no_trace_outside_requests(self):
+        """Test that calls made without a trace are not recorded anywhere."""
+        request_trace.end_trace()
+        request_trace.record_rpc('eth_call', 0.01)
+        assert request_trace.current_trace() is None
+
+
+class TestSlowRequestProfiler:
+    """Tests for profiling slow requests."""
+
+    def test_slow_request_profile_written(self, tmp_path):
+        """Test that a sampled request over the threshold leaves a profile on disk."""
+        profiler = SlowRequestProfiler(threshold_ms=10, sample_rate=1.0, output_dir=str(tmp_path))
+
+        profile = profiler.start()
+        path = profiler.finish(profile, 25.0, 'GET /api/batches')
+
+        assert path is not None and os.path.exists(path)
+        assert 'GET_api_batches' in os.path.basename(path)
+        assert profiler.status()['profiles_written'] == 1
+
+    def test_fast_request_profile_discarded(self, tmp_path):
+        """Test that a profile under the threshold is not written."""
+        profiler = SlowRequestProfiler(threshold_ms=10, sample_rate=1.0, output_dir=str(tmp_path))
+
+        assert profiler.finish(profiler.start(), 5.0, 'GET /api/batches') is None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_one_profile_at_a_time(self, tmp_path):
+        """Test that a request arriving while another is profiled is not sampled."""
+        profiler = SlowRequestProfiler(threshold_ms=10, sample_rate=1.0, output_dir=str(tmp_path))
+
+        first = profiler.start()
+        assert profiler.start() is None
+        profiler.finish(first, 1.0, 'GET /api/batches')
+        second = profiler.start()
+        assert second is not None
+        profiler.finish(second, 1.0, 'GET /api/batches')
+
+    def test_disabled_without_threshold(self):
+        """Test that no request is profiled when no threshold is configured."""
+        assert SlowRequestProfiler(threshold_ms=0, sample_rate=1.0).start() is None
+
+    def test_old_profiles_pruned(self, tmp_path):
+        """Test that only the newest max_files profiles are kept."""
+        profiler = SlowRequestProfiler(threshold_ms=1, sample_rate=1.0, output_dir=str(tmp_path), max_files=2)
+        for index in range(4):
+            path = profiler.finish(profiler.start(), 10.0 + index, f'GET /api/batch/{index}')
+            os.utime(path, (index, index))
+
+        assert len(list(tmp_path.iterdir())) == 2
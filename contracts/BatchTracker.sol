@@ -4,30 +4,105 @@ contract BatchTracker {
     struct Batch {
         string name;
         string origin;
-        string[] trackingHistory;
+        uint16[] trackingHistory;  // step codes into stepNames, 16 per storage slot
         uint256 timestamp;
     }
 
     mapping(uint256 => Batch) public batches;
     uint256 public batchCount;
 
-    event BatchCreated(uint256 batchId, string name, string origin);
-    event TrackingStepAdded(uint256 batchId, string step);
+    // Step dictionary: each distinct step text is stored once and referenced by its code.
+    // Code 0 is reserved so an unregistered step reads as 0 from stepCodes.
+    string[] public stepNames;
+    mapping(bytes32 => uint16) public stepCodes;
+
+    event BatchCreated(uint256 indexed batchId, string name, string origin);
+    event StepRegistered(uint16 code, string step);
+    event TrackingStepAdded(uint256 indexed batchId, uint16 indexed stepCode, string note);
+
+    constructor() {
+        stepNames.push("");
+    }
 
     function createBatch(string memory _name, string memory _origin) public {
         batchCount++;
-        batches[batchCount] = Batch(_name, _origin, new string[](0), block.timestamp);
+        batches[batchCount] = Batch(_name, _origin, new uint16[](0), block.timestamp);
         emit BatchCreated(batchCount, _name, _origin);
     }
 
-    function addTrackingStep(uint256 _batchId, string memory _step) public {
+    function createBatches(string[] memory _names, string[] memory _origins) public {
+        require(_names.length == _origins.length, "Names and origins length mismatch");
+        for (uint256 i = 0; i < _names.length; i++) {
+            createBatch(_names[i], _origins[i]);
+        }
+    }
+
+    function registerStep(string memory _step) public returns (uint16) {
+        bytes32 key = keccak256(bytes(_step));
+        uint16 code = stepCodes[key];
+        if (code != 0) {
+            return code;
+        }
+
+        require(bytes(_step).length > 0, "Step cannot be empty");
+        require(stepNames.length <= type(uint16).max, "Step dictionary is full");
+        code = uint16(stepNames.length);
+        stepNames.push(_step);
+        stepCodes[key] = code;
+        emit StepRegistered(code, _step);
+        return code;
+    }
+
+    function registerSteps(string[] memory _steps) public {
+        for (uint256 i = 0; i < _steps.length; i++) {
+            registerStep(_steps[i]);
+        }
+    }
+
+    function getStepNames(uint256 _fromCode) public view returns (string[] memory) {
+        if (_fromCode >= stepNames.length) {
+            return new string[](0);
+        }
+
+        string[] memory names = new string[](stepNames.length - _fromCode);
+        for (uint256 i = 0; i < names.length; i++) {
+            names[i] = stepNames[_fromCode + i];
+        }
+        return names;
+    }
+
+    function addTrackingStep(uint256 _batchId, uint16 _stepCode, string memory _note) public {
         require(_batchId > 0 && _batchId <= batchCount, "Batch does not exist");
-        batches[_batchId].trackingHistory.push(_step);
-        emit TrackingStepAdded(_batchId, _step);
+        require(_stepCode > 0 && _stepCode < stepNames.length, "Step is not registered");
+        batches[_batchId].trackingHistory.push(_stepCode);
+        emit TrackingStepAdded(_batchId, _stepCode, _note);
+    }
+
+    function addTrackingSteps(uint256[] memory _batchIds, uint16[] memory _stepCodes) public {
+        for (uint256 i = 0; i < _batchIds.length; i++) {
+            for (uint256 j = 0; j < _stepCodes.length; j++) {
+                addTrackingStep(_batchIds[i], _stepCodes[j], "");
+            }
+        }
     }
 
     function getBatchHistory(uint256 _batchId) public view returns (Batch memory) {
         require(_batchId > 0 && _batchId <= batchCount, "Batch does not exist");
         return batches[_batchId];
     }
-}
\ No newline at end of file
+
+    function getBatches(uint256 _fromId, uint256 _count) public view returns (Batch[] memory) {
+        require(_fromId > 0, "Batch IDs start at 1");
+        if (_fromId > batchCount) {
+            return new Batch[](0);
+        }
+
+        uint256 available = batchCount - _fromId + 1;
+        uint256 size = _count < available ? _count : available;
+        Batch[] memory page = new Batch[](size);
+        for (uint256 i = 0; i < size; i++) {
+            page[i] = batches[_fromId + i];
+        }
+        return page;
+    }
+}
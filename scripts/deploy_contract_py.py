@@ -10,14 +10,22 @@ Usage:
     2. Run: python scripts/deploy_contract_py.py
 
 This script will compile `contracts/BatchTracker.sol`, deploy it to the node,
-and write `contracts/BatchTracker.json` with the deployed address and ABI so the
-backend can auto-load it.
+register the common tracking steps in the contract's step dictionary (set
+DEPLOY_STEPS to a comma-separated list to override, or to an empty string to
+skip), and write `contracts/BatchTracker.json` with the deployed address and ABI
+so the backend can auto-load it.
+
+Tracking steps are stored as uint16 codes into the step dictionary; the backend
+registers any step it has not seen with registerSteps before its first use, so
+pre-registering only saves that extra transaction on the first writes.
 """
 import json
 import os
 from web3 import Web3
 from solcx import compile_source, install_solc
 
+DEFAULT_STEPS = ['Harvested', 'Processed', 'Packaged', 'Shipped', 'Delivered']
+
 
 def compile_contract(sol_path: str):
     with open(sol_path, 'r', encoding='utf-8') as f:
@@ -52,6 +60,16 @@ def deploy(abi, bytecode, provider_url='http://127.0.0.1:8545'):
     return address
 
 
+def register_steps(address, abi, steps, provider_url='http://127.0.0.1:8545'):
+    w3 = Web3(Web3.HTTPProvider(provider_url))
+    acct = w3.eth.accounts[0]
+    contract = w3.eth.contract(address=address, abi=abi)
+    tx_hash = contract.functions.registerSteps(steps).transact({'from': acct})
+    w3.eth.wait_for_transaction_receipt(tx_hash)
+    # Code 0 is reserved, so registered steps start at code 1
+    return {step: code for code, step in enumerate(contract.functions.getStepNames(1).call(), start=1)}
+
+
 def write_artifact(path: str, address: str, abi):
     data = {
         'address': address,
@@ -71,6 +89,11 @@ def main():
     print('Connecting to local blockchain...')
     address = deploy(abi, bytecode)
     print(f'Deployed BatchTracker at: {address}')
+    steps = os.getenv('DEPLOY_STEPS')
+    steps = DEFAULT_STEPS if steps is None else [step.strip() for step in steps.split(',') if step.strip()]
+    if steps:
+        codes = register_steps(address, abi, steps)
+        print('Registered steps: ' + ', '.join(f'{step}={code}' for step, code in codes.items()))
     write_artifact(out_path, address, abi)
     print(f'Wrote artifact to: {out_path}')
 
@@ -1,68 +1,109 @@
+import os
+import sys
+
 from web3 import Web3
 import pytest
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from deploy_contract_py import compile_contract
+
 # Connect to the local Ethereum blockchain
-w3 = Web3(Web3.HTTPProvider('http://127.0.0.1:8545'))
+w3 = Web3(Web3.HTTPProvider(os.getenv('BLOCKCHAIN_PROVIDER', 'http://127.0.0.1:8545')))
+
+pytestmark = pytest.mark.skipif(not w3.is_connected(), reason='No local blockchain node at 127.0.0.1:8545')
+
+SOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'contracts', 'BatchTracker.sol')
 
-# Load the compiled contract
-with open('boba-chain/contracts/BatchTracker.json') as f:
-    contract_json = json.load(f)
-    BatchTracker = w3.eth.contract(
-        address='0xYourContractAddress',  # Replace with your deployed contract address
-        abi=contract_json['abi']
-    )
 
 @pytest.fixture
 def deploy_contract():
-    # Deploy the contract before each test
+    # Compile and deploy a fresh contract before each test
+    abi, bytecode = compile_contract(SOL_PATH)
     account = w3.eth.accounts[0]
-    tx_hash = BatchTracker.constructor().transact({'from': account})
-    w3.eth.waitForTransactionReceipt(tx_hash)
-    return BatchTracker
+    tx_hash = w3.eth.contract(abi=abi, bytecode=bytecode).constructor().transact({'from': account})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    return w3.eth.contract(address=receipt.contractAddress, abi=abi)
+
+
+def transact(function):
+    tx_hash = function.transact({'from': w3.eth.accounts[0]})
+    return w3.eth.wait_for_transaction_receipt(tx_hash)
+
 
 def test_create_batch(deploy_contract):
     batch_tracker = deploy_contract
-    account = w3.eth.accounts[0]
-    
-    # Create a new batch
-    tx_hash = batch_tracker.functions.createBatch("Boba Tea", "Taiwan").transact({'from': account})
-    w3.eth.waitForTransactionReceipt(tx_hash)
+
+    # Create a new batch (IDs start at 1)
+    receipt = transact(batch_tracker.functions.createBatch("Boba Tea", "Taiwan"))
 
     # Verify the batch was created
-    batch = batch_tracker.functions.getBatch(0).call()
-    assert batch[0] == "Boba Tea"
-    assert batch[1] == "Taiwan"
+    event = batch_tracker.events.BatchCreated().process_receipt(receipt)[0]
+    assert event['args']['batchId'] == 1
+    name, origin, tracking_history, timestamp = batch_tracker.functions.getBatchHistory(1).call()
+    assert name == "Boba Tea"
+    assert origin == "Taiwan"
+    assert tracking_history == []
+
+
+def test_register_steps(deploy_contract):
+    batch_tracker = deploy_contract
+
+    # Register a step alone, then again with a new one; known steps keep their code
+    receipt = transact(batch_tracker.functions.registerStep("Harvested"))
+    event = batch_tracker.events.StepRegistered().process_receipt(receipt)[0]
+    assert event['args']['code'] == 1
+    receipt = transact(batch_tracker.functions.registerSteps(["Harvested", "Processed"]))
+    assert len(batch_tracker.events.StepRegistered().process_receipt(receipt)) == 1
+
+    assert batch_tracker.functions.getStepNames(1).call() == ["Harvested", "Processed"]
+    assert batch_tracker.functions.stepCodes(Web3.keccak(text="Processed")).call() == 2
+
 
 def test_add_tracking_step(deploy_contract):
     batch_tracker = deploy_contract
-    account = w3.eth.accounts[0]
-    
-    # Create a new batch
-    tx_hash = batch_tracker.functions.createBatch("Boba Tea", "Taiwan").transact({'from': account})
-    w3.eth.waitForTransactionReceipt(tx_hash)
 
-    # Add a tracking step
-    tx_hash = batch_tracker.functions.addTrackingStep(0, "Harvested").transact({'from': account})
-    w3.eth.waitForTransactionReceipt(tx_hash)
+    # Create a new batch and register its step
+    transact(batch_tracker.functions.createBatch("Boba Tea", "Taiwan"))
+    transact(batch_tracker.functions.registerSteps(["Harvested"]))
+
+    # Add a tracking step by code, with a note that is only emitted
+    receipt = transact(batch_tracker.functions.addTrackingStep(1, 1, "Field 7"))
+
+    # Verify the tracking step was added and its event is indexed by batch and step
+    event = batch_tracker.events.TrackingStepAdded().process_receipt(receipt)[0]
+    assert (event['args']['batchId'], event['args']['stepCode'], event['args']['note']) == (1, 1, "Field 7")
+    logs = w3.eth.get_logs({
+        'address': batch_tracker.address,
+        'fromBlock': receipt.blockNumber,
+        'topics': [
+            Web3.to_hex(Web3.keccak(text="TrackingStepAdded(uint256,uint16,string)")),
+            Web3.to_hex((1).to_bytes(32, 'big')),
+            Web3.to_hex((1).to_bytes(32, 'big'))
+        ]
+    })
+    assert len(logs) == 1
+
+
+def test_unregistered_step_rejected(deploy_contract):
+    batch_tracker = deploy_contract
+    transact(batch_tracker.functions.createBatch("Boba Tea", "Taiwan"))
+
+    with pytest.raises(Exception):
+        transact(batch_tracker.functions.addTrackingStep(1, 1, ""))
 
-    # Verify the tracking step was added
-    tracking_steps = batch_tracker.functions.getTrackingSteps(0).call()
-    assert "Harvested" in tracking_steps
 
 def test_get_batch_history(deploy_contract):
     batch_tracker = deploy_contract
-    account = w3.eth.accounts[0]
-    
-    # Create a new batch
-    tx_hash = batch_tracker.functions.createBatch("Boba Tea", "Taiwan").transact({'from': account})
-    w3.eth.waitForTransactionReceipt(tx_hash)
-
-    # Add tracking steps
-    batch_tracker.functions.addTrackingStep(0, "Harvested").transact({'from': account})
-    batch_tracker.functions.addTrackingStep(0, "Processed").transact({'from': account})
-
-    # Get batch history
-    history = batch_tracker.functions.getBatchHistory(0).call()
-    assert len(history) == 2  # Ensure there are two tracking steps
-    assert "Harvested" in history
-    assert "Processed" in history
\ No newline at end of file
+
+    # Create a new batch and add tracking steps
+    transact(batch_tracker.functions.createBatch("Boba Tea", "Taiwan"))
+    transact(batch_tracker.functions.registerSteps(["Harvested", "Processed"]))
+    transact(batch_tracker.functions.addTrackingStep(1, 1, ""))
+    transact(batch_tracker.functions.addTrackingStep(1, 2, ""))
+
+    # Get batch history: steps are stored as codes into the step dictionary
+    history = batch_tracker.functions.getBatchHistory(1).call()[2]
+    step_names = batch_tracker.functions.getStepNames(0).call()
+    assert history == [1, 2]  # Ensure there are two tracking steps
+    assert [step_names[code] for code in history] == ["Harvested", "Processed"]